@@ -17,6 +17,12 @@ setup(
         'lxml>=4.9.2',
     ],
 
+    extras_require={
+        'async': ['aiohttp>=3.8.0'],
+        'lxml': ['cssselect>=1.2.0'],
+        'numpy': ['numpy>=1.21.0'],
+    },
+
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
@@ -0,0 +1,791 @@
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import resource
+import threading
+import tracemalloc
+import subprocess
+from time import perf_counter, sleep
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from typing import Callable, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from .src.csfd_session import CsfdSession
+from .src.csfd_rate_limiter import CsfdRateLimiter
+from .src.csfd_scraper import CsfdScraper
+from .src.csfd_cache import CsfdDocumentCache
+from .src.csfd_parser_pool import CsfdParserPool
+from .src.csfd_crawler import CsfdCrawler, CsfdFrontier
+from .src.csfd_journal import CsfdJournal
+from .src.csfd_watermarks import CsfdWatermarkStore
+from .src.csfd_store import CsfdStore
+from .src.csfd_utils import Globals, ParserBackends, RawDocument, soup
+from .src.csfd_parsers import MovieParser, CreatorParser, UserParser, LeaderboardsParser
+from .src.csfd_objects import PrintableObject, UserRating, Movie
+from .src.csfd_frames import ordinal_date
+
+parser = argparse.ArgumentParser(epilog="by @TheNoiselessNoise")
+subparsers = parser.add_subparsers(title='Benchmarks', dest='benchmark')
+
+pooling_parser = subparsers.add_parser('pooling', help='Requests/sec against a local stand-in server with and without pooling')
+pooling_parser.add_argument('--requests', type=int, default=1000, help="How many requests to make in each run (default=1000)")
+pooling_parser.add_argument('--size', type=int, default=100_000, help="Size of the served page in bytes (default=100000)")
+
+stress_parser = subparsers.add_parser('stress', help='Calls/sec of movie() from many threads against a local stand-in server')
+stress_parser.add_argument('--calls', type=int, default=5000, help="How many movie() calls to make (default=5000)")
+stress_parser.add_argument('--threads', type=int, default=32, help="How many threads to use (default=32)")
+stress_parser.add_argument('--movies', type=int, default=50, help="How many distinct movies to serve (default=50)")
+
+parsers_parser = subparsers.add_parser('parsers', help='Pages/sec parsed by the bs4 and lxml backends on saved pages')
+parsers_parser.add_argument('--fixtures', type=str, default="fixtures", help="Directory with saved pages named <kind>-<id>.html, kinds: movie, creator, user, leaderboards (default=fixtures)")
+parsers_parser.add_argument('--fetch-movies', type=int, nargs="*", default=[], help="Movie IDs to download into the fixtures directory first")
+parsers_parser.add_argument('--fetch-creators', type=int, nargs="*", default=[], help="Creator IDs to download into the fixtures directory first")
+parsers_parser.add_argument('--fetch-users', type=int, nargs="*", default=[], help="User IDs to download into the fixtures directory first")
+parsers_parser.add_argument('--fetch-leaderboards', action="store_true", help="Download the best movies leaderboard into the fixtures directory first")
+parsers_parser.add_argument('--repeat', type=int, default=20, help="How many times to parse every page (default=20)")
+
+single_pass_parser = subparsers.add_parser('single-pass', help='Per-page CPU time of parse_movie and the single-pass movie extractor on saved movie pages')
+single_pass_parser.add_argument('--fixtures', type=str, default="fixtures", help="Directory with saved pages named movie-<id>.html (default=fixtures)")
+single_pass_parser.add_argument('--size', type=int, default=300_000, help="Approximate size of the stand-in page used without fixtures (default=300000)")
+single_pass_parser.add_argument('--repeat', type=int, default=10, help="How many times to parse every page (default=10)")
+
+ldjson_parser = subparsers.add_parser('ldjson', help='Single ld+json field lookups/sec read straight from the page bytes vs. from the parsed document')
+ldjson_parser.add_argument('--pages', type=int, default=50, help="How many distinct movie pages to look up (default=50)")
+ldjson_parser.add_argument('--size', type=int, default=300_000, help="Approximate size of every page in bytes (default=300000)")
+
+memory_parser = subparsers.add_parser('memory', help='Peak RSS of a crawl of movie pages with and without the memory-bounded mode, every mode runs in its own process')
+memory_parser.add_argument('--pages', type=int, default=5000, help="How many movie pages to crawl (default=5000)")
+memory_parser.add_argument('--fixtures', type=str, default="fixtures", help="Directory with saved pages named movie-<id>.html, served in turns (default=fixtures)")
+memory_parser.add_argument('--size', type=int, default=20_000, help="Approximate size of the stand-in pages used without fixtures (default=20000)")
+memory_parser.add_argument('--threads', type=int, default=4, help="How many pages to crawl at once (default=4)")
+memory_parser.add_argument('--backend', type=str, default="bs4", choices=[x.value for x in ParserBackends], help="Parser backend (default=bs4)")
+memory_parser.add_argument('--run-mode', type=str, choices=["default", "bounded"], help=argparse.SUPPRESS)
+
+records_parser = subparsers.add_parser('records', help='Memory held by user ratings kept as PrintableRecord vs. the args dict + __dict__ layout')
+records_parser.add_argument('--records', type=int, default=1_000_000, help="How many ratings to keep (default=1000000)")
+
+pages_parser = subparsers.add_parser('pages', help='Wall time of reading all user ratings pages with a serial has_next_page loop vs. iter_user_ratings (prefetch) and fan_out_user_ratings')
+pages_parser.add_argument('--ratings', type=int, default=30_000, help="How many ratings the stand-in profile has, 50 per page (default=30000)")
+pages_parser.add_argument('--latency', type=float, default=0.05, help="Seconds the stand-in server waits before every response (default=0.05)")
+pages_parser.add_argument('--prefetch', type=int, default=8, help="How many pages are in flight at once (default=8)")
+pages_parser.add_argument('--rate', type=float, default=None, help="Requests/sec allowed by a CsfdRateLimiter (default=no limiter)")
+
+pipeline_parser = subparsers.add_parser('pipeline', help='Movies/sec of movies() parsing in the fetching threads vs. in a CsfdParserPool of worker processes')
+pipeline_parser.add_argument('--movies', type=int, default=200, help="How many movies to fetch (default=200)")
+pipeline_parser.add_argument('--size', type=int, default=100_000, help="Approximate size of every stand-in page (default=100000)")
+pipeline_parser.add_argument('--threads', type=int, default=16, help="How many fetching threads to use (default=16)")
+pipeline_parser.add_argument('--processes', type=int, default=os.cpu_count(), help="How many parser processes to use (default=number of CPUs)")
+
+crawl_parser = subparsers.add_parser('crawl', help='Records/sec of a CsfdCrawler over a stand-in graph of movies, creators and users, and the memory of a frontier with millions of IDs')
+crawl_parser.add_argument('--movies', type=int, default=2000, help="How many movies the stand-in graph has (default=2000)")
+crawl_parser.add_argument('--creators', type=int, default=1000, help="How many creators the stand-in graph has (default=1000)")
+crawl_parser.add_argument('--users', type=int, default=500, help="How many users the stand-in graph has (default=500)")
+crawl_parser.add_argument('--workers', type=int, default=8, help="How many records are fetched at once (default=8)")
+crawl_parser.add_argument('--ids', type=int, default=5_000_000, help="How many random IDs to push into a frontier for the memory check (default=5000000)")
+
+journal_parser = subparsers.add_parser('journal', help='Requests of a crawl killed midway and resumed from its CsfdJournal, and the restart time of a journal with millions of entries before and after compaction')
+journal_parser.add_argument('--movies', type=int, default=1000, help="How many movies the stand-in graph has (default=1000)")
+journal_parser.add_argument('--creators', type=int, default=500, help="How many creators the stand-in graph has (default=500)")
+journal_parser.add_argument('--users', type=int, default=250, help="How many users the stand-in graph has (default=250)")
+journal_parser.add_argument('--workers', type=int, default=8, help="How many records are fetched at once (default=8)")
+journal_parser.add_argument('--kill-after', type=int, default=700, help="How many records the first crawl gets before it is killed (default=700)")
+journal_parser.add_argument('--entries', type=int, default=10_000_000, help="How many entries the journal for the restart time has (default=10000000)")
+journal_parser.add_argument('--directory', type=str, default="bench-journal", help="Where to keep the journals (default=bench-journal)")
+
+sync_parser = subparsers.add_parser('sync', help='Requests per user of a full sync_users_ratings and of a resync on a quiet day')
+sync_parser.add_argument('--users', type=int, default=5000, help="How many users to sync (default=5000)")
+sync_parser.add_argument('--max-ratings', type=int, default=300, help="Every user has 0 to this many ratings, 50 per page (default=300)")
+sync_parser.add_argument('--active', type=float, default=0.05, help="Share of users who rate something between the syncs (default=0.05)")
+sync_parser.add_argument('--workers', type=int, default=16, help="How many users are synced at once (default=16)")
+
+store_parser = subparsers.add_parser('store', help='Movies/sec upserted into a CsfdStore one per transaction vs. in batches, and movie() answered from the store vs. scraped')
+store_parser.add_argument('--movies', type=int, default=5000, help="How many movies to upsert (default=5000)")
+store_parser.add_argument('--size', type=int, default=20_000, help="Approximate size of every stand-in page (default=20000)")
+store_parser.add_argument('--batch', type=int, default=500, help="Movies per transaction of the batched upserts (default=500)")
+store_parser.add_argument('--lookups', type=int, default=200, help="How many movie() calls to make (default=200)")
+store_parser.add_argument('--path', type=str, default="bench-store.db", help="Where to keep the store (default=bench-store.db)")
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b""
+
+    def do_GET(self):
+        # NOTE: body is either the same page for every path, or a function rendering the page for the path
+        body = self.body if isinstance(self.body, bytes) else self.body(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_stand_in_server(body: Union[bytes, Callable[[str], bytes]]) -> ThreadingHTTPServer:
+    handler = type("StandInHandler", (StandInHandler,), {"body": body if isinstance(body, bytes) else staticmethod(body)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def print_results(args: dict):
+    print("[!] DONE")
+    for text, value in args.items():
+        print(f"[i] {text}: {value}")
+
+def measure(func, count: int) -> float:
+    start = perf_counter()
+    for _ in range(count):
+        func()
+    return count / (perf_counter() - start)
+
+def bench_pooling(cli_args):
+    server = start_stand_in_server(b"x" * cli_args.size)
+    u = f"http://127.0.0.1:{server.server_address[1]}/film/1"
+
+    print(f"[!] Benchmarking {cli_args.requests} requests against {u}")
+
+    without_pooling = measure(lambda: requests.get(u, headers=CsfdSession.DEFAULT_HEADERS), cli_args.requests)
+    with CsfdSession() as session:
+        with_pooling = measure(lambda: session.request("GET", u), cli_args.requests)
+
+    server.shutdown()
+
+    print_results({
+        "Without pooling (req/s)": round(without_pooling, 2),
+        "With pooling (req/s)": round(with_pooling, 2),
+        "Speedup": f"{with_pooling / without_pooling:.2f}x"
+    })
+
+def render_stand_in_movie(path: str, size: int = 0) -> bytes:
+    """Movie page with every section the movie parser reads, `size` (in bytes, roughly) scales the repeated sections"""
+    mid = int(re.search(r"/film/(\d+)", path).group(1))
+    ld_json = json.dumps({
+        "@type": "Movie",
+        "name": f"Movie {mid}",
+        "dateCreated": 2000 + mid % 20,
+        "duration": "PT142M",
+        "image": f"//image.example/{mid}.jpg",
+        "aggregateRating": {"ratingValue": 80 + mid % 20, "ratingCount": 1000 + mid}
+    })
+    repeat = max(1, size // 4000)
+    creators = "".join(
+        f'<div><h4>Role {i}:</h4>' + "".join(f'<a href="/tvurce/{i * 10 + j}-name/">Creator {i * 10 + j}</a>' for j in range(10)) + '<a href="/tvurce/1-name/prehled/">more</a></div>'
+        for i in range(repeat)
+    )
+    reviews = "".join(
+        f'<article class="article"><header class="article-header"><div class="user-title"><a href="/uzivatel/{i}-user/">User {i}</a>'
+        f'<span class="stars stars-{i % 5 + 1}"></span></div></header><div class="article-content"><p class="comment">Review <em>{i}</em> text</p>'
+        f'<span class="comment-date"><time>01.02.2003</time></span></div></article>'
+        for i in range(repeat * 4)
+    )
+    trivia = "".join(
+        f'<article class="article-trivia"><ul><li>Trivia <a href="/film/1-x/">{i}</a> <span class="span-more-small">(<a href="/uzivatel/{i}-user/">User {i}</a>)</span></li></ul></article>'
+        for i in range(repeat * 4)
+    )
+    premieres = "".join(
+        f'<li><div class="item-img"><img title="Country {i}"></div><p>V kinech {i} </p><span>x</span><span>01.01.2000 Distributor {i}</span></li>'
+        for i in range(repeat)
+    )
+    plots = "".join(
+        f'<div class="plots-item"><p>Other plot {i} <em class="span-more-small"><a href="/uzivatel/{i}-user/">User {i}</a></em></p></div>'
+        for i in range(repeat)
+    )
+    related = "".join(f'<li class="item"><a href="/film/{i}-other/">Other movie {i}</a> <span>(2000)</span></li>' for i in range(repeat * 10))
+    return (
+        f'<html><head><title>Movie {mid}</title></head><body><div class="box"><ul>{related}</ul></div>'
+        f'<div class="main-movie"><script type="application/ld+json">{ld_json}</script>'
+        f'<div class="film-header"><ul class="film-names"><li><img title="Česko">Film {mid}</li><li><img title="USA">Movie {mid}</li></ul></div>'
+        f'<div class="genres">Drama / Komedie</div><div class="origin">USA, 1994, 142 min</div>'
+        f'<div class="creators">{creators}</div>'
+        f'<div class="plot-full"><p>Plot of {mid} <em class="span-more-small"><a href="https://source.example/">Source</a></em></p></div>'
+        f'<div class="plots">{plots}</div>'
+        f'<section class="box"><header><span class="count">({repeat * 4})</span></header><div class="box-reviews">'
+        f'<span class="count">({repeat * 4})</span>{reviews}</div></section>'
+        f'<section class="box"><header><span class="count">({repeat * 4})</span></header>{trivia}</section>'
+        f'<section class="box"><header><span class="count">(12)</span></header><div class="gallery-item"><picture><img src="//img.example/{mid}.jpg"></picture></div></section>'
+        f'</div><aside><div class="film-ranking"><a href="/zebricky/filmy/nejlepsi/">{mid}. nejlepší film</a></div>'
+        f'<div class="box-buttons"><a href="https://vod.example/{mid}">VOD</a><a href="https://www.facebook.com/x">Facebook</a></div>'
+        f'<section><div class="box-premieres"><ul>{premieres}</ul></div></section>'
+        f'<section><div class="box-content"><a href="/tagy/?tag=1">Tag 1</a><a href="/tagy/?tag=2">Tag 2</a></div></section></aside>'
+        f'<div class="box"><ul>{related}</ul></div></body></html>'
+    ).encode()
+
+def bench_stress(cli_args):
+    server = start_stand_in_server(render_stand_in_movie)
+    Globals.MOVIES_URL = f"http://127.0.0.1:{server.server_address[1]}/film/"
+
+    print(f"[!] Calling movie() {cli_args.calls} times from {cli_args.threads} threads")
+
+    # NOTE: a tiny cache, so documents are evicted and parsed again while other threads use the same parsers
+    scraper = CsfdScraper(cache=CsfdDocumentCache(max_entries=cli_args.movies // 4))
+    mids = [random.randint(1, cli_args.movies) for _ in range(cli_args.calls)]
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=cli_args.threads) as executor:
+        list(executor.map(scraper.movie, mids))
+    elapsed = perf_counter() - start
+
+    server.shutdown()
+
+    print_results({
+        "Calls/sec": round(cli_args.calls / elapsed, 2),
+        "Coalesced requests": scraper.get_single_flight().stats()["coalesced"]
+    })
+
+FIXTURE_PARSERS = {
+    "movie": lambda s, xid: MovieParser().parse_movie(s, xid),
+    "creator": lambda s, xid: CreatorParser().parse_creator(s, xid),
+    "user": lambda s, xid: UserParser().parse_user(s, xid),
+    "leaderboards": lambda s, xid: LeaderboardsParser().parse_leaderboards_movies(s),
+}
+
+def fetch_fixtures(cli_args):
+    urls = {}
+    urls.update({f"movie-{x}": Globals.MOVIES_URL + str(x) for x in cli_args.fetch_movies})
+    urls.update({f"creator-{x}": Globals.CREATORS_URL + str(x) for x in cli_args.fetch_creators})
+    urls.update({f"user-{x}": Globals.USERS_URL + str(x) for x in cli_args.fetch_users})
+    if cli_args.fetch_leaderboards:
+        urls["leaderboards-0"] = Globals.LEADERBOARDS_MOVIES_BEST
+    if not urls:
+        return
+    os.makedirs(cli_args.fixtures, exist_ok=True)
+    with CsfdSession() as session:
+        for name, u in urls.items():
+            print(f"[!] Downloading {u}")
+            with open(os.path.join(cli_args.fixtures, name + ".html"), "wb") as file:
+                file.write(session.request("GET", u).content)
+
+def load_fixtures(directory: str) -> list:
+    fixtures = []
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        match = re.match(r"^([a-z]+)-(\d+)\.html$", name)
+        if match is None or match.group(1) not in FIXTURE_PARSERS:
+            continue
+        with open(os.path.join(directory, name), "rb") as file:
+            fixtures.append((match.group(1), int(match.group(2)), file.read()))
+    return fixtures
+
+def bench_parsers(cli_args):
+    fetch_fixtures(cli_args)
+    fixtures = load_fixtures(cli_args.fixtures)
+    if not fixtures:
+        print(f"[!] No pages in '{cli_args.fixtures}', using a stand-in movie page (download real pages with --fetch-*)")
+        fixtures = [("movie", 1, render_stand_in_movie("/film/1", 100_000))]
+
+    results = {}
+    for kind in FIXTURE_PARSERS:
+        pages = [x for x in fixtures if x[0] == kind]
+        if not pages:
+            continue
+        for backend in ParserBackends:
+            start = perf_counter()
+            for _ in range(cli_args.repeat):
+                for _, xid, content in pages:
+                    FIXTURE_PARSERS[kind](soup(content, backend), xid)
+            results[f"{kind} pages/sec ({backend.value})"] = round(len(pages) * cli_args.repeat / (perf_counter() - start), 2)
+
+    print_results(results)
+
+def bench_single_pass(cli_args):
+    pages = [(xid, content) for kind, xid, content in load_fixtures(cli_args.fixtures) if kind == "movie"]
+    if not pages:
+        print(f"[!] No movie pages in '{cli_args.fixtures}', using a stand-in movie page")
+        pages = [(1, render_stand_in_movie("/film/1", cli_args.size))]
+
+    movie_parser = MovieParser()
+    results = {}
+    for backend in ParserBackends:
+        # NOTE: documents are built beforehand, only the extraction is measured
+        documents = [(xid, soup(content, backend)) for xid, content in pages]
+        times = {}
+        for name, parse in [("parse_movie", movie_parser.parse_movie), ("single pass", movie_parser.parse_movie_single_pass)]:
+            start = perf_counter()
+            for _ in range(cli_args.repeat):
+                for xid, s in documents:
+                    parse(s, xid)
+            times[name] = (perf_counter() - start) / (len(documents) * cli_args.repeat)
+            results[f"{name} ms/page ({backend.value})"] = round(times[name] * 1000, 2)
+        results[f"Speedup ({backend.value})"] = f"{times['parse_movie'] / times['single pass']:.2f}x"
+
+    print_results(results)
+
+def bench_ldjson(cli_args):
+    pages = [render_stand_in_movie(f"/film/{mid}", cli_args.size) for mid in range(1, cli_args.pages + 1)]
+    movie_parser = MovieParser()
+
+    print(f"[!] Looking up the title and year of {len(pages)} movie pages of {len(pages[0])} bytes")
+
+    def lookup(documents) -> float:
+        start = perf_counter()
+        for s in documents():
+            movie_parser.parse_movie_title(s)
+            movie_parser.parse_movie_year(s)
+        return len(pages) / (perf_counter() - start)
+
+    raw = lookup(lambda: (RawDocument(content) for content in pages))
+    results = {"From bytes (pages/s)": round(raw, 2)}
+    for backend in ParserBackends:
+        parsed = lookup(lambda: (soup(content, backend) for content in pages))
+        results[f"From {backend.value} document (pages/s)"] = round(parsed, 2)
+        results[f"Speedup over {backend.value}"] = f"{raw / parsed:.2f}x"
+
+    print_results(results)
+
+def peak_rss_mb() -> float:
+    # NOTE: ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def crawl_memory(cli_args) -> dict:
+    pages = [content for kind, xid, content in load_fixtures(cli_args.fixtures) if kind == "movie"]
+    if pages:
+        server = start_stand_in_server(lambda path: pages[int(path.rstrip("/").split("/")[-1]) % len(pages)])
+    else:
+        server = start_stand_in_server(lambda path: render_stand_in_movie(path, cli_args.size))
+    Globals.MOVIES_URL = f"http://127.0.0.1:{server.server_address[1]}/film/"
+
+    scraper = CsfdScraper(backend=ParserBackends(cli_args.backend), memory_bounded=cli_args.run_mode == "bounded")
+    before = peak_rss_mb()
+    start = perf_counter()
+    errors = 0
+    for result in scraper.movies(range(1, cli_args.pages + 1), workers=cli_args.threads, ordered=False):
+        errors += not result.is_ok()
+    elapsed = perf_counter() - start
+    server.shutdown()
+    return {
+        "peak_rss": peak_rss_mb(),
+        "peak_rss_before": before,
+        "pages_per_sec": round(cli_args.pages / elapsed, 2),
+        "errors": errors,
+        "cache_bytes": scraper.get_cache().stats()["bytes"],
+    }
+
+def bench_memory(cli_args):
+    if cli_args.run_mode is not None:
+        print(json.dumps(crawl_memory(cli_args)))
+        return
+
+    print(f"[!] Crawling {cli_args.pages} movie pages in every mode")
+    results = {}
+    for mode in ["default", "bounded"]:
+        # NOTE: peak RSS never goes down, so every mode needs a fresh process
+        command = [sys.executable, "-m", "x_csfd_scraper.bench"] + sys.argv[1:] + ["--run-mode", mode]
+        output = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+        results[f"Peak RSS MB ({mode})"] = output["peak_rss"]
+        results[f"Peak RSS MB growth ({mode})"] = round(output["peak_rss"] - output["peak_rss_before"], 1)
+        results[f"Pages/sec ({mode})"] = output["pages_per_sec"]
+        results[f"Document cache KB ({mode})"] = round(output["cache_bytes"] / 1024, 1)
+        results[f"Errors ({mode})"] = output["errors"]
+
+    print_results(results)
+
+class DictUserRating(PrintableObject):
+    """UserRating as it was before PrintableRecord, the args dict and a copy of every field in __dict__"""
+
+    def __init__(self, args: dict):
+        self.args: dict = args
+        self.id: int = args.get("id", -1)
+        self.name: str = args.get("name", None)
+        self.year: int = args.get("year", -1)
+        self.rating: int = args.get("rating", -1)
+        self.date: str = args.get("date", None)
+
+def rating_args(i: int) -> dict:
+    return {"id": i, "name": f"Movie {i}", "year": 1950 + i % 70, "rating": i % 6, "date": f"{i % 28 + 1:02}.{i % 12 + 1:02}.2020"}
+
+def bench_records(cli_args):
+    print(f"[!] Keeping {cli_args.records} user ratings in every layout")
+    results = {}
+    for name, cls in [("args + __dict__", DictUserRating), ("PrintableRecord", UserRating)]:
+        tracemalloc.start()
+        start = perf_counter()
+        kept = [cls(rating_args(i)) for i in range(cli_args.records)]
+        elapsed = perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"MB ({name})"] = round(current / 1024 / 1024, 1)
+        results[f"Bytes/record ({name})"] = round(current / cli_args.records, 1)
+        results[f"Records/sec ({name})"] = round(cli_args.records / elapsed, 2)
+        # NOTE: the next layout is measured from scratch
+        del kept
+
+    print_results(results)
+
+RATINGS_PER_PAGE = 50
+
+def render_stand_in_user_ratings(path: str, total: int, latency: float) -> bytes:
+    sleep(latency)
+    match = re.search(r"[?&]page=(\d+)", path)
+    page = int(match.group(1)) if match else 1
+    first = (page - 1) * RATINGS_PER_PAGE
+    rows = "".join(
+        f'<tr><td class="name"><h3><a href="/film/{i}-film/">Film {i}</a></h3>'
+        f'<span class="film-title-info"><span class="info">({1950 + i % 70})</span></span></td>'
+        f'<td class="star-rating-only"><span class="stars {"trash" if i % 6 == 0 else f"stars-{i % 6}"}"></span></td>'
+        f'<td class="date-only">{i % 28 + 1:02}.{i % 12 + 1:02}.2020</td></tr>'
+        for i in range(first + 1, min(first + RATINGS_PER_PAGE, total) + 1)
+    )
+    pages = f'<a class="page-prev" href="?page={page - 1}">prev</a>' if page > 1 else ""
+    pages += f'<a class="page-next" href="?page={page + 1}">next</a>' if first + RATINGS_PER_PAGE < total else ""
+    return (
+        f'<html><body><section class="user-tab-rating"><h2><span class="count">({total})</span></h2>'
+        f'<table>{rows}</table>{pages}</section></body></html>'
+    ).encode()
+
+def bench_pages(cli_args):
+    server = start_stand_in_server(lambda path: render_stand_in_user_ratings(path, cli_args.ratings, cli_args.latency))
+    Globals.USER_RATINGS_URL = f"http://127.0.0.1:{server.server_address[1]}/uzivatel/<uid>/hodnoceni/"
+
+    def make_scraper() -> CsfdScraper:
+        rate_limiter = None if cli_args.rate is None else CsfdRateLimiter(rate=cli_args.rate, burst=cli_args.prefetch)
+        return CsfdScraper(CsfdSession(pool_size=cli_args.prefetch, rate_limiter=rate_limiter))
+
+    print(f"[!] Reading {cli_args.ratings} ratings ({-(-cli_args.ratings // RATINGS_PER_PAGE)} pages)")
+
+    def serial() -> list:
+        scraper = make_scraper()
+        ratings = []
+        page = 1
+        while True:
+            result = scraper.user_ratings(1, page=page)
+            ratings.extend(result.ratings)
+            if not result.has_next_page:
+                return ratings
+            page += 1
+
+    def prefetched() -> list:
+        return list(make_scraper().iter_user_ratings(1, prefetch=cli_args.prefetch))
+
+    def fanned_out() -> list:
+        return make_scraper().fan_out_user_ratings(1, workers=cli_args.prefetch).items
+
+    results = {}
+    for name, read in [("serial loop", serial), ("iter_user_ratings", prefetched), ("fan_out_user_ratings", fanned_out)]:
+        start = perf_counter()
+        ratings = read()
+        results[f"Seconds ({name})"] = round(perf_counter() - start, 2)
+        results[f"Ratings ({name})"] = len(ratings)
+    server.shutdown()
+
+    for name in ["iter_user_ratings", "fan_out_user_ratings"]:
+        results[f"Speedup ({name})"] = f"{results['Seconds (serial loop)'] / results[f'Seconds ({name})']:.2f}x"
+    print_results(results)
+
+def bench_pipeline(cli_args):
+    pages = {}
+
+    def render(path: str) -> bytes:
+        # NOTE: rendered once, so the server doesn't compete with the parsers for the CPU
+        if path not in pages:
+            pages[path] = render_stand_in_movie(path, cli_args.size)
+        return pages[path]
+
+    server = start_stand_in_server(render)
+    Globals.MOVIES_URL = f"http://127.0.0.1:{server.server_address[1]}/film/"
+    mids = list(range(1, cli_args.movies + 1))
+    for mid in mids:
+        render(f"/film/{mid}")
+
+    print(f"[!] Fetching {cli_args.movies} movies with {cli_args.threads} threads, {os.cpu_count()} CPUs")
+
+    results = {}
+    with CsfdParserPool(cli_args.processes) as pool:
+        # NOTE: starts the worker processes before measuring
+        list(CsfdScraper().movies(mids[:cli_args.processes], workers=cli_args.threads, parser_pool=pool))
+        for name, parser_pool in [("threads", None), (f"{cli_args.processes} processes", pool)]:
+            # NOTE: an empty document cache for every run
+            scraper = CsfdScraper(CsfdSession(pool_size=cli_args.threads))
+            start = perf_counter()
+            list(scraper.movies(mids, workers=cli_args.threads, parser_pool=parser_pool))
+            results[f"Movies/sec ({name})"] = round(cli_args.movies / (perf_counter() - start), 2)
+    server.shutdown()
+
+    print_results(results)
+
+def render_stand_in_crawl(path: str, cli_args) -> bytes:
+    """Pages of a graph where every movie links 3 creators and 2 reviewers and every creator links 4 movies"""
+    xid = int(re.search(r"/(\d+)", path).group(1))
+    if path.startswith("/film/"):
+        creators = "".join(f'<a href="/tvurce/{(xid * 3 + i) % cli_args.creators}-name/">Creator</a>' for i in range(3))
+        reviews = "".join(
+            f'<article><div class="user-title"><a href="/uzivatel/{(xid * 5 + i) % cli_args.users}-user/">User</a>'
+            f'<span class="stars stars-{i + 1}"></span></div><div class="article-content"><p class="comment">Review</p>'
+            f'<span class="comment-date"><time>01.02.2003</time></span></div></article>'
+            for i in range(2)
+        )
+        ld_json = json.dumps({"@type": "Movie", "name": f"Movie {xid}"})
+        return (
+            f'<html><body><div class="main-movie"><script type="application/ld+json">{ld_json}</script>'
+            f'<div class="creators"><div><h4>Role:</h4>{creators}</div></div>'
+            f'<div class="box-reviews"><span class="count">(2)</span>{reviews}</div></div></body></html>'
+        ).encode()
+    if path.startswith("/tvurce/"):
+        rows = "".join(
+            f'<tr><td class="year">{2000 + i}</td><td class="name"><a href="/film/{(xid * 4 + i) % cli_args.movies}-film/">Movie</a></td></tr>'
+            for i in range(4)
+        )
+        ld_json = json.dumps({"@type": "Person", "name": f"Creator {xid}"})
+        return (
+            f'<html><body><div class="creator-main"><script type="application/ld+json">{ld_json}</script></div>'
+            f'<div class="creator-filmography"><section><header><h2>Režie</h2></header><table><tr><th>Film</th></tr>{rows}</table></section></div>'
+            f'</body></html>'
+        ).encode()
+    return f'<html><body><div class="user-profile"><h1>User {xid}</h1></div></body></html>'.encode()
+
+def bench_crawl(cli_args):
+    server = start_stand_in_server(lambda path: render_stand_in_crawl(path, cli_args))
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    Globals.MOVIES_URL = base + "/film/"
+    Globals.CREATORS_SORT_URL = base + "/tvurce/<cid>?sort=<sort>"
+    Globals.USERS_URL = base + "/uzivatel/"
+
+    print(f"[!] Crawling {cli_args.movies} movies, {cli_args.creators} creators and {cli_args.users} users from one seed")
+
+    scraper = CsfdScraper(CsfdSession(pool_size=cli_args.workers), memory_bounded=True)
+    crawler = CsfdCrawler(scraper, fields={"movie": ["title"], "creator": ["name"], "user": ["name"]}, workers=cli_args.workers)
+    crawler.seed("movie", [0])
+    frontier_peak = 0
+
+    def sink(kind: str, record: PrintableObject) -> None:
+        nonlocal frontier_peak
+        frontier_peak = max(frontier_peak, len(crawler.frontier))
+
+    start = perf_counter()
+    stats = crawler.run(sink)
+    elapsed = perf_counter() - start
+    server.shutdown()
+
+    results = {
+        "Records/sec": round(sum(stats["fetched"].values()) / elapsed, 2),
+        "Fetched": stats["fetched"],
+        "Failed": stats["failed"],
+        "Frontier peak": frontier_peak,
+    }
+
+    print(f"[!] Pushing {cli_args.ids} random IDs into a frontier")
+    ids = [random.randrange(0, cli_args.ids * 4) for _ in range(cli_args.ids)]
+    tracemalloc.start()
+    frontier = CsfdFrontier()
+    for xid in ids:
+        frontier.push("movie", xid)
+    results["Frontier (MB)"] = round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 2)
+    del frontier
+    tracemalloc.reset_peak()
+    seen = set()
+    queue = []
+    for xid in ids:
+        if xid not in seen:
+            seen.add(xid)
+            queue.append(("movie", xid))
+    results["set + list of tuples (MB)"] = round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 2)
+    tracemalloc.stop()
+    results["Queued IDs"] = len(queue)
+    print_results(results)
+
+class CrawlKilled(Exception):
+    pass
+
+def bench_journal(cli_args):
+    requests_made = []
+
+    def render(path: str) -> bytes:
+        requests_made.append(path)
+        return render_stand_in_crawl(path, cli_args)
+
+    server = start_stand_in_server(render)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    Globals.MOVIES_URL = base + "/film/"
+    Globals.CREATORS_SORT_URL = base + "/tvurce/<cid>?sort=<sort>"
+    Globals.USERS_URL = base + "/uzivatel/"
+    os.makedirs(cli_args.directory, exist_ok=True)
+    path = os.path.join(cli_args.directory, "crawl.journal")
+    for leftover in [path, path + ".snapshot"]:
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+    received = []
+
+    def crawl(kill_after: Optional[int]) -> None:
+        def sink(kind: str, record: PrintableObject) -> None:
+            # NOTE: killed before the record is handled, so it isn't completed in the journal either
+            if kill_after is not None and len(received) >= kill_after:
+                raise CrawlKilled()
+            received.append((kind, record.id))
+
+        # NOTE: compacts often, so the resume goes through the snapshot and the journal written after it
+        with CsfdJournal(path, compact_every=500) as journal:
+            scraper = CsfdScraper(CsfdSession(pool_size=cli_args.workers), memory_bounded=True)
+            crawler = CsfdCrawler(scraper, fields={"movie": ["title"], "creator": ["name"], "user": ["name"]}, workers=cli_args.workers, journal=journal)
+            crawler.seed("movie", [0])
+            try:
+                crawler.run(sink)
+            except CrawlKilled:
+                pass
+
+    print(f"[!] Crawling, killed after {cli_args.kill_after} records, then resumed")
+    crawl(cli_args.kill_after)
+    first_requests = len(requests_made)
+    crawl(None)
+    server.shutdown()
+
+    results = {
+        "Records (killed run)": cli_args.kill_after,
+        "Records (resumed run)": len(received) - cli_args.kill_after,
+        "Requests": len(requests_made),
+        "Refetched (in flight when killed)": len(requests_made) - len(set(requests_made)),
+        "Requests before the kill": first_requests,
+    }
+
+    print(f"[!] Writing {cli_args.entries} journal entries")
+    path = os.path.join(cli_args.directory, "restart.journal")
+    for leftover in [path, path + ".snapshot"]:
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    with CsfdJournal(path, compact_every=cli_args.entries + 1) as journal:
+        for xid in range(cli_args.entries // 2):
+            journal.queue("movie", xid)
+        for xid in range(cli_args.entries // 2 - cli_args.entries // 20):
+            journal.complete("movie", xid)
+    results["Journal (MB)"] = round(os.path.getsize(path) / 2 ** 20, 2)
+
+    start = perf_counter()
+    with CsfdJournal(path) as journal:
+        results["Restart, replaying the journal (s)"] = round(perf_counter() - start, 2)
+        journal.compact()
+    results["Snapshot (MB)"] = round(os.path.getsize(path + ".snapshot") / 2 ** 20, 2)
+
+    start = perf_counter()
+    with CsfdJournal(path) as journal:
+        results["Restart, from the snapshot (s)"] = round(perf_counter() - start, 2)
+        results["Pending IDs"] = len(journal.frontier)
+    print_results(results)
+
+def render_stand_in_ratings_history(path: str, histories: dict) -> bytes:
+    """Ratings page of the user (newest first), histories is uid -> [(movie id, date ordinal)]"""
+    uid = int(re.search(r"/uzivatel/(\d+)", path).group(1))
+    match = re.search(r"[?&]page=(\d+)", path)
+    page = int(match.group(1)) if match else 1
+    history = histories[uid]
+    first = (page - 1) * RATINGS_PER_PAGE
+    rows = "".join(
+        f'<tr><td class="name"><h3><a href="/film/{mid}-film/">Film {mid}</a></h3>'
+        f'<span class="film-title-info"><span class="info">(2000)</span></span></td>'
+        f'<td class="star-rating-only"><span class="stars stars-{mid % 5 + 1}"></span></td>'
+        f'<td class="date-only">{ordinal_date(ordinal)}</td></tr>'
+        for mid, ordinal in history[first:first + RATINGS_PER_PAGE]
+    )
+    pages = f'<a class="page-next" href="?page={page + 1}">next</a>' if first + RATINGS_PER_PAGE < len(history) else ""
+    return (
+        f'<html><body><section class="user-tab-rating"><h2><span class="count">({len(history)})</span></h2>'
+        f'<table>{rows}</table>{pages}</section></body></html>'
+    ).encode()
+
+def bench_sync(cli_args):
+    today = 740000
+    histories = {
+        uid: [(uid * 1000 + i, today - 1 - i // 3) for i in range(random.randint(0, cli_args.max_ratings))]
+        for uid in range(1, cli_args.users + 1)
+    }
+    requests_made = []
+
+    def render(path: str) -> bytes:
+        requests_made.append(path)
+        return render_stand_in_ratings_history(path, histories)
+
+    server = start_stand_in_server(render)
+    Globals.USER_RATINGS_URL = f"http://127.0.0.1:{server.server_address[1]}/uzivatel/<uid>/hodnoceni/"
+    scraper = CsfdScraper(CsfdSession(pool_size=cli_args.workers))
+    store = CsfdWatermarkStore()
+    uids = list(histories)
+
+    def sync() -> dict:
+        deltas = {}
+        start = perf_counter()
+        for result in scraper.sync_users_ratings(uids, store, workers=cli_args.workers):
+            deltas[result.id] = result.result
+        store.put_many((uid, x.watermark) for uid, x in deltas.items())
+        return {"seconds": perf_counter() - start, "deltas": deltas}
+
+    print(f"[!] Full sync of {cli_args.users} users")
+    full = sync()
+    results = {
+        "Requests per user (full sync)": round(len(requests_made) / cli_args.users, 2),
+        "Seconds (full sync)": round(full["seconds"], 2),
+    }
+
+    added = {}
+    for uid in random.sample(uids, int(cli_args.users * cli_args.active)):
+        added[uid] = [(uid * 1000 + 900 + i, today) for i in range(random.randint(1, 3))]
+        histories[uid] = added[uid][::-1] + histories[uid]
+    # NOTE: a removed newest rating, the sync has to stop at the first older rating instead
+    removed = [uid for uid in uids if uid not in added and len(histories[uid]) > 1][:10]
+    for uid in removed:
+        histories[uid] = histories[uid][1:]
+
+    print(f"[!] Resync after {len(added)} users rated something and {len(removed)} removed their newest rating")
+    requests_made.clear()
+    quiet = sync()
+    server.shutdown()
+
+    results["Requests per user (resync)"] = round(len(requests_made) / cli_args.users, 2)
+    results["Seconds (resync)"] = round(quiet["seconds"], 2)
+    results["New ratings"] = sum(len(x.ratings) for x in quiet["deltas"].values())
+    print_results(results)
+
+def bench_store(cli_args):
+    server = start_stand_in_server(lambda path: render_stand_in_movie(path, cli_args.size))
+    Globals.MOVIES_URL = f"http://127.0.0.1:{server.server_address[1]}/film/"
+    template = CsfdScraper().movie(1)
+    movies = [Movie({**template.to_dict(), "id": mid}) for mid in range(1, cli_args.movies + 1)]
+
+    print(f"[!] Upserting {cli_args.movies} movies with {sum(len(x) for x in template.creators.values())} creator links each")
+    results = {}
+    for name, batch_size in [("one per transaction", 1), (f"{cli_args.batch} per transaction", cli_args.batch)]:
+        if os.path.exists(cli_args.path):
+            os.remove(cli_args.path)
+        with CsfdStore(cli_args.path, batch_size=batch_size) as store:
+            start = perf_counter()
+            for movie in movies:
+                store.add(movie)
+            store.flush()
+            results[f"Upserts/sec ({name})"] = round(cli_args.movies / (perf_counter() - start), 2)
+
+    mids = [random.randint(1, cli_args.movies) for _ in range(cli_args.lookups)]
+    with CsfdStore(cli_args.path) as store:
+        for name, scraper in [("scraped", CsfdScraper(cache=CsfdDocumentCache(max_entries=1))), ("from the store", CsfdScraper(store=store))]:
+            start = perf_counter()
+            for mid in mids:
+                scraper.movie(mid)
+            results[f"movie()/sec ({name})"] = round(cli_args.lookups / (perf_counter() - start), 2)
+        results["Store hits"] = store.stats()["hits"]
+        results["Creators of a movie from the index"] = len(store.get_creator_movies(template.creators[next(iter(template.creators))][0]["id"]))
+    server.shutdown()
+    os.remove(cli_args.path)
+
+    print_results(results)
+
+BENCHMARKS = {
+    "pooling": bench_pooling,
+    "stress": bench_stress,
+    "parsers": bench_parsers,
+    "single-pass": bench_single_pass,
+    "ldjson": bench_ldjson,
+    "memory": bench_memory,
+    "records": bench_records,
+    "pages": bench_pages,
+    "pipeline": bench_pipeline,
+    "crawl": bench_crawl,
+    "journal": bench_journal,
+    "sync": bench_sync,
+    "store": bench_store
+}
+
+if __name__ == '__main__':
+    if not len(sys.argv[1:]):
+        parser.print_help()
+        sys.exit()
+    cli_args = parser.parse_args()
+    BENCHMARKS[cli_args.benchmark](cli_args)
@@ -0,0 +1,475 @@
+import asyncio
+import functools
+import inspect
+import typing
+import requests
+from collections import deque
+from collections.abc import Iterator
+from typing import Optional, Tuple, Iterable, Callable, Awaitable, AsyncIterator, Any
+from .csfd_scraper import CsfdScraper, UserRatingsSyncWalk, last_page_of, fan_out_result
+from .csfd_utils import ParserBackends
+from .csfd_objects import *
+from .csfd_session import Timeout, CsfdSession, make_response, cache_response
+from .csfd_cache import CsfdDocumentCache, CsfdDiskCache, canonical_url
+from .csfd_rate_limiter import CsfdRateLimiter
+from .csfd_single_flight import AsyncCsfdSingleFlight
+from .csfd_store import CsfdStore
+from .csfd_journal import CsfdJournal
+from .csfd_watermarks import CsfdWatermarkStore
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+def request_key(method: str, u: str, params: Optional[dict] = None) -> Tuple:
+    return method, u, None if not params else tuple(sorted(params.items()))
+
+class AsyncCsfdSession:
+    """Pooled keep-alive asyncio HTTP session, can be shared between multiple AsyncCsfdScraper instances"""
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        keep_alive: bool = True,
+        headers: Optional[dict] = None,
+        timeout: Timeout = 30,
+        disk_cache: Optional[CsfdDiskCache] = None,
+        rate_limiter: Optional[CsfdRateLimiter] = None
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError("AsyncCsfdSession requires aiohttp, install it with `pip install x-csfd-scraper[async]`")
+
+        self.disk_cache: Optional[CsfdDiskCache] = disk_cache
+        self.rate_limiter: Optional[CsfdRateLimiter] = rate_limiter
+        self.pool_size: int = pool_size
+        self.keep_alive: bool = keep_alive
+        self.timeout: Timeout = timeout
+        self.headers: dict = dict(CsfdSession.DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+
+        # NOTE: aiohttp.ClientSession has to be created inside of a running event loop
+        self.__session: Optional["aiohttp.ClientSession"] = None
+
+    def __client_timeout(self) -> "aiohttp.ClientTimeout":
+        if isinstance(self.timeout, tuple):
+            return aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    def __get_session(self) -> "aiohttp.ClientSession":
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, force_close=not self.keep_alive)
+            self.__session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=self.__client_timeout()
+            )
+        return self.__session
+
+    async def request(self, method: str, u: str, params: Optional[dict] = None) -> requests.Response:
+        use_disk_cache = self.disk_cache is not None and method == "GET"
+        cached = self.disk_cache.lookup(u, params) if use_disk_cache else None
+        if cached is not None and cached.is_fresh:
+            return make_response(u, 200, cached.body)
+
+        headers = cached.get_conditional_headers() if cached is not None else None
+        response = await self.__send(method, u, params, headers)
+        if use_disk_cache:
+            return cache_response(self.disk_cache, u, params, cached, response.status_code, response.content, response.headers)
+        return response
+
+    async def __send_once(self, method: str, u: str, params: Optional[dict], headers: Optional[dict]) -> requests.Response:
+        async with self.__get_session().request(method, u, params=params, headers=headers) as response:
+            content = await response.read()
+            return make_response(str(response.url), response.status, content, dict(response.headers))
+
+    async def __send(self, method: str, u: str, params: Optional[dict], headers: Optional[dict]) -> requests.Response:
+        if self.rate_limiter is None:
+            return await self.__send_once(method, u, params, headers)
+
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.rate_limiter.reserve())
+            response = await self.__send_once(method, u, params, headers)
+            if response.status_code not in self.rate_limiter.RETRY_STATUS_CODES:
+                self.rate_limiter.on_success()
+                return response
+            if attempt >= self.rate_limiter.max_retries:
+                return response
+            self.rate_limiter.on_throttled(self.rate_limiter.get_retry_delay(attempt, response.headers.get("Retry-After", None)))
+            attempt += 1
+
+    async def close(self) -> None:
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+class CsfdFetchNeeded(Exception):
+    """Raised by CsfdReplaySession when a response has not been fetched yet"""
+
+    def __init__(self, method: str, u: str, params: Optional[dict] = None):
+        super().__init__("Response not fetched yet: " + u)
+        self.method = method
+        self.u = u
+        self.params = params
+
+class CsfdReplaySession:
+    """Serves responses fetched beforehand by AsyncCsfdScraper to the wrapped CsfdScraper"""
+
+    def __init__(self, session: Optional[AsyncCsfdSession] = None) -> None:
+        self.session: Optional[AsyncCsfdSession] = session
+        self.responses: dict = {}
+
+    @property
+    def disk_cache(self) -> Optional[CsfdDiskCache]:
+        return None if self.session is None else self.session.disk_cache
+
+    def request(self, method: str, u: str, params: Optional[dict] = None) -> requests.Response:
+        key = request_key(method, u, params)
+        if key not in self.responses:
+            raise CsfdFetchNeeded(method, u, params)
+        return self.responses.pop(key)
+
+def mirror_method(name: str):
+    func = getattr(CsfdScraper, name)
+
+    @functools.wraps(func)
+    async def coroutine(self, *args, **kwargs):
+        return await self.run(name, *args, **kwargs)
+
+    return coroutine
+
+def is_iterator_method(member) -> bool:
+    # NOTE: generators (and methods returning one) of CsfdScraper run in its threads, they can't be replayed
+    if inspect.isgeneratorfunction(member):
+        return True
+    return typing.get_origin(inspect.signature(member).return_annotation) is Iterator
+
+def mirror_public_methods(cls):
+    for name, member in inspect.getmembers(CsfdScraper):
+        if name.startswith("_") or not callable(member) or name in cls.__dict__ or is_iterator_method(member):
+            continue
+        if isinstance(inspect.getattr_static(CsfdScraper, name), staticmethod):
+            setattr(cls, name, staticmethod(member))
+        else:
+            setattr(cls, name, mirror_method(name))
+    return cls
+
+@mirror_public_methods
+class AsyncCsfdScraper:
+    """Asyncio variant of CsfdScraper, every public method of CsfdScraper is available as a coroutine,
+    the methods yielding records (batches, iterated pages) are async generators"""
+
+    # NOTE: the wrapped CsfdScraper runs with a CsfdReplaySession, every time it asks for a response
+    # that wasn't fetched yet, the response is awaited and the (synchronous) method is run again,
+    # so the url building and parsing is shared with CsfdScraper and csfd_parsers
+
+    def __init__(
+        self,
+        session: Optional[AsyncCsfdSession] = None,
+        cache: Optional[CsfdDocumentCache] = None,
+        single_flight: Optional[AsyncCsfdSingleFlight] = None,
+        backend: ParserBackends = ParserBackends.BS4,
+        memory_bounded: bool = False,
+        store: Optional[CsfdStore] = None
+    ) -> None:
+        self.__session = AsyncCsfdSession() if session is None else session
+        self.__single_flight = AsyncCsfdSingleFlight() if single_flight is None else single_flight
+        self.__replay = CsfdReplaySession(self.__session)
+        self.__scraper = CsfdScraper(self.__replay, cache, backend=backend, memory_bounded=memory_bounded, store=store)
+
+    def get_session(self) -> AsyncCsfdSession:
+        return self.__session
+
+    def get_cache(self) -> CsfdDocumentCache:
+        return self.__scraper.get_cache()
+
+    def get_single_flight(self) -> AsyncCsfdSingleFlight:
+        return self.__single_flight
+
+    def get_last_url(self):
+        return self.__scraper.get_last_url()
+
+    def get_opened_pages(self):
+        return self.__scraper.get_opened_pages()
+
+    def get_store(self):
+        return self.__scraper.get_store()
+
+    def is_memory_bounded(self) -> bool:
+        return self.__scraper.is_memory_bounded()
+
+    async def run(self, name: str, *args, **kwargs):
+        method = getattr(self.__scraper, name)
+        fetched = []
+        try:
+            while True:
+                try:
+                    return method(*args, **kwargs)
+                except CsfdFetchNeeded as need:
+                    # NOTE: tasks waiting for the same page share one fetch, the first one to rerun parses it
+                    # and puts it to the document cache, so the others usually don't even use their response
+                    response = await self.__single_flight.do(
+                        (need.method, canonical_url(need.u, need.params)),
+                        lambda: self.__session.request(need.method, need.u, need.params)
+                    )
+                    key = request_key(need.method, need.u, need.params)
+                    self.__replay.responses[key] = response
+                    fetched.append(key)
+        finally:
+            for key in fetched:
+                self.__replay.responses.pop(key, None)
+
+    async def __iter_pages(self, fetch: Callable[[int], Awaitable[Any]], items: Callable[[Any], list], prefetch: int) -> AsyncIterator[Any]:
+        # NOTE: the same windowing as CsfdScraper.__iter_pages, with tasks instead of threads
+        first = await fetch(1)
+        for item in items(first):
+            yield item
+        if not first.has_next_page:
+            return
+
+        last_page = last_page_of(first, items)
+        next_page = 2
+        pending = deque()
+
+        def submit() -> None:
+            nonlocal next_page
+            while len(pending) < prefetch and (last_page is None or next_page <= last_page):
+                pending.append(asyncio.ensure_future(fetch(next_page)))
+                next_page += 1
+
+        try:
+            submit()
+            while pending:
+                page = await pending.popleft()
+                if page.has_next_page and not pending and last_page is not None:
+                    last_page = None
+                if page.has_next_page:
+                    submit()
+                for item in items(page):
+                    yield item
+                if not page.has_next_page:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    """Yields UserRating of all the pages, the next `prefetch` pages are fetched in the background"""
+    def iter_user_ratings(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserRatingsSorts = UserRatingsSorts.BY_NEWLY_ADDED,
+        prefetch: int = 4
+    ) -> AsyncIterator[UserRating]:
+        fetch = lambda page: self.run("user_ratings", uid, mtype, origin, genre, sort, page)
+        return self.__iter_pages(fetch, lambda x: x.ratings, prefetch)
+
+    """Yields UserReview of all the pages, the next `prefetch` pages are fetched in the background"""
+    def iter_user_reviews(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserReviewsSorts = UserReviewsSorts.BY_NEWLY_ADDED,
+        prefetch: int = 4
+    ) -> AsyncIterator[UserReview]:
+        fetch = lambda page: self.run("user_reviews", uid, mtype, origin, genre, sort, page)
+        return self.__iter_pages(fetch, lambda x: x.reviews, prefetch)
+
+    async def __fan_out(self, fetch: Callable[[int], Awaitable[Any]], items: Callable[[Any], list], workers: int, retries: int) -> FanOutResult:
+        # NOTE: the same as CsfdScraper.__fan_out, at most `workers` pages are fetched at once
+        semaphore = asyncio.Semaphore(workers)
+        urls = []
+
+        async def fetch_page(page: int):
+            async with semaphore:
+                result = await fetch(page)
+                # NOTE: run() returns right after the synchronous method, so no other task changed the last url
+                urls.append(self.get_last_url())
+                return result
+
+        for attempt in range(retries + 1):
+            first = await fetch_page(1)
+            last_page = last_page_of(first, items)
+            if last_page is None:
+                pages = [first]
+                while pages[-1].has_next_page:
+                    pages.append(await fetch_page(len(pages) + 1))
+            else:
+                pages = [first] + list(await asyncio.gather(*[fetch_page(x) for x in range(2, last_page + 1)]))
+            result = fan_out_result(pages, items, attempt + 1)
+            if result.is_consistent():
+                break
+            for u in urls:
+                self.get_cache().invalidate(u)
+            urls.clear()
+        return result
+
+    async def __batch(
+        self,
+        get: Callable[[int], Awaitable[PrintableObject]],
+        ids: Iterable[int],
+        workers: int,
+        ordered: bool,
+        journal: Optional[CsfdJournal] = None,
+        kind: Optional[str] = None
+    ) -> AsyncIterator[BatchResult]:
+        # NOTE: the same as CsfdScraper.__batch, with tasks instead of threads, at most `workers` ids are fetched at once
+        semaphore = asyncio.Semaphore(workers)
+
+        async def fetch(xid: int) -> BatchResult:
+            async with semaphore:
+                try:
+                    return BatchResult({"id": xid, "result": await get(xid)})
+                except Exception as err:
+                    return BatchResult({"id": xid, "error": f"{type(err).__name__}: {err}"}, err)
+
+        def finish(result: BatchResult) -> None:
+            # NOTE: called once the caller asks for the next result, so the previous one was handled
+            if result.is_ok():
+                journal.complete(kind, result.id)
+            else:
+                journal.fail(kind, result.id)
+            journal.maybe_compact()
+
+        ids = iter(ids) if journal is None else (x for x in ids if not journal.is_finished(kind, x))
+        pending = deque()
+
+        def submit(count: int) -> None:
+            for xid in ids:
+                pending.append(asyncio.ensure_future(fetch(xid)))
+                count -= 1
+                if count <= 0:
+                    break
+
+        try:
+            # NOTE: keep only a bounded window of ids in flight, so a huge iterable isn't consumed at once
+            submit(workers * 2)
+            while pending:
+                if ordered:
+                    result = await pending.popleft()
+                    yield result
+                    if journal is not None:
+                        finish(result)
+                    submit(1)
+                    continue
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.remove(task)
+                    yield task.result()
+                    if journal is not None:
+                        finish(task.result())
+                submit(len(done))
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if journal is not None:
+                journal.flush()
+
+    """Yields BatchResult for every id (in the given order or in order of completion), errors don't abort the batch,
+    with a journal the ids completed (or failed) in a previous run are skipped and the handled ones are written to it"""
+    def movies(
+        self,
+        mids: Iterable[int],
+        workers: int = 8,
+        ordered: bool = True,
+        fields: Optional[Iterable[str]] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> AsyncIterator[BatchResult]:
+        return self.__batch(lambda mid: self.movie(mid, fields), mids, workers, ordered, journal, "movie")
+
+    """Yields BatchResult for every id (in the given order or in order of completion), errors don't abort the batch,
+    with a journal the ids completed (or failed) in a previous run are skipped and the handled ones are written to it"""
+    def creators(
+        self,
+        cids: Iterable[int],
+        workers: int = 8,
+        ordered: bool = True,
+        sort: CreatorFilmographySorts = CreatorFilmographySorts.BY_NEWEST,
+        fields: Optional[Iterable[str]] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> AsyncIterator[BatchResult]:
+        return self.__batch(lambda cid: self.creator(cid, sort, fields), cids, workers, ordered, journal, "creator")
+
+    """Yields BatchResult for every id (in the given order or in order of completion), errors don't abort the batch,
+    with a journal the ids completed (or failed) in a previous run are skipped and the handled ones are written to it"""
+    def users(
+        self,
+        uids: Iterable[int],
+        workers: int = 8,
+        ordered: bool = True,
+        fields: Optional[Iterable[str]] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> AsyncIterator[BatchResult]:
+        return self.__batch(lambda uid: self.user(uid, fields), uids, workers, ordered, journal, "user")
+
+    """Ratings added since the watermark (newest first) and the new watermark, see CsfdScraper.sync_user_ratings"""
+    async def sync_user_ratings(self, uid: int, watermark: Optional[UserRatingsWatermark] = None) -> UserRatingsDelta:
+        # NOTE: the walk is driven from here, a rerun of the synchronous walk after every fetched page
+        # would read all the previous pages again (and refetch those evicted from the document cache)
+        walk = UserRatingsSyncWalk(uid, watermark)
+        while walk.add_page(await self.sync_user_ratings_page(uid, walk.next_page)):
+            pass
+        return walk.delta()
+
+    """Yields BatchResult of UserRatingsDelta for every user (from the watermark in the store),
+    the new watermark has to be stored by the caller once the delta is handled (store.put(uid, delta.watermark))"""
+    def sync_users_ratings(
+        self,
+        uids: Iterable[int],
+        store: CsfdWatermarkStore,
+        workers: int = 8,
+        ordered: bool = False
+    ) -> AsyncIterator[BatchResult]:
+        return self.__batch(lambda uid: self.sync_user_ratings(uid, store.get(uid)), uids, workers, ordered)
+
+    """Fetches page 1, then all the other pages at once (the count is known from the total),
+    the result tells about duplicates and gaps caused by ratings added or removed during the crawl"""
+    async def fan_out_user_ratings(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserRatingsSorts = UserRatingsSorts.BY_NEWLY_ADDED,
+        workers: int = 8,
+        retries: int = 1
+    ) -> FanOutResult:
+        fetch = lambda page: self.run("user_ratings", uid, mtype, origin, genre, sort, page)
+        return await self.__fan_out(fetch, lambda x: x.ratings, workers, retries)
+
+    """Fetches page 1, then all the other pages at once (the count is known from the total),
+    the result tells about duplicates and gaps caused by reviews added or removed during the crawl"""
+    async def fan_out_user_reviews(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserReviewsSorts = UserReviewsSorts.BY_NEWLY_ADDED,
+        workers: int = 8,
+        retries: int = 1
+    ) -> FanOutResult:
+        fetch = lambda page: self.run("user_reviews", uid, mtype, origin, genre, sort, page)
+        return await self.__fan_out(fetch, lambda x: x.reviews, workers, retries)
+
+    async def close(self) -> None:
+        await self.__session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
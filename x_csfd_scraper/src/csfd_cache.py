@@ -0,0 +1,301 @@
+import re
+import time
+import zlib
+import sqlite3
+import threading
+from enum import Enum
+from collections import OrderedDict
+from typing import Optional, Dict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+def canonical_url(u: str, params: Optional[dict] = None) -> str:
+    parts = urlsplit(u)
+    path = parts.path.rstrip("/") or "/"
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(k, str(v)) for k, v in (params or {}).items() if v is not None]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+class CsfdDocumentCache:
+    """Thread-safe LRU cache of parsed documents keyed by canonical url, bounded by entry count and/or approximate byte size"""
+
+    def __init__(self, max_entries: Optional[int] = 32, max_bytes: Optional[int] = None) -> None:
+        self.max_entries: Optional[int] = max_entries
+        self.max_bytes: Optional[int] = max_bytes
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self.__entries: OrderedDict = OrderedDict()
+        self.__bytes: int = 0
+        self.__lock = threading.Lock()
+
+    def get(self, u: str):
+        key = canonical_url(u)
+        with self.__lock:
+            entry = self.__entries.get(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, u: str, document, size: int) -> None:
+        key = canonical_url(u)
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__bytes -= old[1]
+            self.__entries[key] = (document, size)
+            self.__bytes += size
+            self.__evict()
+
+    def invalidate(self, u: str) -> bool:
+        key = canonical_url(u)
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is None:
+                return False
+            self.__bytes -= old[1]
+            return True
+
+    def __is_over_limit(self) -> bool:
+        if self.max_entries is not None and len(self.__entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.__bytes > self.max_bytes
+
+    def __evict(self) -> None:
+        while self.__entries and self.__is_over_limit():
+            _, (_, size) = self.__entries.popitem(last=False)
+            self.__bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.__entries),
+                "bytes": self.__bytes,
+            }
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+class CachePageFamilies(Enum):
+    """Page families with separate time-to-live in CsfdDiskCache"""
+
+    MOVIE        = "movie"
+    CREATOR      = "creator"
+    USER         = "user"
+    USER_RATINGS = "user_ratings"
+    USER_REVIEWS = "user_reviews"
+    LEADERBOARDS = "leaderboards"
+    NEWS         = "news"
+    DVDS         = "dvds"
+    BLURAYS      = "blurays"
+    AUTOCOMPLETE = "autocomplete"
+    SEARCH       = "search"
+    OTHER        = "other"
+
+    @classmethod
+    def get_by_url(cls, u: str):
+        path = urlsplit(u).path
+        for pattern, family in CACHE_PAGE_FAMILIES_PATTERNS:
+            if pattern.match(path):
+                return family
+        return cls.OTHER
+
+CACHE_PAGE_FAMILIES_PATTERNS = [
+    (re.compile(r"^/film/"), CachePageFamilies.MOVIE),
+    (re.compile(r"^/tvurce/"), CachePageFamilies.CREATOR),
+    (re.compile(r"^/uzivatel/[^/]+/hodnoceni"), CachePageFamilies.USER_RATINGS),
+    (re.compile(r"^/uzivatel/[^/]+/recenze"), CachePageFamilies.USER_REVIEWS),
+    (re.compile(r"^/uzivatele?/"), CachePageFamilies.USER),
+    (re.compile(r"^/zebricky/"), CachePageFamilies.LEADERBOARDS),
+    (re.compile(r"^/novinky/"), CachePageFamilies.NEWS),
+    (re.compile(r"^/dvd/"), CachePageFamilies.DVDS),
+    (re.compile(r"^/bluray/"), CachePageFamilies.BLURAYS),
+    (re.compile(r"^/api/autocomplete/"), CachePageFamilies.AUTOCOMPLETE),
+    (re.compile(r"^/(hledat|podrobne-vyhledavani)/"), CachePageFamilies.SEARCH),
+]
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+class CsfdCachedResponse:
+    def __init__(self, body: bytes, etag: Optional[str], last_modified: Optional[str], is_fresh: bool) -> None:
+        self.body: bytes = body
+        self.etag: Optional[str] = etag
+        self.last_modified: Optional[str] = last_modified
+        self.is_fresh: bool = is_fresh
+
+    def can_revalidate(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    def get_conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class CsfdDiskCache:
+    """Persistent (SQLite) cache of compressed response bodies keyed by url and query params, with TTL per page family"""
+
+    # NOTE: ttl in seconds, None means the page never expires, 0 means the page family isn't cached at all
+    DEFAULT_TTLS: Dict[CachePageFamilies, Optional[int]] = {
+        CachePageFamilies.MOVIE: DAY,
+        CachePageFamilies.CREATOR: DAY,
+        CachePageFamilies.USER: HOUR,
+        CachePageFamilies.USER_RATINGS: HOUR,
+        CachePageFamilies.USER_REVIEWS: HOUR,
+        CachePageFamilies.LEADERBOARDS: DAY,
+        CachePageFamilies.NEWS: HOUR,
+        CachePageFamilies.DVDS: DAY,
+        CachePageFamilies.BLURAYS: DAY,
+        CachePageFamilies.AUTOCOMPLETE: 7 * DAY,
+        CachePageFamilies.SEARCH: HOUR,
+        CachePageFamilies.OTHER: HOUR,
+    }
+
+    def __init__(self, path: str, ttls: Optional[Dict[CachePageFamilies, Optional[int]]] = None, compress_level: int = 6) -> None:
+        self.path: str = path
+        self.ttls: Dict[CachePageFamilies, Optional[int]] = dict(self.DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.compress_level: int = compress_level
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.revalidations: int = 0
+        self.not_modified: int = 0
+
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                family TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        # NOTE: databases created before validators were stored
+        columns = [row[1] for row in self.__db.execute("PRAGMA table_info(responses)")]
+        for column in ["etag", "last_modified"]:
+            if column not in columns:
+                self.__db.execute(f"ALTER TABLE responses ADD COLUMN {column} TEXT")
+        self.__db.commit()
+
+    def get_ttl(self, u: str) -> Optional[int]:
+        return self.ttls.get(CachePageFamilies.get_by_url(u), None)
+
+    def is_cacheable(self, u: str) -> bool:
+        return self.get_ttl(u) != 0
+
+    def lookup(self, u: str, params: Optional[dict] = None) -> Optional[CsfdCachedResponse]:
+        """Returns the stored response even if it's expired, so it can be revalidated"""
+        ttl = self.get_ttl(u)
+        if ttl == 0:
+            return None
+        with self.__lock:
+            row = self.__db.execute(
+                "SELECT stored_at, body, etag, last_modified FROM responses WHERE key = ?",
+                (canonical_url(u, params),)
+            ).fetchone()
+            # NOTE: expired entries (see expire) are revalidated even if the page never expires
+            is_fresh = row is not None and row[0] > 0 and (ttl is None or row[0] + ttl >= time.time())
+            if is_fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if row is None:
+            return None
+        return CsfdCachedResponse(zlib.decompress(row[1]), row[2], row[3], is_fresh)
+
+    def get(self, u: str, params: Optional[dict] = None) -> Optional[bytes]:
+        cached = self.lookup(u, params)
+        return cached.body if cached is not None and cached.is_fresh else None
+
+    def put(
+        self,
+        u: str,
+        params: Optional[dict],
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> None:
+        if not self.is_cacheable(u):
+            return
+        compressed = zlib.compress(body, self.compress_level)
+        with self.__lock:
+            self.__db.execute(
+                "INSERT OR REPLACE INTO responses (key, family, stored_at, body, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?)",
+                (canonical_url(u, params), CachePageFamilies.get_by_url(u).value, time.time(), compressed, etag, last_modified)
+            )
+            self.__db.commit()
+
+    def revalidated(self, u: str, params: Optional[dict], not_modified: bool) -> None:
+        with self.__lock:
+            self.revalidations += 1
+            if not_modified:
+                self.not_modified += 1
+                self.__db.execute(
+                    "UPDATE responses SET stored_at = ? WHERE key = ?",
+                    (time.time(), canonical_url(u, params))
+                )
+                self.__db.commit()
+
+    def expire(self, u: str, params: Optional[dict] = None) -> None:
+        """The stored response is kept, but the next request of the url revalidates it"""
+        with self.__lock:
+            self.__db.execute("UPDATE responses SET stored_at = 0 WHERE key = ?", (canonical_url(u, params),))
+            self.__db.commit()
+
+    def purge_expired(self) -> int:
+        purged = 0
+        now = time.time()
+        with self.__lock:
+            for family, ttl in self.ttls.items():
+                if ttl is None:
+                    continue
+                cursor = self.__db.execute(
+                    "DELETE FROM responses WHERE family = ? AND stored_at + ? < ?",
+                    (family.value, ttl, now)
+                )
+                purged += cursor.rowcount
+            self.__db.commit()
+        return purged
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__db.execute("DELETE FROM responses")
+            self.__db.commit()
+
+    def stats(self) -> dict:
+        with self.__lock:
+            entries, size = self.__db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "not_modified": self.not_modified,
+                "not_modified_ratio": self.not_modified / self.revalidations if self.revalidations else 0.0,
+                "entries": entries,
+                "bytes": size,
+            }
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__db.close()
@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, List, Dict, Iterable, Iterator, Callable
+from .csfd_objects import PrintableObject, Movie, Creator
+from .csfd_scraper import CsfdScraper
+from .csfd_frontier import CRAWL_KINDS, CsfdFrontier
+from .csfd_journal import CsfdJournal
+
+# <editor-fold desc="EXPANSIONS">
+def movie_creator_ids(movie: Movie) -> Iterator[int]:
+    for creators in (movie.creators or {}).values():
+        for creator in creators:
+            yield creator["id"]
+
+def movie_reviewer_ids(movie: Movie) -> Iterator[int]:
+    for review in (movie.reviews or {}).get("items", []):
+        yield review["author_id"]
+
+def creator_movie_ids(creator: Creator) -> Iterator[int]:
+    # NOTE: section -> table -> year -> movies (with their episodes)
+    for tables in (creator.filmography or {}).values():
+        for years in tables.values():
+            for movies in years.values():
+                for movie in movies:
+                    yield movie["id"]
+                    for episode in movie.get("episodes", []):
+                        yield episode["id"]
+
+class CsfdCrawlRule:
+    """Queues the IDs of `target` records found in the `field` of every crawled `source` record"""
+
+    def __init__(self, source: str, target: str, field: str, extract: Callable[[PrintableObject], Iterable[int]]) -> None:
+        self.source: str = source
+        self.target: str = target
+        self.field: str = field
+        self.extract: Callable[[PrintableObject], Iterable[int]] = extract
+
+DEFAULT_CRAWL_RULES: List[CsfdCrawlRule] = [
+    CsfdCrawlRule("movie", "creator", "creators", movie_creator_ids),
+    CsfdCrawlRule("movie", "user", "reviews", movie_reviewer_ids),
+    CsfdCrawlRule("creator", "movie", "filmography", creator_movie_ids),
+]
+# </editor-fold>
+
+class CsfdCrawler:
+    """Crawls movies, creators and users from seed IDs, following the crawl rules,
+    fetches go through the scraper (and the rate limiter of its session), parsed records are passed to a sink"""
+
+    def __init__(
+        self,
+        scraper: Optional[CsfdScraper] = None,
+        rules: Optional[List[CsfdCrawlRule]] = None,
+        fields: Optional[Dict[str, Optional[List[str]]]] = None,
+        workers: int = 8,
+        frontier: Optional[CsfdFrontier] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> None:
+        # fields - kind -> fields to parse (None = all), the fields the rules read are always added
+        # journal - queued, completed and failed IDs are written to it, a crawl with the same journal resumes the frontier
+        self.scraper: CsfdScraper = CsfdScraper(memory_bounded=True) if scraper is None else scraper
+        self.rules: List[CsfdCrawlRule] = DEFAULT_CRAWL_RULES if rules is None else rules
+        self.workers: int = workers
+        self.journal: Optional[CsfdJournal] = journal
+        if journal is not None:
+            self.frontier: CsfdFrontier = journal.frontier
+        else:
+            self.frontier: CsfdFrontier = CsfdFrontier() if frontier is None else frontier
+        self.fields: Dict[str, Optional[List[str]]] = {}
+        for kind, kind_fields in (fields or {}).items():
+            if kind_fields is None:
+                self.fields[kind] = None
+                continue
+            needed = [x.field for x in self.rules if x.source == kind and x.field not in kind_fields]
+            self.fields[kind] = list(kind_fields) + needed
+
+        self.fetched: Dict[str, int] = {kind: 0 for kind in CRAWL_KINDS}
+        self.failed: Dict[str, int] = {kind: 0 for kind in CRAWL_KINDS}
+
+    def push(self, kind: str, xid: int) -> bool:
+        if self.journal is not None:
+            return self.journal.queue(kind, xid)
+        return self.frontier.push(kind, xid)
+
+    def seed(self, kind: str, ids: Iterable[int]) -> "CsfdCrawler":
+        """Seeds already seen (e.g. in a resumed crawl) are ignored"""
+        for xid in ids:
+            self.push(kind, xid)
+        return self
+
+    def fetch(self, kind: str, xid: int) -> PrintableObject:
+        return getattr(self.scraper, kind)(xid, fields=self.fields.get(kind, None))
+
+    def expand(self, kind: str, record: PrintableObject) -> int:
+        """Queues the IDs the rules find in the record, returns how many were new"""
+        queued = 0
+        for rule in self.rules:
+            if rule.source == kind:
+                queued += sum(self.push(rule.target, xid) for xid in rule.extract(record))
+        return queued
+
+    def run(
+        self,
+        sink: Callable[[str, PrintableObject], None],
+        limit: Optional[int] = None,
+        on_error: Optional[Callable[[str, int, Exception], None]] = None
+    ) -> dict:
+        """Crawls until the frontier is empty (or `limit` records were fetched), returns the stats"""
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {}
+        started = 0
+        try:
+            while True:
+                # NOTE: only a bounded window is in flight, the rest of the frontier stays compact
+                while len(pending) < self.workers * 2 and (limit is None or started < limit):
+                    item = self.frontier.pop()
+                    if item is None:
+                        break
+                    pending[executor.submit(self.fetch, *item)] = item
+                    started += 1
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, xid = pending.pop(future)
+                    try:
+                        record = future.result()
+                    except Exception as err:
+                        self.failed[kind] += 1
+                        if on_error is not None:
+                            on_error(kind, xid, err)
+                        if self.journal is not None:
+                            self.journal.fail(kind, xid)
+                        continue
+                    self.fetched[kind] += 1
+                    sink(kind, record)
+                    self.expand(kind, record)
+                    # NOTE: completed only once the sink has the record and its links are queued
+                    if self.journal is not None:
+                        self.journal.complete(kind, xid)
+                if self.journal is not None:
+                    self.journal.maybe_compact(pending.values())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if self.journal is not None:
+                self.journal.flush()
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {
+            "fetched": dict(self.fetched),
+            "failed": dict(self.failed),
+            "queued": len(self.frontier),
+            "seen": {kind: len(x) for kind, x in self.frontier.seen.items()},
+            "seen_bytes": sum(x.get_size() for x in self.frontier.seen.values()),
+        }
@@ -0,0 +1,232 @@
+from array import array
+from datetime import date
+from typing import Optional, List, Dict, Iterable, Iterator, Union
+from .csfd_objects import UserRating
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def date_ordinal(value: Optional[str]) -> int:
+    """Ordinal of a "dd.mm.yyyy" date (see date.toordinal), 0 if there isn't one"""
+    if not value:
+        return 0
+    try:
+        day, month, year = value.strip().split(".")
+        return date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return 0
+
+def ordinal_date(ordinal: int) -> str:
+    return "" if ordinal <= 0 else date.fromordinal(ordinal).strftime("%d.%m.%Y")
+
+# NOTE: a missing year is stored as this in the year column, the rows and aggregates give None instead
+MISSING_YEAR = -1
+
+def year_or_none(year: int) -> Optional[int]:
+    return None if year == MISSING_YEAR else year
+
+class UserRatingsFrame:
+    """Columnar user ratings, the id, year, rating and date (as an ordinal) columns are typed arrays,
+    only the names are strings, filters and aggregates run on NumPy views of the arrays when NumPy is installed,
+    a missing year is MISSING_YEAR (-1) in the year column, but None in the rows, to_dict and the aggregates"""
+
+    # NOTE: column name -> array typecode, NumPy understands the same typecodes
+    COLUMNS: Dict[str, str] = {
+        "id": "q",
+        "year": "h",
+        "rating": "b",
+        "date": "i",
+    }
+
+    def __init__(self) -> None:
+        self.ids: array = array(self.COLUMNS["id"])
+        self.years: array = array(self.COLUMNS["year"])
+        self.ratings: array = array(self.COLUMNS["rating"])
+        self.dates: array = array(self.COLUMNS["date"])
+        self.names: List[str] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "UserRatingsFrame":
+        """Rows of (id, name, year, rating, date) as parsed by UserParser.parse_user_ratings_ratings_rows"""
+        frame = cls()
+        for row in rows:
+            frame.append(*row)
+        return frame
+
+    @classmethod
+    def from_ratings(cls, ratings: Iterable[UserRating]) -> "UserRatingsFrame":
+        return cls.from_rows((x.id, x.name, x.year, x.rating, x.date) for x in ratings)
+
+    @classmethod
+    def concat(cls, frames: Iterable["UserRatingsFrame"]) -> "UserRatingsFrame":
+        frame = cls()
+        for other in frames:
+            frame.extend(other)
+        return frame
+
+    def append(self, mid: int, name: str, year: Optional[int], rating: int, xdate: Optional[str]) -> None:
+        self.ids.append(mid)
+        self.names.append(name)
+        self.years.append(MISSING_YEAR if year is None else year)
+        self.ratings.append(rating)
+        self.dates.append(date_ordinal(xdate))
+
+    def extend(self, other: "UserRatingsFrame") -> "UserRatingsFrame":
+        self.ids.extend(other.ids)
+        self.names.extend(other.names)
+        self.years.extend(other.years)
+        self.ratings.extend(other.ratings)
+        self.dates.extend(other.dates)
+        return self
+
+    def __iadd__(self, other: "UserRatingsFrame") -> "UserRatingsFrame":
+        return self.extend(other)
+
+    def __add__(self, other: "UserRatingsFrame") -> "UserRatingsFrame":
+        return self.concat([self, other])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[UserRating, "UserRatingsFrame"]:
+        if isinstance(index, slice):
+            return self.take(range(len(self))[index])
+        return UserRating({
+            "id": self.ids[index],
+            "name": self.names[index],
+            "year": year_or_none(self.years[index]),
+            "rating": self.ratings[index],
+            "date": ordinal_date(self.dates[index])
+        })
+
+    def __iter__(self) -> Iterator[UserRating]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_ratings(self) -> List[UserRating]:
+        return list(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.ids.tolist(),
+            "name": list(self.names),
+            "year": [year_or_none(x) for x in self.years],
+            "rating": self.ratings.tolist(),
+            "date": [ordinal_date(x) for x in self.dates],
+        }
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        """Zero-copy NumPy views of the typed columns (names aren't included), a missing year is MISSING_YEAR (-1)
+        and a missing date is 0, the frame can't grow while the views are alive (BufferError)"""
+        if numpy is None:
+            raise ImportError("UserRatingsFrame.to_numpy requires numpy, install it with `pip install x-csfd-scraper[numpy]`")
+        return {
+            "id": numpy.frombuffer(self.ids, dtype=self.ids.typecode),
+            "year": numpy.frombuffer(self.years, dtype=self.years.typecode),
+            "rating": numpy.frombuffer(self.ratings, dtype=self.ratings.typecode),
+            "date": numpy.frombuffer(self.dates, dtype=self.dates.typecode),
+        }
+
+    # <editor-fold desc="FILTERS">
+    def take(self, indices: Iterable[int]) -> "UserRatingsFrame":
+        frame = UserRatingsFrame()
+        if numpy is not None:
+            indices = numpy.asarray(indices, dtype=numpy.intp)
+            for source, target in zip(self.to_numpy().values(), [frame.ids, frame.years, frame.ratings, frame.dates]):
+                target.frombytes(source[indices].tobytes())
+            frame.names = [self.names[i] for i in indices.tolist()]
+            return frame
+        for i in indices:
+            frame.append(self.ids[i], self.names[i], self.years[i], self.ratings[i], None)
+            frame.dates[-1] = self.dates[i]
+        return frame
+
+    def filter(self, mask: Iterable[bool]) -> "UserRatingsFrame":
+        """Rows where the mask (a sequence of bools or a NumPy bool array) is true"""
+        if numpy is not None:
+            return self.take(numpy.flatnonzero(numpy.asarray(mask, dtype=bool)))
+        return self.take([i for i, x in enumerate(mask) if x])
+
+    def mask(
+        self,
+        min_rating: Optional[int] = None,
+        max_rating: Optional[int] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ):
+        """Bool mask of the rows matching every given bound (inclusive), a NumPy array if NumPy is installed,
+        rows without a year don't match any year bound"""
+        bounds = [
+            ("rating", min_rating, max_rating),
+            ("year", year_from, year_to),
+            ("date", None if date_from is None else date_from.toordinal(), None if date_to is None else date_to.toordinal()),
+        ]
+        if numpy is not None:
+            columns = self.to_numpy()
+            result = numpy.ones(len(self), dtype=bool)
+            if year_from is not None or year_to is not None:
+                result &= columns["year"] != MISSING_YEAR
+            for name, low, high in bounds:
+                if low is not None:
+                    result &= columns[name] >= low
+                if high is not None:
+                    result &= columns[name] <= high
+            return result
+        columns = {"rating": self.ratings, "year": self.years, "date": self.dates}
+        result = [True] * len(self)
+        for name, low, high in bounds:
+            if low is None and high is None:
+                continue
+            for i, value in enumerate(columns[name]):
+                if (low is not None and value < low) or (high is not None and value > high):
+                    result[i] = False
+                elif name == "year" and value == MISSING_YEAR:
+                    result[i] = False
+        return result
+
+    def where(self, **bounds) -> "UserRatingsFrame":
+        """Rows matching every given bound, see mask"""
+        return self.filter(self.mask(**bounds))
+    # </editor-fold>
+
+    # <editor-fold desc="AGGREGATES">
+    def mean_rating(self) -> Optional[float]:
+        if not len(self):
+            return None
+        if numpy is not None:
+            return float(self.to_numpy()["rating"].mean())
+        return sum(self.ratings) / len(self)
+
+    def rating_counts(self) -> List[int]:
+        """How many times every rating (0 is trash, 5 is the best) was given"""
+        if numpy is not None:
+            return numpy.bincount(self.to_numpy()["rating"], minlength=6).tolist()
+        counts = [0] * 6
+        for rating in self.ratings:
+            counts[rating] += 1
+        return counts
+
+    def counts_by_year(self) -> Dict[int, int]:
+        if numpy is not None:
+            years, counts = numpy.unique(self.to_numpy()["year"], return_counts=True)
+            return {year_or_none(year): count for year, count in zip(years.tolist(), counts.tolist())}
+        counts = {}
+        for year in sorted(self.years):
+            counts[year_or_none(year)] = counts.get(year_or_none(year), 0) + 1
+        return counts
+
+    def mean_rating_by_year(self) -> Dict[int, float]:
+        if numpy is not None:
+            columns = self.to_numpy()
+            years, inverse, counts = numpy.unique(columns["year"], return_inverse=True, return_counts=True)
+            sums = numpy.bincount(inverse, weights=columns["rating"])
+            return {year_or_none(year): mean for year, mean in zip(years.tolist(), (sums / counts).tolist())}
+        sums = {}
+        for year, rating in zip(self.years, self.ratings):
+            sums.setdefault(year, []).append(rating)
+        return {year_or_none(year): sum(x) / len(x) for year, x in sorted(sums.items())}
+    # </editor-fold>
@@ -0,0 +1,161 @@
+from array import array
+from collections import deque
+from typing import Optional, List, Dict, Iterator, Tuple
+
+# NOTE: kinds of records the crawler fetches, every kind is fetched by the CsfdScraper method of the same name
+CRAWL_KINDS: List[str] = ["movie", "creator", "user"]
+
+class CsfdSeenSet:
+    """Exact set of non-negative integer IDs kept as a bitmap (one bit per ID), split into pages allocated only when used"""
+
+    PAGE_BITS: int = 1 << 16
+
+    def __init__(self, pages: Optional[Dict[int, bytearray]] = None) -> None:
+        # pages - page number -> bitmap, as returned by get_pages (for restoring a saved set)
+        self.__pages: Dict[int, bytearray] = {} if pages is None else pages
+        self.__len: int = sum(bin(int.from_bytes(x, "little")).count("1") for x in self.__pages.values())
+
+    def add(self, xid: int) -> bool:
+        """Adds the ID, returns False if it was already there"""
+        page = self.__pages.get(xid // self.PAGE_BITS, None)
+        if page is None:
+            page = self.__pages[xid // self.PAGE_BITS] = bytearray(self.PAGE_BITS // 8)
+        bit = xid % self.PAGE_BITS
+        mask = 1 << (bit & 7)
+        if page[bit >> 3] & mask:
+            return False
+        page[bit >> 3] |= mask
+        self.__len += 1
+        return True
+
+    def discard(self, xid: int) -> bool:
+        """Removes the ID, returns False if it wasn't there"""
+        if xid not in self:
+            return False
+        bit = xid % self.PAGE_BITS
+        self.__pages[xid // self.PAGE_BITS][bit >> 3] &= ~(1 << (bit & 7)) & 0xFF
+        self.__len -= 1
+        return True
+
+    def __contains__(self, xid: int) -> bool:
+        page = self.__pages.get(xid // self.PAGE_BITS, None)
+        bit = xid % self.PAGE_BITS
+        return page is not None and bool(page[bit >> 3] & (1 << (bit & 7)))
+
+    def __len__(self) -> int:
+        return self.__len
+
+    def get_size(self) -> int:
+        """Bytes held by the bitmap pages"""
+        return len(self.__pages) * self.PAGE_BITS // 8
+
+    def get_pages(self) -> Dict[int, bytearray]:
+        return self.__pages
+
+    def __iter__(self) -> Iterator[int]:
+        for number in sorted(self.__pages):
+            page = self.__pages[number]
+            for i, byte in enumerate(page):
+                if not byte:
+                    continue
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield number * self.PAGE_BITS + i * 8 + bit
+
+class CsfdIdQueue:
+    """FIFO queue of integer IDs kept in chunks of typed arrays (8 bytes per queued ID)"""
+
+    CHUNK: int = 4096
+
+    def __init__(self) -> None:
+        self.__chunks: deque = deque()
+        self.__head: int = 0
+        self.__len: int = 0
+
+    def push(self, xid: int) -> None:
+        if not self.__chunks or len(self.__chunks[-1]) >= self.CHUNK:
+            self.__chunks.append(array("q"))
+        self.__chunks[-1].append(xid)
+        self.__len += 1
+
+    def extend(self, ids: array) -> None:
+        """Pushes a whole typed array of IDs at once"""
+        for i in range(0, len(ids), self.CHUNK):
+            self.__chunks.append(ids[i:i + self.CHUNK])
+        self.__len += len(ids)
+
+    def pop(self) -> Optional[int]:
+        if not self.__len:
+            return None
+        chunk = self.__chunks[0]
+        xid = chunk[self.__head]
+        self.__head += 1
+        self.__len -= 1
+        if self.__head >= len(chunk):
+            self.__chunks.popleft()
+            self.__head = 0
+        return xid
+
+    def __len__(self) -> int:
+        return self.__len
+
+    def __iter__(self) -> Iterator[int]:
+        for i, chunk in enumerate(self.__chunks):
+            yield from chunk[self.__head if i == 0 else 0:]
+
+    def to_array(self) -> array:
+        result = array("q")
+        for i, chunk in enumerate(self.__chunks):
+            result.extend(chunk[self.__head if i == 0 else 0:])
+        return result
+
+class CsfdFrontier:
+    """Deduplicated breadth-first frontier of (kind, id), every ID is queued at most once per kind"""
+
+    def __init__(self, seen: Optional[Dict[str, CsfdSeenSet]] = None, packed: Optional[array] = None) -> None:
+        # seen, packed - a saved state, see get_packed
+        self.seen: Dict[str, CsfdSeenSet] = {kind: CsfdSeenSet() for kind in CRAWL_KINDS} if seen is None else seen
+        # NOTE: one queue for all kinds, kind and id are packed into one integer
+        self.__queue = CsfdIdQueue()
+        if packed is not None:
+            self.__queue.extend(packed)
+
+    def reset(self, packed: array) -> None:
+        """Replaces the queued IDs, see get_packed"""
+        self.__queue = CsfdIdQueue()
+        self.__queue.extend(packed)
+
+    @staticmethod
+    def pack(kind: str, xid: int) -> int:
+        return xid * len(CRAWL_KINDS) + CRAWL_KINDS.index(kind)
+
+    @staticmethod
+    def unpack(packed: int) -> Tuple[str, int]:
+        return CRAWL_KINDS[packed % len(CRAWL_KINDS)], packed // len(CRAWL_KINDS)
+
+    def push(self, kind: str, xid: int) -> bool:
+        """Queues the ID if it wasn't seen yet, returns whether it was queued"""
+        if xid is None or xid < 0 or not self.seen[kind].add(xid):
+            return False
+        self.__queue.push(self.pack(kind, xid))
+        return True
+
+    def requeue(self, kind: str, xid: int) -> None:
+        """Queues an already seen ID again"""
+        self.seen[kind].add(xid)
+        self.__queue.push(self.pack(kind, xid))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        packed = self.__queue.pop()
+        return None if packed is None else self.unpack(packed)
+
+    def __len__(self) -> int:
+        return len(self.__queue)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        for packed in self.__queue:
+            yield self.unpack(packed)
+
+    def get_packed(self) -> array:
+        """Queued (kind, id) pairs packed into integers, see pack"""
+        return self.__queue.to_array()
@@ -0,0 +1,231 @@
+import os
+import sys
+import zlib
+import struct
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, Tuple
+from .csfd_frontier import CRAWL_KINDS, CsfdSeenSet, CsfdFrontier
+
+# NOTE: every journal entry is (event, kind index, id), a torn entry at the end (after a crash) is ignored
+JOURNAL_ENTRY = struct.Struct("<BBq")
+JOURNAL_QUEUED = 0
+JOURNAL_DONE = 1
+JOURNAL_FAILED = 2
+
+# NOTE: the snapshot (zlib compressed) is the magic, then the seen, done and failed bitmaps of every kind
+# (page count, then page number and page bytes of every page) and the pending IDs (count, then the packed IDs)
+SNAPSHOT_MAGIC = b"CSFDSNAP1"
+SNAPSHOT_COUNT = struct.Struct("<q")
+
+def pack_ids(ids: array) -> bytes:
+    if sys.byteorder == "big":
+        ids = array("q", ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+def unpack_ids(content: bytes) -> array:
+    ids = array("q")
+    ids.frombytes(content)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+def pack_snapshot(sets: Iterable[Dict[str, CsfdSeenSet]], pending: array) -> bytes:
+    parts = [SNAPSHOT_MAGIC]
+    for by_kind in sets:
+        for kind in CRAWL_KINDS:
+            pages = by_kind[kind].get_pages()
+            parts.append(SNAPSHOT_COUNT.pack(len(pages)))
+            for number, page in pages.items():
+                parts.append(SNAPSHOT_COUNT.pack(number))
+                parts.append(bytes(page))
+    parts.append(SNAPSHOT_COUNT.pack(len(pending)))
+    parts.append(pack_ids(pending))
+    return b"".join(parts)
+
+def unpack_snapshot(content: bytes, sets: int) -> Tuple[list, array]:
+    """Returns `sets` dicts of kind -> CsfdSeenSet and the pending IDs"""
+    if not content.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("Not a CsfdJournal snapshot")
+    view = memoryview(content)
+    offset = len(SNAPSHOT_MAGIC)
+    page_size = CsfdSeenSet.PAGE_BITS // 8
+
+    def read_count() -> int:
+        nonlocal offset
+        value = SNAPSHOT_COUNT.unpack_from(view, offset)[0]
+        offset += SNAPSHOT_COUNT.size
+        return value
+
+    result = []
+    for _ in range(sets):
+        by_kind = {}
+        for kind in CRAWL_KINDS:
+            pages = {}
+            for _ in range(read_count()):
+                number = read_count()
+                pages[number] = bytearray(view[offset:offset + page_size])
+                offset += page_size
+                if len(pages[number]) != page_size:
+                    raise ValueError("Truncated CsfdJournal snapshot")
+            by_kind[kind] = CsfdSeenSet(pages)
+        result.append(by_kind)
+    count = read_count()
+    pending = unpack_ids(view[offset:offset + count * SNAPSHOT_COUNT.size].tobytes())
+    if len(pending) != count:
+        raise ValueError("Truncated CsfdJournal snapshot")
+    return result, pending
+
+class CsfdJournal:
+    """Append-only journal of queued, completed and failed IDs of a crawl or a batch, so a restarted crawl
+    resumes where it stopped, the journal is compacted into a snapshot (bitmaps and the pending frontier)
+    every `compact_every` entries, so restoring it reads at most that many entries,
+    delivery is at-least-once: IDs fetched but not completed when the process died are fetched again after the restart,
+    so the sink (or the handler of the batch results) has to tolerate seeing those records twice"""
+
+    def __init__(self, path: str, compact_every: int = 1_000_000, retry_failed: bool = False, sync: bool = False) -> None:
+        # path - journal file, the snapshot is stored next to it as <path>.snapshot
+        # retry_failed - the failed IDs are queued again (and not skipped by batches)
+        # sync - fsync after every completed or failed ID (survives power loss, not only a crashed process)
+        self.path: str = path
+        self.snapshot_path: str = path + ".snapshot"
+        self.compact_every: int = compact_every
+        self.sync: bool = sync
+        self.__lock = threading.RLock()
+        self.__entries: int = 0
+
+        self.frontier: CsfdFrontier = CsfdFrontier()
+        self.done: Dict[str, CsfdSeenSet] = {kind: CsfdSeenSet() for kind in CRAWL_KINDS}
+        self.failed: Dict[str, CsfdSeenSet] = {kind: CsfdSeenSet() for kind in CRAWL_KINDS}
+        self.__restore(retry_failed)
+        self.__file = open(self.path, "ab")
+
+    def __restore(self, retry_failed: bool) -> None:
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                (seen, self.done, self.failed), pending = unpack_snapshot(zlib.decompress(f.read()), 3)
+            self.frontier = CsfdFrontier(seen, pending)
+
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                content = f.read()
+            # NOTE: replaying over a newer snapshot (crash between writing it and truncating the journal) changes nothing
+            content = content[:len(content) - len(content) % JOURNAL_ENTRY.size]
+            for event, kind, xid in JOURNAL_ENTRY.iter_unpack(content):
+                if event == JOURNAL_QUEUED:
+                    self.frontier.push(CRAWL_KINDS[kind], xid)
+                elif event == JOURNAL_DONE:
+                    self.done[CRAWL_KINDS[kind]].add(xid)
+                else:
+                    self.failed[CRAWL_KINDS[kind]].add(xid)
+            self.__entries = len(content) // JOURNAL_ENTRY.size
+            with open(self.path, "r+b") as f:
+                f.truncate(len(content))
+
+        if retry_failed:
+            for kind, failed in self.failed.items():
+                for xid in failed:
+                    self.frontier.requeue(kind, xid)
+            self.failed = {kind: CsfdSeenSet() for kind in CRAWL_KINDS}
+        self.frontier.reset(self.__pending())
+
+    def __pending(self, in_flight: Iterable[Tuple[str, int]] = ()) -> array:
+        # NOTE: queued IDs (in the order they were queued) which aren't finished yet
+        pending = array("q", [CsfdFrontier.pack(*x) for x in in_flight])
+        for packed in self.frontier.get_packed():
+            kind, xid = CsfdFrontier.unpack(packed)
+            if not self.is_finished(kind, xid):
+                pending.append(packed)
+        return pending
+
+    def __write(self, event: int, kind: str, xid: int) -> None:
+        self.__file.write(JOURNAL_ENTRY.pack(event, CRAWL_KINDS.index(kind), xid))
+        self.__entries += 1
+
+    def queue(self, kind: str, xid: int) -> bool:
+        """Queues the ID in the frontier if it wasn't seen yet, returns whether it was queued"""
+        with self.__lock:
+            if not self.frontier.push(kind, xid):
+                return False
+            self.__write(JOURNAL_QUEUED, kind, xid)
+            return True
+
+    def complete(self, kind: str, xid: int) -> None:
+        with self.__lock:
+            self.done[kind].add(xid)
+            self.__write(JOURNAL_DONE, kind, xid)
+            self.flush()
+
+    def fail(self, kind: str, xid: int) -> None:
+        with self.__lock:
+            self.failed[kind].add(xid)
+            self.__write(JOURNAL_FAILED, kind, xid)
+            self.flush()
+
+    def is_done(self, kind: str, xid: int) -> bool:
+        return xid in self.done[kind]
+
+    def is_failed(self, kind: str, xid: int) -> bool:
+        return xid in self.failed[kind]
+
+    def is_finished(self, kind: str, xid: int) -> bool:
+        return xid in self.done[kind] or xid in self.failed[kind]
+
+    def get_failed(self, kind: str) -> Iterator[int]:
+        return iter(self.failed[kind])
+
+    def get_entries(self) -> int:
+        """Entries written since the last compaction"""
+        return self.__entries
+
+    def flush(self) -> None:
+        with self.__lock:
+            self.__file.flush()
+            if self.sync:
+                os.fsync(self.__file.fileno())
+
+    def compact(self, in_flight: Iterable[Tuple[str, int]] = ()) -> None:
+        """Writes the snapshot and truncates the journal, `in_flight` are IDs taken from the frontier but not finished yet"""
+        in_flight = list(in_flight)
+        with self.__lock:
+            self.flush()
+            # NOTE: the same frontier object stays, the crawler keeps a reference to it
+            self.frontier.reset(self.__pending(in_flight))
+            snapshot = pack_snapshot([self.frontier.seen, self.done, self.failed], self.frontier.get_packed())
+            with open(self.snapshot_path + ".tmp", "wb") as f:
+                f.write(zlib.compress(snapshot, 1))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.snapshot_path + ".tmp", self.snapshot_path)
+            self.__file.close()
+            self.__file = open(self.path, "wb")
+            self.__entries = 0
+            # NOTE: the in-flight IDs are pending only in the snapshot, here they are finished by complete/fail
+            for _ in in_flight:
+                self.frontier.pop()
+
+    def maybe_compact(self, in_flight: Iterable[Tuple[str, int]] = ()) -> bool:
+        if self.__entries < self.compact_every:
+            return False
+        self.compact(in_flight)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self.frontier),
+            "done": {kind: len(x) for kind, x in self.done.items()},
+            "failed": {kind: len(x) for kind, x in self.failed.items()},
+            "entries": self.__entries,
+        }
+
+    def close(self) -> None:
+        with self.__lock:
+            self.flush()
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,173 @@
+import threading
+from typing import Optional, List, Dict, Tuple, Union
+from lxml import etree, html
+
+try:
+    from cssselect import HTMLTranslator, parse
+    from cssselect.parser import CombinedSelector
+except ImportError:
+    HTMLTranslator = None
+
+# NOTE: attributes that bs4 splits into a list of values
+MULTI_VALUED_ATTRIBUTES: List[str] = ["class", "rel", "rev", "accept-charset", "headers", "accesskey", "dropzone"]
+
+# NOTE: bs4 doesn't include the text of these tags in the text of their parents
+NON_TEXT_TAGS: List[str] = ["script", "style", "template"]
+
+# NOTE: combinators are checked from the matched element towards the left side of the selector
+COMBINATOR_AXES: Dict[str, str] = {
+    " ": "ancestor::",
+    ">": "parent::",
+    "~": "preceding-sibling::",
+    "+": "preceding-sibling::*[1]/self::",
+}
+
+# NOTE: bs4 keeps whitespace-only strings as they are only inside of these tags
+PRESERVE_WHITESPACE_TAGS: List[str] = ["pre", "textarea"]
+
+def bs4_string(value: str, container: html.HtmlElement) -> str:
+    """Collapses a whitespace-only string to a single newline or space, the same way bs4 does"""
+    if value.strip():
+        return value
+    if container.tag in PRESERVE_WHITESPACE_TAGS:
+        return value
+    for ancestor in container.iterancestors(*PRESERVE_WHITESPACE_TAGS):
+        return value
+    return "\n" if "\n" in value else " "
+
+class LxmlString(str):
+    """Text node of LxmlNode, behaves like bs4.element.NavigableString for the parsers"""
+
+    name = None
+
+    @property
+    def text(self) -> str:
+        return str(self)
+
+class LxmlNode:
+    """Element of an lxml.html tree with the subset of bs4.element.Tag API used by the parsers and csfd_utils,
+    CSS selectors are translated to XPath and compiled only once for all nodes"""
+
+    SELECTORS: Dict[Tuple[str, bool], etree.XPath] = {}
+
+    __TRANSLATOR = None
+    __LOCK = threading.Lock()
+
+    def __init__(self, element: html.HtmlElement, is_document: bool = False) -> None:
+        self.element: html.HtmlElement = element
+        self.is_document: bool = is_document
+
+    @classmethod
+    def compile(cls, select: str, first: bool = False) -> etree.XPath:
+        key = (select, first)
+        xpath = cls.SELECTORS.get(key, None)
+        if xpath is None:
+            with cls.__LOCK:
+                expression = " | ".join("descendant::" + cls.__node_test(x.parsed_tree) for x in cls.__parse(select))
+                xpath = cls.SELECTORS[key] = etree.XPath(f"({expression})[1]" if first else expression)
+        return xpath
+
+    @classmethod
+    def __parse(cls, select: str) -> list:
+        if cls.__TRANSLATOR is None:
+            if HTMLTranslator is None:
+                raise ImportError("The lxml parser backend requires cssselect, install it with `pip install x-csfd-scraper[lxml]`")
+            cls.__TRANSLATOR = HTMLTranslator()
+        return parse(select)
+
+    @classmethod
+    def __node_test(cls, tree) -> str:
+        # NOTE: cssselect evaluates the selector from the context element (left to right), so an ancestor of the context
+        # can't match the left side of the selector, bs4 (soupsieve) matches every descendant against the whole document
+        if not isinstance(tree, CombinedSelector):
+            expression = cls.__TRANSLATOR.xpath(tree)
+            return expression.element + (f"[{expression.condition}]" if expression.condition else "")
+        return f"{cls.__node_test(tree.subselector)}[{COMBINATOR_AXES[tree.combinator]}{cls.__node_test(tree.selector)}]"
+
+    def __context(self):
+        # NOTE: like bs4, selecting from the document can match the root element, selecting from a tag matches only its descendants
+        return self.element.getroottree() if self.is_document else self.element
+
+    def select(self, select: str) -> List["LxmlNode"]:
+        return [LxmlNode(x) for x in self.compile(select)(self.__context())]
+
+    def select_one(self, select: str) -> Optional["LxmlNode"]:
+        found = self.compile(select, first=True)(self.__context())
+        return LxmlNode(found[0]) if found else None
+
+    @property
+    def name(self) -> str:
+        return self.element.tag
+
+    def get(self, key: str, default=None):
+        value = self.element.get(key, None)
+        if value is None:
+            return default
+        return value.split() if key in MULTI_VALUED_ATTRIBUTES else value
+
+    @property
+    def parent(self) -> Optional["LxmlNode"]:
+        parent = self.element.getparent()
+        return None if parent is None else LxmlNode(parent)
+
+    def find_parent(self, name: str) -> Optional["LxmlNode"]:
+        for parent in self.element.iterancestors(name):
+            return LxmlNode(parent)
+        return None
+
+    @property
+    def contents(self) -> List[Union["LxmlNode", LxmlString]]:
+        contents = []
+        if self.element.text:
+            contents.append(LxmlString(bs4_string(self.element.text, self.element)))
+        for child in self.element:
+            if isinstance(child.tag, str):
+                contents.append(LxmlNode(child))
+            elif child.text:
+                # NOTE: comments and processing instructions are strings in bs4
+                contents.append(LxmlString(bs4_string(child.text, self.element)))
+            if child.tail:
+                contents.append(LxmlString(bs4_string(child.tail, self.element)))
+        return contents
+
+    @property
+    def children(self):
+        return iter(self.contents)
+
+    def __strings(self, element: html.HtmlElement, is_root: bool):
+        if element.text and (is_root or element.tag not in NON_TEXT_TAGS):
+            yield bs4_string(element.text, element)
+        for child in element:
+            if isinstance(child.tag, str):
+                yield from self.__strings(child, False)
+            if child.tail:
+                yield bs4_string(child.tail, element)
+
+    def get_text(self) -> str:
+        return "".join(self.__strings(self.element, True))
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, LxmlNode) and self.element is other.element
+
+    def __hash__(self) -> int:
+        return hash(self.element)
+
+    def __repr__(self) -> str:
+        return etree.tostring(self.element, encoding="unicode", with_tail=False)
+
+# NOTE: lxml serializes the use of one parser instance, so every thread parses with its own
+HTML_PARSERS = threading.local()
+
+def get_html_parser() -> html.HTMLParser:
+    parser = getattr(HTML_PARSERS, "parser", None)
+    if parser is None:
+        parser = HTML_PARSERS.parser = html.HTMLParser(encoding="utf-8")
+    return parser
+
+def lxml_soup(content: Union[bytes, str]) -> LxmlNode:
+    parser = get_html_parser() if isinstance(content, bytes) else None
+    return LxmlNode(html.document_fromstring(content, parser=parser), is_document=True)
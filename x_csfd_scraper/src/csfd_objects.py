@@ -1,16 +1,83 @@
+import threading
+from copy import copy
 from enum import Enum
-from typing import List, Dict, Optional
-from .csfd_utils import tojson
+from typing import List, Dict, Optional, Iterable, Tuple, Any
+from .csfd_utils import tojson, RawDocument, ParserBackends
+
+class NotRequested:
+    """Value of the fields that weren't requested from the parser"""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "NOT_REQUESTED"
+
+    def __reduce__(self):
+        # NOTE: unpickled as the same singleton, so `is NOT_REQUESTED` still works
+        return "NOT_REQUESTED"
+
+NOT_REQUESTED = NotRequested()
 
 class PrintableObject:
+    # NOTE: empty, so PrintableRecord subclasses don't get a __dict__
+    __slots__ = ()
+
     args: dict = None
+    not_requested: List[str] = []
 
     def to_dict(self):
         return self.args
 
+    def set_not_requested(self, fields: Iterable[str]):
+        """Marks the fields as not requested, they are left out of the args (and to_dict)"""
+        self.not_requested = list(fields)
+        for field in self.not_requested:
+            setattr(self, field, NOT_REQUESTED)
+        return self
+
+    def is_requested(self, field: str) -> bool:
+        return field not in self.not_requested
+
     def __str__(self):
         return tojson(self.to_dict())
 
+class PrintableRecord(PrintableObject):
+    """Compact PrintableObject for high-volume results, the fields are kept only in __slots__ (no args dict, no __dict__),
+    to_dict() rebuilds the same dict (with the keys in the same order) the record was made from"""
+
+    __slots__ = ("_keys", "_extra")
+
+    # NOTE: field name -> default value, subclasses use `__slots__ = tuple(FIELDS)`
+    FIELDS: Dict[str, Any] = {}
+
+    # NOTE: (class, keys of args) -> (keys, keys without a field), the parsers build the same keys for every record,
+    # so all records of a class share one tuple of keys
+    __KEYS: Dict[Tuple[type, tuple], Tuple[tuple, tuple]] = {}
+
+    def __init__(self, args: dict) -> None:
+        keys = tuple(args)
+        shared = PrintableRecord.__KEYS.get((type(self), keys), None)
+        if shared is None:
+            shared = PrintableRecord.__KEYS.setdefault((type(self), keys), (keys, tuple(x for x in keys if x not in self.FIELDS)))
+        self._keys: tuple = shared[0]
+        self._extra: Optional[dict] = {x: args[x] for x in shared[1]} if shared[1] else None
+        for field, default in self.FIELDS.items():
+            # NOTE: a new empty list/dict for every record, like args.get(field, []) did
+            setattr(self, field, args[field] if field in args else copy(default))
+
+    @property
+    def args(self) -> dict:
+        return self.to_dict()
+
+    def to_dict(self):
+        if self._extra is None:
+            return {x: getattr(self, x) for x in self._keys}
+        return {x: self._extra[x] if x in self._extra else getattr(self, x) for x in self._keys}
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(),)
+
 class CzechEnum(Enum):
     @classmethod
     def get_by_czech_name(cls, name: str):
@@ -812,14 +879,21 @@ class Tag(AutoCompleteSearchJsonWrapper):
 
 # <editor-fold desc="ADVANCED SEARCH TYPES">
 
-class SearchedMovie(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.title: Optional[str] = args.get("title", None)
-        self.year: int = args.get("year", -1)
-        self.origins: List[str] = args.get("origins", [])
-        self.genres: List[str] = args.get("genres", [])
+class SearchedMovie(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "title": None,
+        "year": -1,
+        "origins": [],
+        "genres": [],
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    title: Optional[str]
+    year: int
+    origins: List[str]
+    genres: List[str]
 
     def get_genres(self):
         return [MovieGenres.get_by_czech_name(g) for g in self.genres]
@@ -835,13 +909,19 @@ class SearchMoviesResult(PrintableObject):
         self.has_prev_page: bool = args.get("has_prev_page", False)
         self.has_next_page: bool = args.get("has_next_page", False)
 
-class SearchedCreator(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.birth_year: int = args.get("birth_year", -1)
-        self.types: List[str] = args.get("types", [])
+class SearchedCreator(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "birth_year": -1,
+        "types": [],
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    birth_year: int
+    types: List[str]
 
     def get_types(self):
         return [CreatorTypes.get_by_czech_name(g) for g in self.types]
@@ -921,6 +1001,84 @@ class User(PrintableObject):
         self.is_currently_online: bool = args.get("is_currently_online", False)
         self.image: Optional[str] = args.get("image", None)
 
+class LazyObject(PrintableObject):
+    """Holds the fetched page and runs the sub-parser of a field the first time the field is accessed,
+    the parsed value is memoized, to_dict() parses all the remaining fields"""
+
+    # NOTE: the eager variant, pickled instead of the lazy object
+    EAGER: type = PrintableObject
+
+    def __init__(
+        self,
+        args: dict,
+        page: RawDocument,
+        parser,
+        fields_map: Dict[str, str],
+        ld_json_fields: Optional[List[str]] = None,
+        backend: ParserBackends = ParserBackends.BS4
+    ) -> None:
+        self.args: dict = dict(args)
+        self.id: int = args.get("id", -1)
+        self.url: Optional[str] = args.get("url", None)
+
+        self.__page: Optional[RawDocument] = page
+        self.__parser = parser
+        self.__fields_map: Dict[str, str] = fields_map
+        self.__ld_json_fields: List[str] = ld_json_fields or []
+        self.__backend: ParserBackends = backend
+        self.__lock = threading.RLock()
+
+    def __getattr__(self, name: str):
+        # NOTE: called only for attributes that aren't set yet, so a parsed field never gets here again
+        if name.startswith("_") or name not in self.__fields_map:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        with self.__lock:
+            if name not in self.args:
+                if self.__page is None:
+                    raise CsfdScraperDocumentReleased(f"Field '{name}' wasn't parsed before the document was released")
+                # NOTE: fields read only from ld+json don't need the document to be parsed
+                s = self.__page if name in self.__ld_json_fields else self.__page.get_soup(self.__backend)
+                self.args[name] = getattr(self.__parser, self.__fields_map[name])(s)
+            setattr(self, name, self.args[name])
+            return self.args[name]
+
+    def get_parsed_fields(self) -> List[str]:
+        return [field for field in self.__fields_map if field in self.args]
+
+    def is_released(self) -> bool:
+        return self.__page is None
+
+    def release(self):
+        """Drops the page, fields parsed so far stay available (the document cache of the scraper may still hold the page)"""
+        with self.__lock:
+            if self.__page is not None and self.__page.private:
+                self.__page.release()
+            self.__page = None
+        return self
+
+    def to_dict(self):
+        with self.__lock:
+            for field in self.__fields_map:
+                getattr(self, field)
+            # NOTE: the same order of the fields as the eager variant
+            return {"id": self.id, "url": self.url, **{field: self.args[field] for field in self.__fields_map}}
+
+    def __reduce__(self):
+        # NOTE: the page isn't picklable, so every field is parsed and the eager variant is pickled instead
+        return self.EAGER, (self.to_dict(),)
+
+class LazyMovie(LazyObject):
+    """Movie parsing every field on its first access, see CsfdScraper.lazy_movie"""
+    EAGER = Movie
+
+class LazyCreator(LazyObject):
+    """Creator parsing every field on its first access, see CsfdScraper.lazy_creator"""
+    EAGER = Creator
+
+class LazyUser(LazyObject):
+    """User parsing every field on its first access, see CsfdScraper.lazy_user"""
+    EAGER = User
+
 # </editor-fold>
 
 # <editor-fold desc="NEWS TYPES">
@@ -1030,18 +1188,29 @@ class ActiveUsers(PrintableObject):
 
 # <editor-fold desc="DVDS TYPES">
 
-class DVDMonthly(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.year: int = args.get("year", -1)
-        self.genres: List[str] = args.get("genres", [])
-        self.origins: List[str] = args.get("origins", [])
-        self.directors: List[dict] = args.get("directors", [])
-        self.actors: List[dict] = args.get("actors", [])
-        self.distributor: Optional[str] = args.get("distributor", None)
-        self.image: Optional[str] = args.get("image", None)
+class DVDMonthly(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "year": -1,
+        "genres": [],
+        "origins": [],
+        "directors": [],
+        "actors": [],
+        "distributor": None,
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    year: int
+    genres: List[str]
+    origins: List[str]
+    directors: List[dict]
+    actors: List[dict]
+    distributor: Optional[str]
+    image: Optional[str]
 
 class DVDSMonthlyByReleaseDate(PrintableObject):
     def __init__(self, args: dict):
@@ -1057,13 +1226,19 @@ class DVDSMonthlyByRating(PrintableObject):
         self.has_prev_page: bool = args.get("has_prev_page", False)
         self.has_next_page: bool = args.get("has_next_page", False)
 
-class DVDYearly(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.year: int = args.get("year", -1)
-        self.date: Optional[str] = args.get("date", None)
+class DVDYearly(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "year": -1,
+        "date": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    year: int
+    date: Optional[str]
 
 class DVDSYearlyByReleaseDate(PrintableObject):
     def __init__(self, args: dict):
@@ -1079,18 +1254,29 @@ class DVDSYearlyByRating(PrintableObject):
 
 # <editor-fold desc="DVDS TYPES">
 
-class BlurayMonthly(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.year: int = args.get("year", -1)
-        self.genres: List[str] = args.get("genres", [])
-        self.origins: List[str] = args.get("origins", [])
-        self.directors: List[dict] = args.get("directors", [])
-        self.actors: List[dict] = args.get("actors", [])
-        self.distributor: dict = args.get("distributor", {})
-        self.image: Optional[str] = args.get("image", None)
+class BlurayMonthly(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "year": -1,
+        "genres": [],
+        "origins": [],
+        "directors": [],
+        "actors": [],
+        "distributor": {},
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    year: int
+    genres: List[str]
+    origins: List[str]
+    directors: List[dict]
+    actors: List[dict]
+    distributor: dict
+    image: Optional[str]
 
 class BluraysMonthlyByReleaseDate(PrintableObject):
     def __init__(self, args: dict):
@@ -1106,14 +1292,21 @@ class BluraysMonthlyByRating(PrintableObject):
         self.has_prev_page: bool = args.get("has_prev_page", False)
         self.has_next_page: bool = args.get("has_next_page", False)
 
-class BlurayYearly(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.year: int = args.get("year", -1)
-        self.types: List[str] = args.get("types", [])
-        self.date: Optional[str] = args.get("date", None)
+class BlurayYearly(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "year": -1,
+        "types": [],
+        "date": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    year: int
+    types: List[str]
+    date: Optional[str]
 
 class BluraysYearlyByReleaseDate(PrintableObject):
     def __init__(self, args: dict):
@@ -1144,14 +1337,21 @@ class UserRatingsSorts(Enum):
     BY_RATING = "rating"
     """seřadit dle hodnocení"""
 
-class UserRating(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.year: int = args.get("year", None)
-        self.rating: int = args.get("rating", -1)
-        self.date: Optional[str] = args.get("date", None)
+class UserRating(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "year": None,
+        "rating": -1,
+        "date": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    year: int
+    rating: int
+    date: Optional[str]
 
 class UserRatings(PrintableObject):
     def __init__(self, args: dict):
@@ -1161,6 +1361,32 @@ class UserRatings(PrintableObject):
         self.has_prev_page: bool = args.get("has_prev_page", False)
         self.has_next_page: bool = args.get("has_next_page", False)
 
+class UserRatingsWatermark(PrintableObject):
+    """Newest rating (movie id and date) seen by the last sync of user ratings, see CsfdScraper.sync_user_ratings,
+    day_ids are the movie ids of all the seen ratings with the same date (the dates have no time)"""
+
+    def __init__(self, args: dict):
+        self.args: dict = args
+        self.id: int = args.get("id", -1)
+        self.date: Optional[str] = args.get("date", None)
+        self.total: int = args.get("total", -1)
+        self.day_ids: List[int] = args.get("day_ids", [])
+
+class UserRatingsDelta(PrintableObject):
+    """Ratings added since the watermark (newest first) and the new watermark"""
+
+    def __init__(self, args: dict):
+        self.args: dict = args
+        self.uid: int = args.get("uid", -1)
+        self.ratings: List[UserRating] = args.get("ratings", [])
+        self.watermark: Optional[UserRatingsWatermark] = args.get("watermark", None)
+        self.pages: int = args.get("pages", 0)
+        self.reached: bool = args.get("reached", False)
+
+    def is_full(self) -> bool:
+        """Every rating was read, there was no watermark or it wasn't found (e.g. its rating was removed)"""
+        return not self.reached
+
 # </editor-fold>
 
 # <editor-fold desc="USER REVIEWS TYPES">
@@ -1180,16 +1406,25 @@ class UserReviewsSorts(Enum):
     BY_RATING = "rating"
     """seřadit dle hodnocení"""
 
-class UserReview(PrintableObject):
-    def __init__(self, args: dict):
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.year: int = args.get("year", None)
-        self.rating: float = args.get("rating", None)
-        self.date: Optional[str] = args.get("date", None)
-        self.text: Optional[str] = args.get("text", None)
-        self.image: Optional[str] = args.get("image", None)
+class UserReview(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "name": None,
+        "year": None,
+        "rating": None,
+        "date": None,
+        "text": None,
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    name: Optional[str]
+    year: int
+    rating: float
+    date: Optional[str]
+    text: Optional[str]
+    image: Optional[str]
 
 class UserReviews(PrintableObject):
     def __init__(self, args: dict):
@@ -1203,19 +1438,31 @@ class UserReviews(PrintableObject):
 
 # <editor-fold desc="LEADERBOARDS TYPES">
 
-class LeaderboardMovie(PrintableObject):
-    def __init__(self, args: dict) -> None:
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.position: int = args.get("position", -1)
-        self.title: Optional[str] = args.get("title", None)
-        self.year: int = args.get("year", -1)
-        self.origins: List[str] = args.get("origins", [])
-        self.genres: List[str] = args.get("genres", [])
-        self.directors: List[dict] = args.get("directors", [])
-        self.actors: List[dict] = args.get("actors", [])
-        self.rating: dict = args.get("rating", {})
-        self.image: Optional[str] = args.get("image", None)
+class LeaderboardMovie(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "position": -1,
+        "title": None,
+        "year": -1,
+        "origins": [],
+        "genres": [],
+        "directors": [],
+        "actors": [],
+        "rating": {},
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    position: int
+    title: Optional[str]
+    year: int
+    origins: List[str]
+    genres: List[str]
+    directors: List[dict]
+    actors: List[dict]
+    rating: dict
+    image: Optional[str]
 
     def get_genres(self):
         return [MovieGenres.get_by_czech_name(g) for g in self.genres]
@@ -1223,19 +1470,31 @@ class LeaderboardMovie(PrintableObject):
     def get_origins(self):
         return [Origins.get_by_czech_name(o) for o in self.origins]
     
-class LeaderboardSerial(PrintableObject):
-    def __init__(self, args: dict) -> None:
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.position: int = args.get("position", -1)
-        self.title: Optional[str] = args.get("title", None)
-        self.year: int = args.get("year", -1)
-        self.origins: List[str] = args.get("origins", [])
-        self.genres: List[str] = args.get("genres", [])
-        self.directors: List[dict] = args.get("directors", [])
-        self.actors: List[dict] = args.get("actors", [])
-        self.rating: dict = args.get("rating", {})
-        self.image: Optional[str] = args.get("image", None)
+class LeaderboardSerial(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "position": -1,
+        "title": None,
+        "year": -1,
+        "origins": [],
+        "genres": [],
+        "directors": [],
+        "actors": [],
+        "rating": {},
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    position: int
+    title: Optional[str]
+    year: int
+    origins: List[str]
+    genres: List[str]
+    directors: List[dict]
+    actors: List[dict]
+    rating: dict
+    image: Optional[str]
 
     def get_genres(self):
         return [MovieGenres.get_by_czech_name(g) for g in self.genres]
@@ -1243,15 +1502,23 @@ class LeaderboardSerial(PrintableObject):
     def get_origins(self):
         return [Origins.get_by_czech_name(o) for o in self.origins]
     
-class LeaderboardPerson(PrintableObject):
-    def __init__(self, args: dict) -> None:
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.position: int = args.get("position", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.origin: Optional[str] = args.get("origin", None)
-        self.fan_count: int = args.get("fan_count", -1)
-        self.image: Optional[str] = args.get("image", None)
+class LeaderboardPerson(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "position": -1,
+        "name": None,
+        "origin": None,
+        "fan_count": -1,
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    position: int
+    name: Optional[str]
+    origin: Optional[str]
+    fan_count: int
+    image: Optional[str]
 
     def get_origin(self):
         return Origins.get_by_czech_name(self.origin)
@@ -1262,16 +1529,25 @@ class LeaderboardActors(PrintableObject):
         self.actors: List[LeaderboardPerson] = args.get("actors", [])
         self.actresses: List[LeaderboardPerson] = args.get("actresses", [])
 
-class LeaderboardPersonBestMovie(PrintableObject):
-    def __init__(self, args: dict) -> None:
-        self.args: dict = args
-        self.id: int = args.get("id", -1)
-        self.position: int = args.get("position", -1)
-        self.name: Optional[str] = args.get("name", None)
-        self.origin: Optional[str] = args.get("origin", None)
-        self.movie_count: int = args.get("movie_count", -1)
-        self.avg_rating: float = args.get("avg_rating", -1)
-        self.image: Optional[str] = args.get("image", None)
+class LeaderboardPersonBestMovie(PrintableRecord):
+    FIELDS: Dict[str, Any] = {
+        "id": -1,
+        "position": -1,
+        "name": None,
+        "origin": None,
+        "movie_count": -1,
+        "avg_rating": -1,
+        "image": None,
+    }
+    __slots__ = tuple(FIELDS)
+
+    id: int
+    position: int
+    name: Optional[str]
+    origin: Optional[str]
+    movie_count: int
+    avg_rating: float
+    image: Optional[str]
 
     def get_origin(self):
         return Origins.get_by_czech_name(self.origin)
@@ -1332,10 +1608,50 @@ class LeaderboardCustomParams(Enum):
     
 # </editor-fold>
 
+# <editor-fold desc="BATCH TYPES">
+
+class BatchResult(PrintableObject):
+    def __init__(self, args: dict, exception: Optional[Exception] = None) -> None:
+        self.args: dict = args
+        self.id: int = args.get("id", -1)
+        self.result: Optional[PrintableObject] = args.get("result", None)
+        self.error: Optional[str] = args.get("error", None)
+        self.exception: Optional[Exception] = exception
+
+    def is_ok(self) -> bool:
+        return self.exception is None
+
+class FanOutResult(PrintableObject):
+    """Records of all the pages fetched at once, in the sort order, with the shifts noticed between the pages"""
+
+    def __init__(self, args: dict) -> None:
+        self.args: dict = args
+        self.total: int = args.get("total", -1)
+        self.items: list = args.get("items", [])
+        self.pages: int = args.get("pages", 0)
+        self.duplicates: List[int] = args.get("duplicates", [])
+        self.missing: int = args.get("missing", 0)
+        self.totals: List[int] = args.get("totals", [])
+        self.passes: int = args.get("passes", 1)
+
+    def is_consistent(self) -> bool:
+        """No record was seen twice, nothing is missing and every page reported the same total"""
+        return not self.duplicates and not self.missing and len(self.totals) <= 1
+
+# </editor-fold>
+
 # <editor-fold desc="EXCEPTIONS">
 
 class CsfdScraperInvalidRequest(Exception):
     """Exception for invalid request"""
     pass
 
+class CsfdScraperInvalidField(Exception):
+    """Exception for requesting a field the parser doesn't know"""
+    pass
+
+class CsfdScraperDocumentReleased(Exception):
+    """Exception for accessing a field of a lazy object which wasn't parsed before its document was released"""
+    pass
+
 # </editor-fold>
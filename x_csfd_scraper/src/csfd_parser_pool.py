@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Iterable, Tuple, List, Dict, Type
+from .csfd_objects import PrintableObject, Movie, Creator, User
+from .csfd_parsers import MovieParser, CreatorParser, UserParser
+from .csfd_utils import ParserBackends, RawDocument
+
+# NOTE: kind -> (parser, its parse method, type of the result, fields read only from ld+json)
+PARSED_KINDS: Dict[str, Tuple[Type, str, Type[PrintableObject], List[str]]] = {
+    "movie": (MovieParser, "parse_movie_single_pass", Movie, MovieParser.LD_JSON_FIELDS),
+    "creator": (CreatorParser, "parse_creator", Creator, CreatorParser.LD_JSON_FIELDS),
+    "user": (UserParser, "parse_user", User, []),
+}
+
+# NOTE: one parser of every kind per worker process
+WORKER_PARSERS: dict = {}
+
+def parse_in_worker(
+    kind: str,
+    content: bytes,
+    xid: int,
+    fields: Optional[List[str]],
+    backend: ParserBackends
+) -> Tuple[dict, List[str]]:
+    """Runs in a worker process, returns the args of the result and its not requested fields (both plain and picklable)"""
+    parser_cls, method, _, ld_json_fields = PARSED_KINDS[kind]
+    parser = WORKER_PARSERS.get(kind, None)
+    if parser is None:
+        parser = WORKER_PARSERS[kind] = parser_cls()
+    page = RawDocument(content, backend)
+    s = page if fields is not None and all(x in ld_json_fields for x in fields) else page.get_soup(backend)
+    result = getattr(parser, method)(s, xid, fields)
+    return result.to_dict(), list(result.not_requested)
+
+class CsfdParserPool:
+    """Pool of processes parsing downloaded pages, so parsing isn't limited by the GIL of the fetching process,
+    the workers return plain dicts and the Movie/Creator/User objects are built in the calling process"""
+
+    def __init__(self, processes: Optional[int] = None) -> None:
+        # processes - number of worker processes (default=number of CPUs)
+        self.processes: Optional[int] = processes
+        self.__executor = ProcessPoolExecutor(max_workers=processes)
+
+    def submit(
+        self,
+        kind: str,
+        content: bytes,
+        xid: int,
+        fields: Optional[Iterable[str]] = None,
+        backend: ParserBackends = ParserBackends.BS4
+    ) -> Future:
+        """Future of (args, not requested fields) of the parsed page"""
+        return self.__executor.submit(parse_in_worker, kind, content, xid, None if fields is None else list(fields), backend)
+
+    def parse(
+        self,
+        kind: str,
+        content: bytes,
+        xid: int,
+        fields: Optional[Iterable[str]] = None,
+        backend: ParserBackends = ParserBackends.BS4
+    ) -> PrintableObject:
+        args, not_requested = self.submit(kind, content, xid, fields, backend).result()
+        return PARSED_KINDS[kind][2](args).set_not_requested(not_requested)
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
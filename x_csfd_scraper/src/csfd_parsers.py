@@ -1,23 +1,48 @@
-from typing import Type
+from typing import Type, Iterable, Iterator, Tuple
 from urllib.parse import urlsplit
 
 from bs4 import BeautifulSoup
 
 from .csfd_objects import *
 from .csfd_utils import *
+from .csfd_frames import UserRatingsFrame
 
 
-class CreatorParser:
-    __CREATOR_LD_JSON: Optional[dict] = None
+def check_fields(fields_map: Dict[str, str], fields: Optional[Iterable[str]]) -> List[str]:
+    """Returns the requested fields (all of them if fields is None), raises CsfdScraperInvalidField for an unknown one"""
+    requested = list(fields_map) if fields is None else list(fields)
+    for field in requested:
+        if field not in fields_map:
+            raise CsfdScraperInvalidField(f"Unknown field '{field}', available fields: {', '.join(fields_map)}")
+    return requested
 
-    def reset(self) -> None:
-        self.__CREATOR_LD_JSON = None
+def parse_fields(parser, fields_map: Dict[str, str], s: BeautifulSoup, fields: Optional[Iterable[str]]) -> Tuple[dict, List[str]]:
+    """Runs only the sub-parsers of the requested fields (all of them if fields is None),
+    returns the parsed fields and the names of the fields that weren't requested"""
+    requested = check_fields(fields_map, fields)
+    args = {field: getattr(parser, method)(s) for field, method in fields_map.items() if field in requested}
+    return args, [field for field in fields_map if field not in requested]
 
-    def parse_movie_ld_json(self, s: BeautifulSoup) -> Optional[dict]:
-        if not self.__CREATOR_LD_JSON:
-            ld_json = sel(s, ".creator-main > script")
-            self.__CREATOR_LD_JSON = {} if ld_json is None else json.loads(text(ld_json))
-        return self.__CREATOR_LD_JSON
+class CreatorParser:
+    FIELDS: Dict[str, str] = {
+        "type": "parse_creator_type",
+        "name": "parse_creator_name",
+        "age": "parse_creator_age",
+        "birth_date": "parse_creator_birth_date",
+        "birth_place": "parse_creator_birth_place",
+        "bio": "parse_creator_bio",
+        "trivia": "parse_creator_trivia",
+        "ranks": "parse_creator_ranks",
+        "gallery": "parse_creator_gallery",
+        "filmography": "parse_creator_filmography",
+        "image": "parse_creator_image",
+    }
+    # NOTE: fields read only from ld+json, which doesn't need the document to be parsed
+    LD_JSON_FIELDS: List[str] = ["type", "name", "birth_date", "birth_place"]
+
+    @staticmethod
+    def parse_movie_ld_json(s: BeautifulSoup) -> Optional[dict]:
+        return ld_json(s, ".creator-main > script")
 
     def parse_creator_type(self, s: BeautifulSoup) -> Optional[str]:
         return self.parse_movie_ld_json(s).get("@type", None)
@@ -148,22 +173,13 @@ class CreatorParser:
         img = sel(s, ".creator-profile-content img")
         return url(img.get("src")) if img else None
 
-    def parse_creator(self, s: BeautifulSoup, cid: int) -> Creator:
+    def parse_creator(self, s: BeautifulSoup, cid: int, fields: Optional[Iterable[str]] = None) -> Creator:
+        args, not_requested = parse_fields(self, self.FIELDS, s, fields)
         return Creator({
             "id": cid,
             "url": Globals.CREATORS_URL + str(cid),
-            "type": self.parse_creator_type(s),
-            "name": self.parse_creator_name(s),
-            "age": self.parse_creator_age(s),
-            "birth_date": self.parse_creator_birth_date(s),
-            "birth_place": self.parse_creator_birth_place(s),
-            "bio": self.parse_creator_bio(s),
-            "trivia": self.parse_creator_trivia(s),
-            "ranks": self.parse_creator_ranks(s),
-            "gallery": self.parse_creator_gallery(s),
-            "filmography": self.parse_creator_filmography(s),
-            "image": self.parse_creator_image(s),
-        })
+            **args
+        }).set_not_requested(not_requested)
 
 class SearchParser:
 
@@ -321,20 +337,58 @@ class SearchParser:
         })
 
 class MovieParser:
-    __MOVIE_LD_JSON: Optional[dict] = None
+    FIELDS: Dict[str, str] = {
+        "type": "parse_movie_type",
+        "title": "parse_movie_title",
+        "year": "parse_movie_year",
+        "duration": "parse_movie_duration",
+        "genres": "parse_movie_genres",
+        "origins": "parse_movie_origins",
+        "rating": "parse_movie_rating",
+        "ranks": "parse_movie_ranks",
+        "other_names": "parse_movie_other_names",
+        "creators": "parse_movie_creators",
+        "vods": "parse_movie_vods",
+        "tags": "parse_movie_tags",
+        "reviews": "parse_movie_reviews",
+        "gallery": "parse_movie_gallery",
+        "trivia": "parse_movie_trivia",
+        "premieres": "parse_movie_premieres",
+        "plot": "parse_movie_plot",
+        "cover": "parse_movie_cover",
+    }
+    # NOTE: fields read only from ld+json, which doesn't need the document to be parsed
+    LD_JSON_FIELDS: List[str] = ["type", "title", "year", "duration", "rating", "cover"]
+    # NOTE: selectors every field uses on the whole document (not on its parts), collected by parse_movie_single_pass
+    FIELD_SELECTORS: Dict[str, List[str]] = {
+        "type": [".main-movie > script"],
+        "title": [".main-movie > script"],
+        "year": [".main-movie > script"],
+        "duration": [".main-movie > script"],
+        "genres": [".genres"],
+        "origins": [".origin"],
+        "rating": [".main-movie > script"],
+        "ranks": [".film-ranking"],
+        "other_names": [".film-names li"],
+        "creators": [".creators > div"],
+        "vods": [".box-buttons > a"],
+        "tags": ["aside > section:last-child > .box-content > a"],
+        "reviews": [".box-reviews .count", ".box-reviews article"],
+        "gallery": [".gallery-item", ".gallery-item picture img"],
+        "trivia": [".article-trivia"],
+        "premieres": [".box-premieres li"],
+        "plot": [".plot-full > p", ".plots > .plots-item > p"],
+        "cover": [".main-movie > script"],
+    }
+
     __VOD_BLOCKED_HOSTS: List[str] = [
         "www.facebook.com",
         "twitter.com"
     ]
 
-    def reset(self) -> None:
-        self.__MOVIE_LD_JSON = None
-
-    def parse_movie_ld_json(self, s: BeautifulSoup) -> dict:
-        if not self.__MOVIE_LD_JSON:
-            ld_json = sel(s, ".main-movie > script")
-            self.__MOVIE_LD_JSON = {} if ld_json is None else json.loads(text(ld_json))
-        return self.__MOVIE_LD_JSON
+    @staticmethod
+    def parse_movie_ld_json(s: BeautifulSoup) -> dict:
+        return ld_json(s, ".main-movie > script")
 
     def parse_movie_type(self, s: BeautifulSoup) -> Optional[str]:
         return self.parse_movie_ld_json(s).get("@type", None)
@@ -526,31 +580,41 @@ class MovieParser:
     def parse_movie_cover(self, s: BeautifulSoup) -> Optional[str]:
         return self.parse_movie_ld_json(s).get("image", None)
 
-    def parse_movie(self, s: BeautifulSoup, mid: int) -> Movie:
+    def parse_movie(self, s: BeautifulSoup, mid: int, fields: Optional[Iterable[str]] = None) -> Movie:
+        args, not_requested = parse_fields(self, self.FIELDS, s, fields)
         return Movie({
             "id": mid,
             "url": Globals.MOVIES_URL + str(mid),
-            "type": self.parse_movie_type(s),
-            "title": self.parse_movie_title(s),
-            "year": self.parse_movie_year(s),
-            "duration": self.parse_movie_duration(s),
-            "genres": self.parse_movie_genres(s),
-            "origins": self.parse_movie_origins(s),
-            "rating": self.parse_movie_rating(s),
-            "ranks": self.parse_movie_ranks(s),
-            "other_names": self.parse_movie_other_names(s),
-            "creators": self.parse_movie_creators(s),
-            "vods": self.parse_movie_vods(s),
-            "tags": self.parse_movie_tags(s),
-            "reviews": self.parse_movie_reviews(s),
-            "gallery": self.parse_movie_gallery(s),
-            "trivia": self.parse_movie_trivia(s),
-            "premieres": self.parse_movie_premieres(s),
-            "plot": self.parse_movie_plot(s),
-            "cover": self.parse_movie_cover(s)
-        })
+            **args
+        }).set_not_requested(not_requested)
+
+    def parse_movie_single_pass(self, s: BeautifulSoup, mid: int, fields: Optional[Iterable[str]] = None) -> Movie:
+        """Same output as parse_movie, but the document is walked only once to collect the elements of all the fields"""
+        if isinstance(s, RawDocument):
+            return self.parse_movie(s, mid, fields)
+        requested = list(self.FIELDS) if fields is None else list(fields)
+        selectors = dict.fromkeys(x for field in requested for x in self.FIELD_SELECTORS.get(field, []))
+        return self.parse_movie(IndexedDocument(s, list(selectors)), mid, fields)
 
 class UserParser:
+    FIELDS: Dict[str, str] = {
+        "name": "parse_user_name",
+        "real_name": "parse_user_real_name",
+        "origin": "parse_user_origin",
+        "about": "parse_user_about",
+        "registered": "parse_user_registered",
+        "last_login": "parse_user_last_login",
+        "points": "parse_user_points",
+        "fans": "parse_user_fans",
+        "awards": "parse_user_awards",
+        "most_watched_genres": "parse_user_most_watched_genres",
+        "most_watched_types": "parse_user_most_watched_types",
+        "most_watched_origins": "parse_user_most_watched_origins",
+        "reviews": "parse_user_reviews",
+        "ratings": "parse_user_ratings",
+        "is_currently_online": "parse_user_is_currently_online",
+        "image": "parse_user_image",
+    }
 
     # USER OVERVIEW
 
@@ -681,27 +745,13 @@ class UserParser:
         img = sel(s, ".user-profile-content img")
         return url(img.get("src")) if img else None
 
-    def parse_user(self, s: BeautifulSoup, uid: int):
+    def parse_user(self, s: BeautifulSoup, uid: int, fields: Optional[Iterable[str]] = None) -> User:
+        args, not_requested = parse_fields(self, self.FIELDS, s, fields)
         return User({
             "id": uid,
             "url": Globals.USERS_URL + str(uid),
-            "name": self.parse_user_name(s),
-            "real_name": self.parse_user_real_name(s),
-            "origin": self.parse_user_origin(s),
-            "about": self.parse_user_about(s),
-            "registered": self.parse_user_registered(s),
-            "last_login": self.parse_user_last_login(s),
-            "points": self.parse_user_points(s),
-            "fans": self.parse_user_fans(s),
-            "awards": self.parse_user_awards(s),
-            "most_watched_genres": self.parse_user_most_watched_genres(s),
-            "most_watched_types": self.parse_user_most_watched_types(s),
-            "most_watched_origins": self.parse_user_most_watched_origins(s),
-            "reviews": self.parse_user_reviews(s),
-            "ratings": self.parse_user_ratings(s),
-            "is_currently_online": self.parse_user_is_currently_online(s),
-            "image": self.parse_user_image(s),
-        })
+            **args
+        }).set_not_requested(not_requested)
 
     # USER RATINGS
 
@@ -710,20 +760,33 @@ class UserParser:
         return toint(text(s, ".count"))
 
     @staticmethod
-    def parse_user_ratings_ratings_list(s: BeautifulSoup) -> List[UserRating]:
-        ratings = []
+    def parse_user_ratings_ratings_rows(s: BeautifulSoup) -> Iterator[Tuple[int, str, int, int, str]]:
+        """(id, name, year, rating, date) of every rating on the page"""
         for tr in asel(s, ".user-tab-rating table tr"):
             td_a = sel(tr, ".name a")
             stars = sel(tr, ".star-rating-only .stars").get("class")
+            yield (
+                extract_id(td_a.get("href")),
+                text(td_a),
+                toint(text(tr, ".film-title-info .info:first-child")),
+                0 if stars[1] == "trash" else int(stars[1][-1]),
+                text(tr, ".date-only")
+            )
 
-            ratings.append(UserRating({
-                "id": extract_id(td_a.get("href")),
-                "name": text(td_a),
-                "year": toint(text(tr, ".film-title-info .info:first-child")),
-                "rating": 0 if stars[1] == "trash" else int(stars[1][-1]),
-                "date": text(tr, ".date-only")
-            }))
-        return ratings
+    @staticmethod
+    def parse_user_ratings_ratings_list(s: BeautifulSoup) -> List[UserRating]:
+        return [UserRating({
+            "id": mid,
+            "name": name,
+            "year": year,
+            "rating": rating,
+            "date": xdate
+        }) for mid, name, year, rating, xdate in UserParser.parse_user_ratings_ratings_rows(s)]
+
+    @staticmethod
+    def parse_user_ratings_ratings_frame(s: BeautifulSoup) -> UserRatingsFrame:
+        """Ratings of the page straight into the columns, without UserRating objects"""
+        return UserRatingsFrame.from_rows(UserParser.parse_user_ratings_ratings_rows(s))
 
     @staticmethod
     def parse_user_ratings_ratings_has_prev_page(s: BeautifulSoup) -> bool:
@@ -0,0 +1,121 @@
+import time
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional, List
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+    if not retry_after:
+        return None
+    retry_after = retry_after.strip()
+    if retry_after.isdigit():
+        return float(retry_after)
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CsfdRateLimiter:
+    """Token bucket shared by every request of a session (optionally by every process on the host),
+    backs off on 429/503 responses and adapts the effective rate"""
+
+    RETRY_STATUS_CODES: List[int] = [429, 503]
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: int = 4,
+        min_rate: float = 0.1,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 120.0,
+        lock_path: Optional[str] = None
+    ) -> None:
+        # rate        - maximum requests per second
+        # burst       - how many requests can be made at once after a pause
+        # min_rate    - the effective rate is never lowered below this
+        # max_retries - how many times a 429/503 response is retried
+        # lock_path   - state file shared by all processes using the same path (requires fcntl)
+        if lock_path is not None and fcntl is None:
+            raise OSError("Sharing CsfdRateLimiter between processes (lock_path) requires fcntl")
+
+        self.max_rate: float = rate
+        self.burst: int = burst
+        self.min_rate: float = min_rate
+        self.max_retries: int = max_retries
+        self.backoff_base: float = backoff_base
+        self.backoff_max: float = backoff_max
+        self.lock_path: Optional[str] = lock_path
+
+        # [tokens, updated_at, effective_rate]
+        self.__state: List[float] = [float(burst), time.time(), rate]
+        self.__lock = threading.Lock()
+
+    @contextmanager
+    def __shared_state(self):
+        with self.__lock:
+            if self.lock_path is None:
+                yield self.__state
+                return
+
+            with open(self.lock_path, "a+") as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    file.seek(0)
+                    stored = file.read().split()
+                    state = [float(x) for x in stored] if len(stored) == 3 else list(self.__state)
+                    yield state
+                    file.seek(0)
+                    file.truncate()
+                    file.write(" ".join(str(x) for x in state))
+                    file.flush()
+                    self.__state = state
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def __refill(self, state: List[float]) -> None:
+        now = time.time()
+        state[0] = min(float(self.burst), state[0] + (now - state[1]) * state[2])
+        state[1] = now
+
+    def get_effective_rate(self) -> float:
+        with self.__shared_state() as state:
+            return state[2]
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds to wait before making the request"""
+        with self.__shared_state() as state:
+            self.__refill(state)
+            state[0] -= 1
+            return 0.0 if state[0] >= 0 else -state[0] / state[2]
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def get_retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def on_throttled(self, delay: float) -> None:
+        """Halves the effective rate and makes every caller wait at least `delay` seconds"""
+        with self.__shared_state() as state:
+            self.__refill(state)
+            state[2] = max(self.min_rate, state[2] / 2)
+            state[0] = min(state[0], -delay * state[2])
+
+    def on_success(self) -> None:
+        """Slowly raises the effective rate back to the maximum rate"""
+        with self.__shared_state() as state:
+            self.__refill(state)
+            state[2] = min(self.max_rate, state[2] + self.max_rate / 20)
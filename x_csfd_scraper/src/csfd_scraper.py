@@ -1,51 +1,393 @@
 import requests
+import functools
+import threading
+from collections import deque
 from datetime import datetime
 from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import List, Optional, Iterable, Iterator, Union, Callable, Any
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from .csfd_parsers import *
-
+from .csfd_session import CsfdSession
+from .csfd_cache import CsfdDocumentCache, canonical_url
+from .csfd_single_flight import CsfdSingleFlight
+from .csfd_parser_pool import CsfdParserPool
+from .csfd_journal import CsfdJournal
+from .csfd_frames import date_ordinal
+from .csfd_watermarks import CsfdWatermarkStore
+from .csfd_store import CsfdStore
+
+def last_page_of(first, items: Callable[[Any], list]) -> Optional[int]:
+    """Number of the last page computed from the total and the records of the first page, None if unknown"""
+    per_page = len(items(first))
+    if not first.has_next_page:
+        return 1
+    return -(-first.total // per_page) if per_page and first.total > 0 else None
+
+def fan_out_result(pages: list, items: Callable[[Any], list], passes: int) -> FanOutResult:
+    # NOTE: a record shifted over a page boundary is seen twice (added records) or never (removed records)
+    seen = set()
+    records = []
+    duplicates = []
+    for page in pages:
+        for record in items(page):
+            if record.id in seen:
+                duplicates.append(record.id)
+                continue
+            seen.add(record.id)
+            records.append(record)
+    totals = sorted(set(page.total for page in pages))
+    total = totals[-1] if totals else 0
+    return FanOutResult({
+        "total": total,
+        "items": records,
+        "pages": len(pages),
+        "duplicates": duplicates,
+        "missing": max(0, total - len(records)),
+        "totals": totals,
+        "passes": passes
+    })
+
+class UserRatingsSyncWalk:
+    """Pages of a user ratings sync read from the newest one until the watermark,
+    the same walk for CsfdScraper.sync_user_ratings and AsyncCsfdScraper.sync_user_ratings"""
+
+    def __init__(self, uid: int, watermark: Optional[UserRatingsWatermark]) -> None:
+        self.uid: int = uid
+        self.watermark: Optional[UserRatingsWatermark] = watermark
+        self.watermark_date: Optional[int] = None if watermark is None else date_ordinal(watermark.date)
+        self.day_ids: set = set() if watermark is None else set(watermark.day_ids)
+        self.unseen_day_ids: set = set(self.day_ids)
+        self.ratings: List[UserRating] = []
+        self.total: int = -1
+        self.pages: int = 0
+        self.reached: bool = False
+
+    @property
+    def next_page(self) -> int:
+        return self.pages + 1
+
+    def add_page(self, result: UserRatings) -> bool:
+        """Returns whether the next page has to be read"""
+        self.pages += 1
+        if self.pages == 1:
+            self.total = result.total
+        watermark = self.watermark
+        for rating in result.ratings:
+            if watermark is None:
+                self.ratings.append(rating)
+            elif date_ordinal(rating.date) < self.watermark_date:
+                self.reached = True
+                break
+            elif rating.date == watermark.date and rating.id in self.day_ids:
+                # NOTE: ratings of the watermark day without a time, the new ones are those not seen yet
+                self.unseen_day_ids.discard(rating.id)
+                if not self.unseen_day_ids:
+                    self.reached = True
+                    break
+            else:
+                self.ratings.append(rating)
+        return not self.reached and result.has_next_page
+
+    def delta(self) -> UserRatingsDelta:
+        watermark = self.watermark
+        if self.ratings:
+            newest = self.ratings[0]
+            new_day_ids = [x.id for x in self.ratings if x.date == newest.date]
+            if watermark is not None and newest.date == watermark.date:
+                new_day_ids += watermark.day_ids
+            watermark = UserRatingsWatermark({"id": newest.id, "date": newest.date, "total": self.total, "day_ids": new_day_ids})
+        elif watermark is not None:
+            watermark = UserRatingsWatermark({**watermark.args, "total": self.total})
+        return UserRatingsDelta({"uid": self.uid, "ratings": self.ratings, "watermark": watermark, "pages": self.pages, "reached": self.reached})
+
+class OpenedPages(threading.local):
+    """Pages opened by the outermost public call of a memory-bounded scraper in the current thread"""
+
+    def __init__(self) -> None:
+        self.depth: int = 0
+        self.pages: List[RawDocument] = []
+
+def release_pages_after(func):
+    @functools.wraps(func)
+    def method(self, *args, **kwargs):
+        opened = self.get_opened_pages()
+        if opened is None:
+            return func(self, *args, **kwargs)
+        opened.depth += 1
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            opened.depth -= 1
+            # NOTE: the data is already extracted into plain objects, so the documents can be destroyed
+            if opened.depth == 0:
+                for page in opened.pages:
+                    page.release()
+                opened.pages.clear()
+    return method
+
+def release_pages_after_public_methods(cls):
+    for name, member in list(cls.__dict__.items()):
+        if name.startswith(("_", "get_", "is_")) or not callable(member) or isinstance(member, staticmethod):
+            continue
+        setattr(cls, name, release_pages_after(member))
+    return cls
+
+@release_pages_after_public_methods
 class CsfdScraper:
     DEBUG: bool = False
 
-    __LAST_URL: Optional[str]            = None
-    __LAST_SOUP: Optional[BeautifulSoup] = None
-
-    __MOVIE_PARSER: MovieParser               = MovieParser()
-    __CREATOR_PARSER: CreatorParser           = CreatorParser()
-    __SEARCH_PARSER: SearchParser             = SearchParser()
-    __USER_PARSER: UserParser                 = UserParser()
-    __NEWS_PARSER: NewsParser                 = NewsParser()
-    __USERS_PARSER: UsersParser               = UsersParser()
-    __DVDS_PARSER: DvdsParser                 = DvdsParser()
-    __BLURAYS_PARSER: BluraysParser           = BluraysParser()
-    __LEADERBOARDS_PARSER: LeaderboardsParser = LeaderboardsParser()
-
-    def get_last_url(self):
-        return self.__LAST_URL
-
-    def __reset(self) -> None:
-        self.__MOVIE_PARSER.reset()
-        self.__CREATOR_PARSER.reset()
-    @staticmethod
-    def __request(func: callable, u: str, params: Optional[dict] = None) -> requests.Response:
+    def __init__(
+        self,
+        session: Optional[CsfdSession] = None,
+        cache: Optional[CsfdDocumentCache] = None,
+        single_flight: Optional[CsfdSingleFlight] = None,
+        backend: ParserBackends = ParserBackends.BS4,
+        memory_bounded: bool = False,
+        store: Optional[CsfdStore] = None
+    ) -> None:
+        # NOTE: pass the same CsfdSession to multiple scrapers to share its connection pool
+        self.__session = CsfdSession() if session is None else session
+        self.__cache = CsfdDocumentCache() if cache is None else cache
+        # NOTE: pass the same CsfdSingleFlight (with the same cache) to coalesce identical requests of multiple scrapers
+        self.__single_flight = CsfdSingleFlight() if single_flight is None else single_flight
+        self.__backend: ParserBackends = backend
+        # NOTE: memory-bounded scrapers cache only compressed pages, every call parses its own documents
+        # and destroys them when it returns, so long crawls don't keep parse trees alive
+        self.__opened_pages: Optional[OpenedPages] = OpenedPages() if memory_bounded else None
+        # NOTE: movies, creators and users are answered from the store while fresh, the scraped ones are written to it
+        self.__store: Optional[CsfdStore] = store
+
+        # NOTE: all state is per instance, the last url is also per thread, so one scraper can be used by many threads
+        self.__local = threading.local()
+
+        self.__MOVIE_PARSER: MovieParser               = MovieParser()
+        self.__CREATOR_PARSER: CreatorParser           = CreatorParser()
+        self.__SEARCH_PARSER: SearchParser             = SearchParser()
+        self.__USER_PARSER: UserParser                 = UserParser()
+        self.__NEWS_PARSER: NewsParser                 = NewsParser()
+        self.__USERS_PARSER: UsersParser               = UsersParser()
+        self.__DVDS_PARSER: DvdsParser                 = DvdsParser()
+        self.__BLURAYS_PARSER: BluraysParser           = BluraysParser()
+        self.__LEADERBOARDS_PARSER: LeaderboardsParser = LeaderboardsParser()
+
+    def get_session(self) -> CsfdSession:
+        return self.__session
+
+    def get_cache(self) -> CsfdDocumentCache:
+        return self.__cache
+
+    def get_single_flight(self) -> CsfdSingleFlight:
+        return self.__single_flight
+
+    def get_backend(self) -> ParserBackends:
+        return self.__backend
+
+    def get_last_url(self) -> Optional[str]:
+        return getattr(self.__local, "last_url", None)
+
+    def get_store(self) -> Optional[CsfdStore]:
+        return self.__store
+
+    def get_opened_pages(self) -> Optional[OpenedPages]:
+        return self.__opened_pages
+
+    def is_memory_bounded(self) -> bool:
+        return self.__opened_pages is not None
+
+    def __request(self, method: str, u: str, params: Optional[dict] = None) -> requests.Response:
         if CsfdScraper.DEBUG:
             print("Requesting: " + u)
-        response = func(u, params=params, headers={"User-Agent": "Mozilla/5.0"})
+        response = self.__session.request(method, u, params)
         if response.status_code != 200:
             raise CsfdScraperInvalidRequest("Invalid request at url: " + u)
         return response
+    def __batch(
+        self,
+        get: Callable[[int], PrintableObject],
+        ids: Iterable[int],
+        workers: int,
+        ordered: bool,
+        journal: Optional[CsfdJournal] = None,
+        kind: Optional[str] = None
+    ) -> Iterator[BatchResult]:
+        def fetch(xid: int) -> BatchResult:
+            try:
+                return BatchResult({"id": xid, "result": get(xid)})
+            except Exception as err:
+                return BatchResult({"id": xid, "error": f"{type(err).__name__}: {err}"}, err)
+
+        def finish(result: BatchResult) -> None:
+            # NOTE: called once the caller asks for the next result, so the previous one was handled
+            if result.is_ok():
+                journal.complete(kind, result.id)
+            else:
+                journal.fail(kind, result.id)
+            journal.maybe_compact()
+
+        ids = iter(ids) if journal is None else (x for x in ids if not journal.is_finished(kind, x))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = deque()
+
+        def submit(count: int) -> None:
+            for xid in ids:
+                pending.append(executor.submit(fetch, xid))
+                count -= 1
+                if count <= 0:
+                    break
+
+        try:
+            # NOTE: keep only a bounded window of ids in flight, so a huge iterable isn't consumed at once
+            submit(workers * 2)
+            while pending:
+                if ordered:
+                    result = pending.popleft().result()
+                    yield result
+                    if journal is not None:
+                        finish(result)
+                    submit(1)
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+                    if journal is not None:
+                        finish(future.result())
+                submit(len(done))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if journal is not None:
+                journal.flush()
+    def __iter_pages(self, fetch: Callable[[int], Any], items: Callable[[Any], list], prefetch: int) -> Iterator[Any]:
+        # NOTE: fetch returns a page with total and has_next_page, items returns its records
+        first = fetch(1)
+        yield from items(first)
+        if not first.has_next_page:
+            return
+
+        # NOTE: the last page is known from the first one, so nothing is fetched past it
+        last_page = last_page_of(first, items)
+        next_page = 2
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        pending = deque()
+
+        def submit() -> None:
+            nonlocal next_page
+            while len(pending) < prefetch and (last_page is None or next_page <= last_page):
+                pending.append(executor.submit(fetch, next_page))
+                next_page += 1
+
+        try:
+            # NOTE: at most `prefetch` pages are in flight (or done and waiting) besides the one being yielded
+            submit()
+            while pending:
+                page = pending.popleft().result()
+                if page.has_next_page and not pending and last_page is not None:
+                    # NOTE: the total grew since the first page
+                    last_page = None
+                if page.has_next_page:
+                    submit()
+                yield from items(page)
+                if not page.has_next_page:
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    def __fan_out(self, fetch: Callable[[int], Any], items: Callable[[Any], list], workers: int, retries: int) -> FanOutResult:
+        urls = []
+
+        def fetch_page(page: int):
+            result = fetch(page)
+            # NOTE: the last url is per thread, so it's the url of this page
+            urls.append(self.get_last_url())
+            return result
+
+        for attempt in range(retries + 1):
+            first = fetch_page(1)
+            last_page = last_page_of(first, items)
+            if last_page is None:
+                # NOTE: without a total there's nothing to fan out, the pages are chained
+                pages = [first]
+                while pages[-1].has_next_page:
+                    pages.append(fetch_page(len(pages) + 1))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    pages = [first] + list(executor.map(fetch_page, range(2, last_page + 1)))
+            result = fan_out_result(pages, items, attempt + 1)
+            if result.is_consistent():
+                break
+            # NOTE: records added or removed during the crawl shift the page boundaries, the pages are downloaded again
+            for u in urls:
+                self.__cache.invalidate(u)
+            urls.clear()
+        return result
+    # NOTE: the fetching thread only downloads the page and waits (without the GIL) for a worker process to parse it
+    def __pooled_parse(self, kind: str, u: str, xid: int, fields: Optional[Iterable[str]], pool: CsfdParserPool) -> PrintableObject:
+        # NOTE: owned, so a memory-bounded scraper doesn't keep the decompressed page in the OpenedPages of this thread,
+        # only the bytes go to the pool and the page is dropped right after
+        page = self.__get_page(u, owned=True)
+        content = page.content
+        if page.private:
+            page.release()
+        del page
+        return pool.parse(kind, content, xid, fields, self.__backend)
+    def __pooled_movie(self, mid: int, fields: Optional[Iterable[str]], pool: CsfdParserPool) -> Movie:
+        return self.__stored(
+            lambda: self.__store.get_movie(mid, fields),
+            lambda: self.__pooled_parse("movie", Globals.MOVIES_URL + str(mid), mid, fields, pool)
+        )
+    def __pooled_creator(self, cid: int, sort: CreatorFilmographySorts, fields: Optional[Iterable[str]], pool: CsfdParserPool) -> Creator:
+        u = url_prepare(Globals.CREATORS_SORT_URL, {"cid": cid, "sort": sort.value})
+        return self.__stored(
+            lambda: self.__store.get_creator(cid, fields, sort=sort.value),
+            lambda: self.__pooled_parse("creator", u, cid, fields, pool),
+            sort.value
+        )
+    def __pooled_user(self, uid: int, fields: Optional[Iterable[str]], pool: CsfdParserPool) -> User:
+        return self.__stored(
+            lambda: self.__store.get_user(uid, fields),
+            lambda: self.__pooled_parse("user", Globals.USERS_URL + str(uid), uid, fields, pool)
+        )
+    def __stored(self, lookup: Callable[[], Optional[PrintableObject]], scrape: Callable[[], PrintableObject], sort: Optional[str] = None):
+        if self.__store is None:
+            return scrape()
+        record = lookup()
+        if record is None:
+            record = scrape()
+            self.__store.add(record, sort)
+        return record
     def __get(self, *args) -> requests.Response:
-        return self.__request(requests.get, *args)
+        return self.__request("GET", *args)
     def __post(self, *args) -> requests.Response:
-        return self.__request(requests.post, *args)
+        return self.__request("POST", *args)
 
     # <editor-fold desc="SOUPS">
+    def __get_page(self, u: str, owned: bool = False) -> RawDocument:
+        # NOTE: the cache holds downloaded pages, every page is parsed (once per backend) only when a field needs the document
+        self.__local.last_url = u
+        page = self.__cache.get(u)
+        if page is None:
+            page = self.__single_flight.do(canonical_url(u), lambda: self.__fetch_page(u))
+        if isinstance(page, CompressedPage):
+            page = page.open(self.__backend)
+            # NOTE: owned pages (of lazy objects) are released by their owner
+            if self.__opened_pages is not None and not owned:
+                self.__opened_pages.pages.append(page)
+        return page
+    def __fetch_page(self, u: str) -> Union[RawDocument, CompressedPage]:
+        content = self.__get(u).content
+        page = CompressedPage(content) if self.__opened_pages is not None else RawDocument(content, self.__backend)
+        self.__cache.put(u, page, len(page) if isinstance(page, CompressedPage) else len(content))
+        return page
     def __get_soup(self, u: str) -> BeautifulSoup:
-        if u == self.__LAST_URL and self.__LAST_SOUP:
-            return self.__LAST_SOUP
-        self.__LAST_URL = u
-        self.__LAST_SOUP = soup(self.__get(u).content)
-        return self.__LAST_SOUP
+        return self.__get_page(u).get_soup(self.__backend)
+    def __get_fields_soup(self, u: str, fields: Optional[Iterable[str]], ld_json_fields: List[str]):
+        page = self.__get_page(u)
+        if fields is not None and all(x in ld_json_fields for x in fields):
+            return page
+        return page.get_soup(self.__backend)
+    def __get_movie_page(self, mid: int) -> RawDocument:
+        return self.__get_page(Globals.MOVIES_URL + str(mid))
+    def __get_creator_page(self, cid: int) -> RawDocument:
+        return self.__get_page(Globals.CREATORS_URL + str(cid))
     def __get_movie_soup(self, mid: int) -> BeautifulSoup:
         return self.__get_soup(Globals.MOVIES_URL + str(mid))
     def __get_creator_soup(self, cid: int) -> BeautifulSoup:
@@ -104,15 +446,24 @@ class CsfdScraper:
             sort: UserRatingsSorts,
             page: int
     ) -> BeautifulSoup:
+        return self.__get_soup(self.__get_user_ratings_url(uid, mtype, origin, genre, sort, page))
+    @staticmethod
+    def __get_user_ratings_url(
+            uid: int,
+            mtype: Optional[MovieTypes],
+            origin: Optional[Origins],
+            genre: Optional[MovieGenres],
+            sort: UserRatingsSorts,
+            page: int
+    ) -> str:
         u = url_prepare(Globals.USER_RATINGS_URL, {"uid": uid})
-        u = url_params(u, {
+        return url_params(u, {
             "type": None if mtype is None else mtype.value,
             "origin": None if origin is None else origin.value[0],
             "genre": None if genre is None else genre.value[0],
             "sort": sort.value,
             "page": page
         })
-        return self.__get_soup(u)
     def __get_user_reviews_soup(
             self,
             uid: int,
@@ -189,6 +540,55 @@ class CsfdScraper:
 
     # </editor-fold>
 
+    # <editor-fold desc="BATCH">
+    """Yields BatchResult for every id (in the given order or in order of completion), errors don't abort the batch,
+    with a parser_pool the pages are parsed by its worker processes,
+    with a journal the ids completed (or failed) in a previous run are skipped and the handled ones are written to it"""
+    def movies(
+        self,
+        mids: Iterable[int],
+        workers: int = 8,
+        ordered: bool = True,
+        fields: Optional[Iterable[str]] = None,
+        parser_pool: Optional[CsfdParserPool] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> Iterator[BatchResult]:
+        if parser_pool is not None:
+            return self.__batch(lambda mid: self.__pooled_movie(mid, fields, parser_pool), mids, workers, ordered, journal, "movie")
+        return self.__batch(lambda mid: self.movie(mid, fields), mids, workers, ordered, journal, "movie")
+    """Yields BatchResult for every id (in the given order or in order of completion), errors don't abort the batch,
+    with a parser_pool the pages are parsed by its worker processes,
+    with a journal the ids completed (or failed) in a previous run are skipped and the handled ones are written to it"""
+    def creators(
+        self,
+        cids: Iterable[int],
+        workers: int = 8,
+        ordered: bool = True,
+        sort: CreatorFilmographySorts = CreatorFilmographySorts.BY_NEWEST,
+        fields: Optional[Iterable[str]] = None,
+        parser_pool: Optional[CsfdParserPool] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> Iterator[BatchResult]:
+        if parser_pool is not None:
+            return self.__batch(lambda cid: self.__pooled_creator(cid, sort, fields, parser_pool), cids, workers, ordered, journal, "creator")
+        return self.__batch(lambda cid: self.creator(cid, sort, fields), cids, workers, ordered, journal, "creator")
+    """Yields BatchResult for every id (in the given order or in order of completion), errors don't abort the batch,
+    with a parser_pool the pages are parsed by its worker processes,
+    with a journal the ids completed (or failed) in a previous run are skipped and the handled ones are written to it"""
+    def users(
+        self,
+        uids: Iterable[int],
+        workers: int = 8,
+        ordered: bool = True,
+        fields: Optional[Iterable[str]] = None,
+        parser_pool: Optional[CsfdParserPool] = None,
+        journal: Optional[CsfdJournal] = None
+    ) -> Iterator[BatchResult]:
+        if parser_pool is not None:
+            return self.__batch(lambda uid: self.__pooled_user(uid, fields, parser_pool), uids, workers, ordered, journal, "user")
+        return self.__batch(lambda uid: self.user(uid, fields), uids, workers, ordered, journal, "user")
+    # </editor-fold>
+
     # <editor-fold desc="SEARCH">
     def search_movies(self, options: dict, page: int = 1, sort: MovieSorts = MovieSorts.BY_RATING_COUNT) -> SearchMoviesResult:
         params = {}
@@ -360,25 +760,39 @@ class CsfdScraper:
     # </editor-fold>
 
     # <editor-fold desc="MOVIE">
-    def movie(self, mid: int) -> Movie:
-        return self.__MOVIE_PARSER.parse_movie(self.__get_movie_soup(mid), mid)
+    """Parses only the given fields (see MovieParser.FIELDS), the others are NOT_REQUESTED"""
+    def movie(self, mid: int, fields: Optional[Iterable[str]] = None) -> Movie:
+        def scrape() -> Movie:
+            s = self.__get_fields_soup(Globals.MOVIES_URL + str(mid), fields, MovieParser.LD_JSON_FIELDS)
+            return self.__MOVIE_PARSER.parse_movie_single_pass(s, mid, fields)
+        return self.__stored(lambda: self.__store.get_movie(mid, fields), scrape)
+    """Fetches the page now, every field is parsed on its first access (see LazyObject.release)"""
+    def lazy_movie(self, mid: int) -> LazyMovie:
+        return LazyMovie(
+            {"id": mid, "url": Globals.MOVIES_URL + str(mid)},
+            self.__get_page(Globals.MOVIES_URL + str(mid), owned=True),
+            self.__MOVIE_PARSER,
+            MovieParser.FIELDS,
+            MovieParser.LD_JSON_FIELDS,
+            self.__backend
+        )
     @staticmethod
     def movie_url(mid: int) -> str:
         return Globals.MOVIES_URL + str(mid)
     def movie_type(self, mid: int) -> Optional[str]:
-        return self.__MOVIE_PARSER.parse_movie_type(self.__get_movie_soup(mid))
+        return self.__MOVIE_PARSER.parse_movie_type(self.__get_movie_page(mid))
     def movie_title(self, mid: int) -> Optional[str]:
-        return self.__MOVIE_PARSER.parse_movie_title(self.__get_movie_soup(mid))
+        return self.__MOVIE_PARSER.parse_movie_title(self.__get_movie_page(mid))
     def movie_year(self, mid: int) -> int:
-        return self.__MOVIE_PARSER.parse_movie_year(self.__get_movie_soup(mid))
+        return self.__MOVIE_PARSER.parse_movie_year(self.__get_movie_page(mid))
     def movie_duration(self, mid: int) -> Optional[str]:
-        return self.__MOVIE_PARSER.parse_movie_duration(self.__get_movie_soup(mid))
+        return self.__MOVIE_PARSER.parse_movie_duration(self.__get_movie_page(mid))
     def movie_genres(self, mid: int) -> List[str]:
         return self.__MOVIE_PARSER.parse_movie_genres(self.__get_movie_soup(mid))
     def movie_origins(self, mid: int) -> List[str]:
         return self.__MOVIE_PARSER.parse_movie_origins(self.__get_movie_soup(mid))
     def movie_rating(self, mid: int) -> dict:
-        return self.__MOVIE_PARSER.parse_movie_rating(self.__get_movie_soup(mid))
+        return self.__MOVIE_PARSER.parse_movie_rating(self.__get_movie_page(mid))
     def movie_ranks(self, mid: int) -> dict:
         return self.__MOVIE_PARSER.parse_movie_ranks(self.__get_movie_soup(mid))
     def movie_other_names(self, mid: int) -> dict:
@@ -406,25 +820,44 @@ class CsfdScraper:
     def movie_plot(self, mid: int) -> dict:
         return self.__MOVIE_PARSER.parse_movie_plot(self.__get_movie_soup(mid))
     def movie_cover(self, mid: int) -> Optional[str]:
-        return self.__MOVIE_PARSER.parse_movie_cover(self.__get_movie_soup(mid))
+        return self.__MOVIE_PARSER.parse_movie_cover(self.__get_movie_page(mid))
     # </editor-fold>
 
     # <editor-fold desc="CREATOR">
-    def creator(self, cid: int, sort: CreatorFilmographySorts = CreatorFilmographySorts.BY_NEWEST) -> Creator:
-        return self.__CREATOR_PARSER.parse_creator(self.__get_creator_sort_soup(cid, sort), cid)
+    """Parses only the given fields (see CreatorParser.FIELDS), the others are NOT_REQUESTED"""
+    def creator(
+        self,
+        cid: int,
+        sort: CreatorFilmographySorts = CreatorFilmographySorts.BY_NEWEST,
+        fields: Optional[Iterable[str]] = None
+    ) -> Creator:
+        def scrape() -> Creator:
+            u = url_prepare(Globals.CREATORS_SORT_URL, {"cid": cid, "sort": sort.value})
+            return self.__CREATOR_PARSER.parse_creator(self.__get_fields_soup(u, fields, CreatorParser.LD_JSON_FIELDS), cid, fields)
+        return self.__stored(lambda: self.__store.get_creator(cid, fields, sort=sort.value), scrape, sort.value)
+    """Fetches the page now, every field is parsed on its first access (see LazyObject.release)"""
+    def lazy_creator(self, cid: int, sort: CreatorFilmographySorts = CreatorFilmographySorts.BY_NEWEST) -> LazyCreator:
+        return LazyCreator(
+            {"id": cid, "url": Globals.CREATORS_URL + str(cid)},
+            self.__get_page(url_prepare(Globals.CREATORS_SORT_URL, {"cid": cid, "sort": sort.value}), owned=True),
+            self.__CREATOR_PARSER,
+            CreatorParser.FIELDS,
+            CreatorParser.LD_JSON_FIELDS,
+            self.__backend
+        )
     @staticmethod
     def creator_url(cid: int) -> str:
         return Globals.CREATORS_URL + str(cid)
     def creator_type(self, cid: int) -> Optional[str]:
-        return self.__CREATOR_PARSER.parse_creator_type(self.__get_creator_soup(cid))
+        return self.__CREATOR_PARSER.parse_creator_type(self.__get_creator_page(cid))
     def creator_name(self, cid: int) -> Optional[str]:
-        return self.__CREATOR_PARSER.parse_creator_name(self.__get_creator_soup(cid))
+        return self.__CREATOR_PARSER.parse_creator_name(self.__get_creator_page(cid))
     def creator_age(self, cid: int) -> int:
         return self.__CREATOR_PARSER.parse_creator_age(self.__get_creator_soup(cid))
     def creator_birth_date(self, cid: int) -> Optional[str]:
-        return self.__CREATOR_PARSER.parse_creator_birth_date(self.__get_creator_soup(cid))
+        return self.__CREATOR_PARSER.parse_creator_birth_date(self.__get_creator_page(cid))
     def creator_birth_place(self, cid: int) -> Optional[str]:
-        return self.__CREATOR_PARSER.parse_creator_birth_place(self.__get_creator_soup(cid))
+        return self.__CREATOR_PARSER.parse_creator_birth_place(self.__get_creator_page(cid))
     def creator_bio(self, cid: int) -> Optional[str]:
         return self.__CREATOR_PARSER.parse_creator_bio(self.__get_creator_soup(cid))
     def creator_trivia_count(self, cid: int) -> int:
@@ -444,8 +877,21 @@ class CsfdScraper:
     # </editor-fold>
 
     # <editor-fold desc="USER">
-    def user(self, uid: int) -> User:
-        return self.__USER_PARSER.parse_user(self.__get_user_soup(uid), uid)
+    """Parses only the given fields (see UserParser.FIELDS), the others are NOT_REQUESTED"""
+    def user(self, uid: int, fields: Optional[Iterable[str]] = None) -> User:
+        return self.__stored(
+            lambda: self.__store.get_user(uid, fields),
+            lambda: self.__USER_PARSER.parse_user(self.__get_user_soup(uid), uid, fields)
+        )
+    """Fetches the page now, every field is parsed on its first access (see LazyObject.release)"""
+    def lazy_user(self, uid: int) -> LazyUser:
+        return LazyUser(
+            {"id": uid, "url": Globals.USERS_URL + str(uid)},
+            self.__get_page(Globals.USERS_URL + str(uid), owned=True),
+            self.__USER_PARSER,
+            UserParser.FIELDS,
+            backend=self.__backend
+        )
     @staticmethod
     def user_url(uid: int) -> str:
         return Globals.USERS_URL + str(uid)
@@ -496,7 +942,23 @@ class CsfdScraper:
         sort: UserRatingsSorts = UserRatingsSorts.BY_NEWLY_ADDED,
         page: int = 1
     ) -> UserRatings:
-        return self.__USER_PARSER.parse_user_ratings_ratings(
+        ratings = self.__USER_PARSER.parse_user_ratings_ratings(
+            self.__get_user_ratings_soup(uid, mtype, origin, genre, sort, page)
+        )
+        if self.__store is not None:
+            self.__store.put_user_ratings(uid, ratings.ratings)
+        return ratings
+    """Ratings of the page as UserRatingsFrame, frames of more pages can be joined by UserRatingsFrame.concat"""
+    def user_ratings_frame(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserRatingsSorts = UserRatingsSorts.BY_NEWLY_ADDED,
+        page: int = 1
+    ) -> UserRatingsFrame:
+        return self.__USER_PARSER.parse_user_ratings_ratings_frame(
             self.__get_user_ratings_soup(uid, mtype, origin, genre, sort, page)
         )
     def user_reviews(
@@ -508,9 +970,91 @@ class CsfdScraper:
         sort: UserReviewsSorts = UserReviewsSorts.BY_NEWLY_ADDED,
         page: int = 1
     ) -> UserReviews:
-        return self.__USER_PARSER.parse_user_reviews_reviews(
+        reviews = self.__USER_PARSER.parse_user_reviews_reviews(
             self.__get_user_reviews_soup(uid, mtype, origin, genre, sort, page)
         )
+        if self.__store is not None:
+            self.__store.put_user_reviews(uid, reviews.reviews)
+        return reviews
+    """Yields UserRating of all the pages, the next `prefetch` pages are fetched in the background"""
+    def iter_user_ratings(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserRatingsSorts = UserRatingsSorts.BY_NEWLY_ADDED,
+        prefetch: int = 4
+    ) -> Iterator[UserRating]:
+        fetch = lambda page: self.user_ratings(uid, mtype, origin, genre, sort, page)
+        return self.__iter_pages(fetch, lambda x: x.ratings, prefetch)
+    """Yields UserReview of all the pages, the next `prefetch` pages are fetched in the background"""
+    def iter_user_reviews(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserReviewsSorts = UserReviewsSorts.BY_NEWLY_ADDED,
+        prefetch: int = 4
+    ) -> Iterator[UserReview]:
+        fetch = lambda page: self.user_reviews(uid, mtype, origin, genre, sort, page)
+        return self.__iter_pages(fetch, lambda x: x.reviews, prefetch)
+    """Fetches page 1, then all the other pages at once (the count is known from the total),
+    the result tells about duplicates and gaps caused by ratings added or removed during the crawl"""
+    def fan_out_user_ratings(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserRatingsSorts = UserRatingsSorts.BY_NEWLY_ADDED,
+        workers: int = 8,
+        retries: int = 1
+    ) -> FanOutResult:
+        fetch = lambda page: self.user_ratings(uid, mtype, origin, genre, sort, page)
+        return self.__fan_out(fetch, lambda x: x.ratings, workers, retries)
+    """Fetches page 1, then all the other pages at once (the count is known from the total),
+    the result tells about duplicates and gaps caused by reviews added or removed during the crawl"""
+    def fan_out_user_reviews(
+        self,
+        uid: int,
+        mtype: Optional[MovieTypes] = None,
+        origin: Optional[Origins] = None,
+        genre: Optional[MovieGenres] = None,
+        sort: UserReviewsSorts = UserReviewsSorts.BY_NEWLY_ADDED,
+        workers: int = 8,
+        retries: int = 1
+    ) -> FanOutResult:
+        fetch = lambda page: self.user_reviews(uid, mtype, origin, genre, sort, page)
+        return self.__fan_out(fetch, lambda x: x.reviews, workers, retries)
+    """One page (BY_NEWLY_ADDED) of sync_user_ratings, always downloaded again, a page in the CsfdDiskCache
+    of the session is revalidated even within its TTL, so the sync never reads outdated ratings"""
+    def sync_user_ratings_page(self, uid: int, page: int) -> UserRatings:
+        u = self.__get_user_ratings_url(uid, None, None, None, UserRatingsSorts.BY_NEWLY_ADDED, page)
+        self.__cache.invalidate(u)
+        disk_cache = getattr(self.__session, "disk_cache", None)
+        if disk_cache is not None:
+            disk_cache.expire(u)
+        return self.user_ratings(uid, page=page)
+    """Ratings added since the watermark (newest first) and the new watermark, the pages (BY_NEWLY_ADDED)
+    are read only until all the ratings of the watermark day, or an older rating, are found,
+    without a watermark every page is read"""
+    def sync_user_ratings(self, uid: int, watermark: Optional[UserRatingsWatermark] = None) -> UserRatingsDelta:
+        walk = UserRatingsSyncWalk(uid, watermark)
+        while walk.add_page(self.sync_user_ratings_page(uid, walk.next_page)):
+            pass
+        return walk.delta()
+    """Yields BatchResult of UserRatingsDelta for every user (from the watermark in the store),
+    the new watermark has to be stored by the caller once the delta is handled (store.put(uid, delta.watermark))"""
+    def sync_users_ratings(
+        self,
+        uids: Iterable[int],
+        store: CsfdWatermarkStore,
+        workers: int = 8,
+        ordered: bool = False
+    ) -> Iterator[BatchResult]:
+        return self.__batch(lambda uid: self.sync_user_ratings(uid, store.get(uid)), uids, workers, ordered)
 
     # </editor-fold>
 
@@ -0,0 +1,103 @@
+import requests
+from typing import Optional, Tuple, Union
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from .csfd_cache import CsfdDiskCache, CsfdCachedResponse
+from .csfd_rate_limiter import CsfdRateLimiter
+
+Timeout = Union[None, float, Tuple[float, float]]
+
+def make_response(u: str, status_code: int, content: bytes, headers: Optional[dict] = None) -> requests.Response:
+    response = requests.Response()
+    response.url = u
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = content
+    return response
+
+def cache_response(
+    disk_cache: CsfdDiskCache,
+    u: str,
+    params: Optional[dict],
+    cached: Optional[CsfdCachedResponse],
+    status_code: int,
+    content: bytes,
+    headers: dict
+) -> requests.Response:
+    headers = CaseInsensitiveDict(headers)
+    if cached is not None and cached.can_revalidate():
+        disk_cache.revalidated(u, params, status_code == 304)
+    if status_code == 304 and cached is not None:
+        # NOTE: not modified, the stored body is served (and parsed) as if it was just downloaded
+        return make_response(u, 200, cached.body, headers)
+    if status_code == 200:
+        disk_cache.put(u, params, content, headers.get("ETag", None), headers.get("Last-Modified", None))
+    return make_response(u, status_code, content, headers)
+
+class CsfdSession:
+    """Pooled keep-alive HTTP session, can be shared between multiple CsfdScraper instances"""
+
+    DEFAULT_HEADERS: dict = {"User-Agent": "Mozilla/5.0"}
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        keep_alive: bool = True,
+        headers: Optional[dict] = None,
+        timeout: Timeout = 30,
+        disk_cache: Optional[CsfdDiskCache] = None,
+        rate_limiter: Optional[CsfdRateLimiter] = None
+    ) -> None:
+        self.disk_cache: Optional[CsfdDiskCache] = disk_cache
+        self.rate_limiter: Optional[CsfdRateLimiter] = rate_limiter
+        self.pool_size: int = pool_size
+        self.keep_alive: bool = keep_alive
+        self.timeout: Timeout = timeout
+        self.headers: dict = dict(self.DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+
+        self.__session = requests.Session()
+        self.__session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+
+    def request(self, method: str, u: str, params: Optional[dict] = None) -> requests.Response:
+        use_disk_cache = self.disk_cache is not None and method == "GET"
+        cached = self.disk_cache.lookup(u, params) if use_disk_cache else None
+        if cached is not None and cached.is_fresh:
+            return make_response(u, 200, cached.body)
+
+        headers = cached.get_conditional_headers() if cached is not None else None
+        response = self.__send(method, u, params, headers)
+        if use_disk_cache:
+            return cache_response(self.disk_cache, u, params, cached, response.status_code, response.content, response.headers)
+        return response
+
+    def __send(self, method: str, u: str, params: Optional[dict], headers: Optional[dict]) -> requests.Response:
+        if self.rate_limiter is None:
+            return self.__session.request(method, u, params=params, headers=headers, timeout=self.timeout)
+
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            response = self.__session.request(method, u, params=params, headers=headers, timeout=self.timeout)
+            if response.status_code not in self.rate_limiter.RETRY_STATUS_CODES:
+                self.rate_limiter.on_success()
+                return response
+            if attempt >= self.rate_limiter.max_retries:
+                return response
+            # NOTE: the next acquire (of any caller sharing the limiter) waits for the backoff delay
+            self.rate_limiter.on_throttled(self.rate_limiter.get_retry_delay(attempt, response.headers.get("Retry-After", None)))
+            attempt += 1
+
+    def close(self) -> None:
+        self.__session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from typing import Callable, Awaitable, Hashable, Dict, Any
+
+class CsfdSingleFlightCall:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+
+class CsfdSingleFlight:
+    """Thread-safe in-flight deduplication, concurrent calls with the same key wait for the first one and share its result"""
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.coalesced: int = 0
+
+        self.__in_flight: Dict[Hashable, CsfdSingleFlightCall] = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self.__lock:
+            self.calls += 1
+            call = self.__in_flight.get(key, None)
+            is_leader = call is None
+            if is_leader:
+                call = self.__in_flight[key] = CsfdSingleFlightCall()
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.__in_flight),
+            }
+
+class AsyncCsfdSingleFlight:
+    """Asyncio variant of CsfdSingleFlight, concurrent tasks with the same key await the first one's coroutine"""
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.coalesced: int = 0
+
+        self.__in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        future = self.__in_flight.get(key, None)
+        if future is not None:
+            self.coalesced += 1
+            # NOTE: shielded, so a cancelled waiter doesn't cancel the fetch of the others
+            return await asyncio.shield(future)
+
+        future = self.__in_flight[key] = asyncio.ensure_future(fn())
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                del self.__in_flight[key]
+            else:
+                future.add_done_callback(lambda _: self.__in_flight.pop(key, None))
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.__in_flight),
+        }
@@ -0,0 +1,411 @@
+import time
+import json
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Iterable, Tuple
+from .csfd_objects import PrintableObject, Movie, Creator, User, UserRating, UserReview
+from .csfd_parsers import MovieParser, CreatorParser, UserParser, check_fields
+from .csfd_cache import DAY
+
+# NOTE: table -> (record class, fields of the parser, fields stored in their own columns), the other fields are stored as JSON
+STORE_TABLES: Dict[str, tuple] = {
+    "movies": (Movie, MovieParser.FIELDS, ["type", "title", "year", "duration", "cover"]),
+    "creators": (Creator, CreatorParser.FIELDS, ["type", "name", "age", "birth_date", "birth_place", "bio", "image"]),
+    "users": (User, UserParser.FIELDS, [
+        "name", "real_name", "origin", "about", "registered", "last_login", "points", "fans", "is_currently_online", "image"
+    ]),
+}
+
+STORE_SCHEMA: List[str] = [
+    """
+    CREATE TABLE IF NOT EXISTS movies (
+        id INTEGER PRIMARY KEY,
+        url TEXT,
+        type TEXT,
+        title TEXT,
+        year INTEGER,
+        duration TEXT,
+        cover TEXT,
+        fields TEXT NOT NULL,
+        not_requested TEXT NOT NULL,
+        stored_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS creators (
+        id INTEGER PRIMARY KEY,
+        url TEXT,
+        type TEXT,
+        name TEXT,
+        age INTEGER,
+        birth_date TEXT,
+        birth_place TEXT,
+        bio TEXT,
+        image TEXT,
+        sort TEXT,
+        fields TEXT NOT NULL,
+        not_requested TEXT NOT NULL,
+        stored_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        url TEXT,
+        name TEXT,
+        real_name TEXT,
+        origin TEXT,
+        about TEXT,
+        registered TEXT,
+        last_login TEXT,
+        points INTEGER,
+        fans INTEGER,
+        is_currently_online INTEGER,
+        image TEXT,
+        fields TEXT NOT NULL,
+        not_requested TEXT NOT NULL,
+        stored_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS movie_creators (
+        movie_id INTEGER NOT NULL,
+        creator_id INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        name TEXT,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (movie_id, role, creator_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS movie_creators_creator ON movie_creators (creator_id)",
+    """
+    CREATE TABLE IF NOT EXISTS ratings (
+        user_id INTEGER NOT NULL,
+        movie_id INTEGER NOT NULL,
+        name TEXT,
+        year INTEGER,
+        rating INTEGER NOT NULL,
+        date TEXT,
+        stored_at REAL NOT NULL,
+        PRIMARY KEY (user_id, movie_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ratings_movie ON ratings (movie_id)",
+    """
+    CREATE TABLE IF NOT EXISTS reviews (
+        movie_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        rating REAL,
+        date TEXT,
+        text TEXT,
+        stored_at REAL NOT NULL,
+        PRIMARY KEY (movie_id, user_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS reviews_user ON reviews (user_id)",
+    """
+    CREATE TABLE IF NOT EXISTS trivia (
+        kind TEXT NOT NULL,
+        owner_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        author_id INTEGER,
+        movie_id INTEGER,
+        text TEXT,
+        PRIMARY KEY (kind, owner_id, position)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS trivia_author ON trivia (author_id)",
+]
+
+# <editor-fold desc="JSON">
+def pack_filmography(filmography: dict) -> dict:
+    # NOTE: section -> table -> [[year, movies]], JSON keys are strings only and the year is an int or None
+    return {section: {table: [[year, movies] for year, movies in years.items()] for table, years in tables.items()} for section, tables in filmography.items()}
+
+def unpack_filmography(filmography: dict) -> dict:
+    return {section: {table: {year: movies for year, movies in years} for table, years in tables.items()} for section, tables in filmography.items()}
+
+def pack_fields(args: dict, columns: List[str]) -> str:
+    fields = {k: v for k, v in args.items() if k not in columns and k not in ["id", "url"]}
+    if "filmography" in fields:
+        fields["filmography"] = pack_filmography(fields["filmography"])
+    return json.dumps(fields, ensure_ascii=False)
+
+def unpack_fields(fields: str) -> dict:
+    fields = json.loads(fields)
+    if "filmography" in fields:
+        fields["filmography"] = unpack_filmography(fields["filmography"])
+    return fields
+# </editor-fold>
+
+class CsfdStore:
+    """Persistent (SQLite) store of scraped movies, creators, users, their links, ratings, reviews and trivia,
+    a CsfdScraper with a store answers movie/creator/user from it while the stored record is fresher than max_age"""
+
+    def __init__(self, path: str = ":memory:", max_age: Optional[int] = DAY, batch_size: int = 100) -> None:
+        # max_age - in seconds, None means the stored records never expire
+        # batch_size - records added by the scraper are written in transactions of this many records
+        self.path: str = path
+        self.max_age: Optional[int] = max_age
+        self.batch_size: int = batch_size
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self.__lock = threading.RLock()
+        self.__pending: List[Tuple[PrintableObject, Optional[str]]] = []
+        self.__db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        for statement in STORE_SCHEMA:
+            self.__db.execute(statement)
+        self.__db.commit()
+
+    # <editor-fold desc="UPSERTS">
+    def add(self, record: PrintableObject, sort: Optional[str] = None) -> None:
+        """Buffers a Movie, Creator or User, the buffer is written once it has batch_size records (or on flush)"""
+        with self.__lock:
+            self.__pending.append((record, sort))
+            if len(self.__pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self.__lock:
+            pending, self.__pending = self.__pending, []
+            if pending:
+                self.__put(pending)
+
+    def put(self, records: Iterable[PrintableObject], sort: Optional[str] = None) -> None:
+        """Upserts Movie, Creator and User records in one transaction, sort is the filmography sort of the creators"""
+        self.__put([(x, sort) for x in records])
+
+    def __put(self, records: List[Tuple[PrintableObject, Optional[str]]]) -> None:
+        now = time.time()
+        with self.__lock, self.__db:
+            for record, sort in records:
+                if isinstance(record, Movie):
+                    self.__put_record("movies", record, now)
+                    if record.is_requested("creators"):
+                        self.__put_movie_creators(record)
+                    if record.is_requested("reviews"):
+                        self.__put_movie_reviews(record, now)
+                    if record.is_requested("trivia"):
+                        self.__put_trivia("movie", record.id, (record.trivia or {}).get("items", []))
+                elif isinstance(record, Creator):
+                    self.__put_record("creators", record, now, sort)
+                    if record.is_requested("trivia"):
+                        self.__put_trivia("creator", record.id, (record.trivia or {}).get("items", []))
+                elif isinstance(record, User):
+                    self.__put_record("users", record, now)
+                else:
+                    raise TypeError(f"CsfdStore can't store {type(record).__name__}")
+
+    def __put_record(self, table: str, record: PrintableObject, now: float, sort: Optional[str] = None) -> None:
+        columns = STORE_TABLES[table][2]
+        # NOTE: a record without some fields doesn't replace the stored ones, it's merged into them
+        stored = self.__read_row(table, record.id, sort) if record.not_requested else None
+        args, not_requested, stored_at = self.__merge(table, stored, record, now)
+        row = {
+            "id": record.id,
+            "url": args.get("url", None),
+            **{x: args.get(x, None) for x in columns},
+            **({"sort": sort} if table == "creators" else {}),
+            "fields": pack_fields(args, columns),
+            "not_requested": json.dumps(not_requested),
+            "stored_at": stored_at,
+        }
+        self.__db.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+            tuple(row.values())
+        )
+
+    def __put_movie_creators(self, movie: Movie) -> None:
+        self.__db.execute("DELETE FROM movie_creators WHERE movie_id = ?", (movie.id,))
+        self.__db.executemany(
+            "INSERT OR IGNORE INTO movie_creators (movie_id, creator_id, role, name, position) VALUES (?, ?, ?, ?, ?)",
+            [
+                (movie.id, creator["id"], role, creator["name"], position)
+                for role, creators in (movie.creators or {}).items()
+                for position, creator in enumerate(creators)
+            ]
+        )
+
+    def __put_movie_reviews(self, movie: Movie, now: float) -> None:
+        self.__db.executemany(
+            "INSERT OR REPLACE INTO reviews (movie_id, user_id, rating, date, text, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(movie.id, x["author_id"], x["rating"], x["date"], x["text"], now) for x in (movie.reviews or {}).get("items", [])]
+        )
+
+    def __put_trivia(self, kind: str, owner_id: int, items: List[dict]) -> None:
+        self.__db.execute("DELETE FROM trivia WHERE kind = ? AND owner_id = ?", (kind, owner_id))
+        self.__db.executemany(
+            "INSERT INTO trivia (kind, owner_id, position, author_id, movie_id, text) VALUES (?, ?, ?, ?, ?, ?)",
+            [(kind, owner_id, i, x.get("author_id", None), x.get("movie_id", None), x.get("text", None)) for i, x in enumerate(items)]
+        )
+
+    def put_user_ratings(self, uid: int, ratings: Iterable[UserRating]) -> None:
+        now = time.time()
+        with self.__lock, self.__db:
+            self.__db.executemany(
+                "INSERT OR REPLACE INTO ratings (user_id, movie_id, name, year, rating, date, stored_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(uid, x.id, x.name, x.year, x.rating, x.date, now) for x in ratings]
+            )
+
+    def put_user_reviews(self, uid: int, reviews: Iterable[UserReview]) -> None:
+        now = time.time()
+        with self.__lock, self.__db:
+            self.__db.executemany(
+                "INSERT OR REPLACE INTO reviews (movie_id, user_id, rating, date, text, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(x.id, uid, x.rating, x.date, x.text, now) for x in reviews]
+            )
+    # </editor-fold>
+
+    # <editor-fold desc="LOOKUPS">
+    def __is_fresh(self, stored_at: float, max_age: Optional[int] = None) -> bool:
+        max_age = self.max_age if max_age is None else max_age
+        return max_age is None or stored_at + max_age >= time.time()
+
+    def __merge(self, table: str, stored: Optional[tuple], record: PrintableObject, now: float) -> tuple:
+        """(args, not requested fields, time) of the record upserted over the stored one, the fields the record
+        didn't request are kept from a fresh stored record (which keeps its time, so they don't outlive it)"""
+        fields_map = STORE_TABLES[table][1]
+        args, not_requested = record.to_dict(), list(record.not_requested)
+        if not not_requested or stored is None or not self.__is_fresh(stored[2]):
+            return args, not_requested, now
+        stored_args, stored_not_requested, stored_at = stored
+        merged = {"id": record.id, "url": args.get("url", stored_args.get("url", None))}
+        for field in fields_map:
+            if field not in not_requested and field in args:
+                merged[field] = args[field]
+            elif field not in stored_not_requested and field in stored_args:
+                merged[field] = stored_args[field]
+        return merged, [x for x in fields_map if x not in merged], stored_at
+
+    def __read_row(self, table: str, xid: int, sort: Optional[str] = None) -> Optional[tuple]:
+        cls, fields_map, columns = STORE_TABLES[table]
+        where, params = (" AND sort IS ?", (sort,)) if table == "creators" else ("", ())
+        row = self.__db.execute(
+            f"SELECT url, {', '.join(columns)}, fields, not_requested, stored_at FROM {table} WHERE id = ?{where}", (xid,) + params
+        ).fetchone()
+        if row is None:
+            return None
+        not_requested = json.loads(row[-2])
+        stored = {**dict(zip(columns, row[1:-3])), **unpack_fields(row[-3])}
+        if stored.get("is_currently_online", None) is not None:
+            stored["is_currently_online"] = bool(stored["is_currently_online"])
+        # NOTE: the same order of the fields as the parsed record
+        args = {"id": xid, "url": row[0], **{x: stored[x] for x in fields_map if x not in not_requested and x in stored}}
+        return args, not_requested, row[-1]
+
+    def __read(self, table: str, xid: int, sort: Optional[str] = None) -> Optional[tuple]:
+        # NOTE: the buffered records are merged over the stored one, as the next flush will do
+        cls = STORE_TABLES[table][0]
+        stored = self.__read_row(table, xid, sort)
+        for record, record_sort in self.__pending:
+            if isinstance(record, cls) and record.id == xid and (table != "creators" or record_sort == sort):
+                stored = self.__merge(table, stored, record, time.time())
+        return stored
+
+    def __get(self, table: str, xid: int, fields: Optional[Iterable[str]], max_age: Optional[int], sort: Optional[str] = None):
+        cls, fields_map, columns = STORE_TABLES[table]
+        requested = check_fields(fields_map, fields)
+        with self.__lock:
+            stored = self.__read(table, xid, sort)
+            # NOTE: only a fresh record with every requested field answers the call
+            if stored is None or not self.__is_fresh(stored[2], max_age) or any(x in stored[1] for x in requested):
+                self.misses += 1
+                return None
+            self.hits += 1
+        # NOTE: only the requested fields, the same as a parsed record
+        args = {"id": xid, "url": stored[0]["url"], **{x: stored[0][x] for x in fields_map if x in requested}}
+        return cls(args).set_not_requested([x for x in fields_map if x not in requested])
+
+    def get_movie(self, mid: int, fields: Optional[Iterable[str]] = None, max_age: Optional[int] = None) -> Optional[Movie]:
+        return self.__get("movies", mid, fields, max_age)
+
+    def get_creator(
+        self,
+        cid: int,
+        fields: Optional[Iterable[str]] = None,
+        max_age: Optional[int] = None,
+        sort: Optional[str] = None
+    ) -> Optional[Creator]:
+        # NOTE: the order of the filmography depends on the sort
+        return self.__get("creators", cid, fields, max_age, sort)
+
+    def get_user(self, uid: int, fields: Optional[Iterable[str]] = None, max_age: Optional[int] = None) -> Optional[User]:
+        return self.__get("users", uid, fields, max_age)
+
+    def get_movie_creators(self, mid: int) -> Dict[str, List[dict]]:
+        """Creators of the movie by role, the same shape as Movie.creators (a creator is linked once per role)"""
+        self.flush()
+        creators = {}
+        with self.__lock:
+            for role, cid, name in self.__db.execute(
+                "SELECT role, creator_id, name FROM movie_creators WHERE movie_id = ? ORDER BY rowid", (mid,)
+            ):
+                creators.setdefault(role, []).append({"id": cid, "name": name})
+        return creators
+
+    def get_creator_movies(self, cid: int) -> List[Tuple[int, str]]:
+        """(movie id, role) of every stored movie the creator is linked to"""
+        self.flush()
+        with self.__lock:
+            return self.__db.execute(
+                "SELECT movie_id, role FROM movie_creators WHERE creator_id = ? ORDER BY movie_id", (cid,)
+            ).fetchall()
+
+    def get_user_ratings(self, uid: int) -> List[UserRating]:
+        with self.__lock:
+            rows = self.__db.execute(
+                "SELECT movie_id, name, year, rating, date FROM ratings WHERE user_id = ? ORDER BY movie_id", (uid,)
+            ).fetchall()
+        return [UserRating({"id": x[0], "name": x[1], "year": x[2], "rating": x[3], "date": x[4]}) for x in rows]
+
+    def get_movie_ratings(self, mid: int) -> List[Tuple[int, int, Optional[str]]]:
+        """(user id, rating, date) of every stored rating of the movie"""
+        with self.__lock:
+            return self.__db.execute(
+                "SELECT user_id, rating, date FROM ratings WHERE movie_id = ? ORDER BY user_id", (mid,)
+            ).fetchall()
+
+    def get_reviews(self, mid: Optional[int] = None, uid: Optional[int] = None) -> List[dict]:
+        """Stored reviews of the movie and/or by the user"""
+        self.flush()
+        conditions = [x for x, value in [("movie_id = ?", mid), ("user_id = ?", uid)] if value is not None]
+        with self.__lock:
+            rows = self.__db.execute(
+                "SELECT movie_id, user_id, rating, date, text FROM reviews"
+                + (" WHERE " + " AND ".join(conditions) if conditions else "") + " ORDER BY movie_id, user_id",
+                tuple(x for x in [mid, uid] if x is not None)
+            ).fetchall()
+        return [{"movie_id": x[0], "user_id": x[1], "rating": x[2], "date": x[3], "text": x[4]} for x in rows]
+
+    def get_trivia(self, kind: str, owner_id: int) -> List[dict]:
+        """Stored trivia of a movie or a creator (kind), in the page order"""
+        self.flush()
+        with self.__lock:
+            rows = self.__db.execute(
+                "SELECT author_id, movie_id, text FROM trivia WHERE kind = ? AND owner_id = ? ORDER BY position", (kind, owner_id)
+            ).fetchall()
+        return [{"author_id": x[0], "movie_id": x[1], "text": x[2]} for x in rows]
+    # </editor-fold>
+
+    def stats(self) -> dict:
+        self.flush()
+        with self.__lock:
+            counts = {
+                table: self.__db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ["movies", "creators", "users", "movie_creators", "ratings", "reviews", "trivia"]
+            }
+        return {"hits": self.hits, "misses": self.misses, **counts}
+
+    def close(self) -> None:
+        self.flush()
+        with self.__lock:
+            self.__db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -1,7 +1,14 @@
+import re
 import bs4
 import json
+import zlib
 import codecs
+import weakref
+import threading
+import soupsieve
+from enum import Enum
 from base64 import b64encode
+from .csfd_lxml import LxmlNode, LxmlString, lxml_soup
 
 class Globals:
     CSFD_URL = "https://www.csfd.cz"
@@ -95,14 +102,27 @@ def clean(s):
     s = s.replace("\n", " ").replace("\t", " ")
     return " ".join(s.split())
 
-def soup(content):
+class ParserBackends(Enum):
+    BS4  = "bs4"
+    LXML = "lxml"
+
+def soup(content, backend=ParserBackends.BS4):
+    if backend == ParserBackends.LXML:
+        return lxml_soup(content)
     return bs4.BeautifulSoup(content, "lxml")
 
+def release_soup(s):
+    """Destroys the document, bs4 trees are full of reference cycles and would otherwise wait for the garbage collector"""
+    if isinstance(s, bs4.BeautifulSoup):
+        s.decompose()
+    elif isinstance(s, LxmlNode):
+        s.element.clear()
+
 def is_tag(tag):
-    return isinstance(tag, bs4.element.Tag)
+    return isinstance(tag, (bs4.element.Tag, LxmlNode))
 
 def is_str(tag):
-    return isinstance(tag, bs4.element.NavigableString)
+    return isinstance(tag, (bs4.element.NavigableString, LxmlString))
 
 def sel(s, select, _all=False):
     if _all:
@@ -135,5 +155,163 @@ def text(s, select=None, recursive=False, strip=True, rec_tags=None, is_not=None
         tx = "".join([x.text if is_tag(x) else x for x in filtered])
     return tx.strip() if strip else tx
 
+# NOTE: decoded ld+json by (document id, selector), an entry is dropped as soon as its document is garbage collected
+LD_JSON_CACHE = {}
+
+RAW_LD_JSON_SELECTOR = re.compile(r"^\.([\w-]+) > script$")
+RAW_TAG = re.compile(rb"<(/?)([a-zA-Z][\w-]*)[^>]*?(/?)>")
+RAW_SCRIPT_END = re.compile(rb"</script\s*>", re.IGNORECASE)
+RAW_VOID_TAGS = [b"area", b"base", b"br", b"col", b"embed", b"hr", b"img", b"input", b"link", b"meta", b"source", b"track", b"wbr"]
+
+def raw_ld_json(content, select):
+    """Decodes the script selected by `.container > script` straight from the response bytes,
+    returns None when the page doesn't look as expected and the document has to be parsed"""
+    match = RAW_LD_JSON_SELECTOR.match(select)
+    if match is None:
+        return None
+    container = re.search(rb"<[a-zA-Z][\w-]*\s[^>]*?class=\"[^\"]*(?<![\w-])" + re.escape(match.group(1).encode()) + rb"(?![\w-])[^\"]*\"[^>]*>", content)
+    if container is None:
+        return None
+    # NOTE: the first script has to be a direct child of the container
+    depth = 0
+    for tag in RAW_TAG.finditer(content, container.end()):
+        closing, name, self_closing = tag.group(1), tag.group(2).lower(), tag.group(3)
+        if name == b"script" and not closing:
+            if depth != 0 or b"<!--" in content[container.end():tag.start()]:
+                return None
+            end = RAW_SCRIPT_END.search(content, tag.end())
+            if end is None:
+                return None
+            try:
+                return json.loads(content[tag.end():end.start()].decode("utf-8").strip())
+            except ValueError:
+                return None
+        if closing:
+            depth -= 1
+        elif not self_closing and name not in RAW_VOID_TAGS:
+            depth += 1
+        if depth < 0:
+            return None
+    return None
+
+class RawDocument:
+    """Downloaded page, ld+json can be read straight from its bytes and the document is parsed only when needed"""
+
+    def __init__(self, content, backend=ParserBackends.BS4, private=False):
+        self.content = content
+        self.backend = backend
+        # NOTE: a private page isn't shared through the document cache, so its owner can release it
+        self.private = private
+        self.__soups = {}
+        self.__ld_json = {}
+        self.__lock = threading.Lock()
+
+    def get_soup(self, backend=None):
+        backend = self.backend if backend is None else backend
+        s = self.__soups.get(backend, None)
+        if s is None:
+            with self.__lock:
+                s = self.__soups.get(backend, None)
+                if s is None:
+                    s = self.__soups[backend] = soup(self.content, backend)
+        return s
+
+    def is_parsed(self):
+        return len(self.__soups) > 0
+
+    def release(self):
+        """Destroys the parsed documents, the page can still be parsed again"""
+        with self.__lock:
+            for s in self.__soups.values():
+                release_soup(s)
+            self.__soups.clear()
+
+    def ld_json(self, select):
+        data = self.__ld_json.get(select, None)
+        if data is None:
+            data = raw_ld_json(self.content, select)
+            if data is None:
+                data = ld_json(self.get_soup(), select)
+            self.__ld_json[select] = data
+        return data
+
+class CompressedPage:
+    """Downloaded page kept only as compressed bytes, every open() returns a new RawDocument the caller owns"""
+
+    def __init__(self, content, level=6):
+        self.data = zlib.compress(content, level)
+
+    def __len__(self):
+        return len(self.data)
+
+    def open(self, backend=ParserBackends.BS4):
+        return RawDocument(zlib.decompress(self.data), backend, private=True)
+
+def selector_key(select):
+    """Class (or tag name) every element matched by the selector has, None if there isn't one"""
+    if "," in select:
+        return None
+    last = re.split(r"[\s>+~]+", re.sub(r"\[[^\]]*\]|\([^)]*\)", "", select).strip())[-1]
+    classes = re.findall(r"\.([\w-]+)", last)
+    if classes:
+        return "." + classes[0]
+    name = re.match(r"^[a-zA-Z][\w-]*", last)
+    return None if name is None else name.group(0).lower()
+
+class IndexedDocument:
+    """Walks the document once and collects the elements matched by the given selectors,
+    select/select_one of those selectors are then answered without traversing the document again"""
+
+    def __init__(self, s, selectors):
+        self.document = s
+        self.__found = {x: [] for x in selectors}
+
+        if isinstance(s, LxmlNode):
+            # NOTE: lxml evaluates the precompiled selectors natively, which is faster than matching every element in python
+            for select in self.__found:
+                self.__found[select] = s.select(select)
+            return
+
+        matchers = {}
+        for select in self.__found:
+            matchers.setdefault(selector_key(select), []).append((select, soupsieve.compile(select).match))
+        every = matchers.get(None, [])
+        for tag in s.descendants:
+            if isinstance(tag, bs4.element.Tag):
+                keys = [tag.name] + ["." + x for x in dict.fromkeys(tag.get("class", []))]
+                self.__dispatch(tag, keys, matchers, every)
+
+    def __dispatch(self, tag, keys, matchers, every):
+        for key in keys:
+            for select, match in matchers.get(key, ()):
+                if match(tag):
+                    self.__found[select].append(tag)
+        for select, match in every:
+            if match(tag):
+                self.__found[select].append(tag)
+
+    def select(self, select):
+        if select not in self.__found:
+            return self.document.select(select)
+        return list(self.__found[select])
+
+    def select_one(self, select):
+        if select not in self.__found:
+            return self.document.select_one(select)
+        found = self.__found[select]
+        return found[0] if found else None
+
+def ld_json(s, select):
+    if isinstance(s, RawDocument):
+        return s.ld_json(select)
+    key = (id(s), select)
+    entry = LD_JSON_CACHE.get(key, None)
+    if entry is not None and entry[0]() is s:
+        return entry[1]
+    tag = sel(s, select)
+    data = {} if tag is None else json.loads(text(tag))
+    LD_JSON_CACHE[key] = (weakref.ref(s, lambda _: LD_JSON_CACHE.pop(key, None)), data)
+    return data
+
 def flatten(a):
     return [a] if not isinstance(a, list) else sum(map(flatten, a), [])
\ No newline at end of file
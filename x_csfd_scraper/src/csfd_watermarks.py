@@ -0,0 +1,63 @@
+import time
+import sqlite3
+import threading
+from typing import Optional, List, Iterable, Tuple
+from .csfd_objects import UserRatingsWatermark
+
+class CsfdWatermarkStore:
+    """Persistent (SQLite) watermark of every synced user, see CsfdScraper.sync_users_ratings"""
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path: str = path
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                uid INTEGER PRIMARY KEY,
+                movie_id INTEGER NOT NULL,
+                date TEXT,
+                total INTEGER NOT NULL,
+                day_ids TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            )
+        """)
+        self.__db.commit()
+
+    def get(self, uid: int) -> Optional[UserRatingsWatermark]:
+        with self.__lock:
+            row = self.__db.execute("SELECT movie_id, date, total, day_ids FROM watermarks WHERE uid = ?", (uid,)).fetchone()
+        if row is None:
+            return None
+        return UserRatingsWatermark({"id": row[0], "date": row[1], "total": row[2], "day_ids": [int(x) for x in row[3].split(",") if x]})
+
+    def put(self, uid: int, watermark: Optional[UserRatingsWatermark]) -> None:
+        self.put_many([(uid, watermark)])
+
+    def put_many(self, watermarks: Iterable[Tuple[int, Optional[UserRatingsWatermark]]]) -> None:
+        """Stores all the watermarks in one transaction, None (user without ratings) is skipped"""
+        now = time.time()
+        rows = [(uid, x.id, x.date, x.total, ",".join(map(str, x.day_ids)), now) for uid, x in watermarks if x is not None]
+        with self.__lock:
+            self.__db.executemany(
+                "INSERT OR REPLACE INTO watermarks (uid, movie_id, date, total, day_ids, synced_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.__db.commit()
+
+    def delete(self, uid: int) -> None:
+        with self.__lock:
+            self.__db.execute("DELETE FROM watermarks WHERE uid = ?", (uid,))
+            self.__db.commit()
+
+    def get_uids(self) -> List[int]:
+        with self.__lock:
+            return [row[0] for row in self.__db.execute("SELECT uid FROM watermarks ORDER BY uid")]
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__db.execute("SELECT COUNT(*) FROM watermarks").fetchone()[0]
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__db.close()
@@ -0,0 +1,518 @@
+import os
+import pickle
+import zlib
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from contextlib import contextmanager
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from .bench import RATINGS_PER_PAGE, CrawlKilled, DictUserRating, rating_args, start_stand_in_server
+from .bench import render_stand_in_movie, render_stand_in_crawl, render_stand_in_user_ratings, render_stand_in_ratings_history
+from .src.csfd_utils import Globals, ParserBackends, RawDocument, soup
+from .src.csfd_cache import CsfdDocumentCache, CsfdDiskCache
+from .src.csfd_session import CsfdSession
+from .src.csfd_scraper import CsfdScraper
+from .src.csfd_async_scraper import AsyncCsfdScraper, AsyncCsfdSession
+from .src.csfd_store import CsfdStore
+from .src.csfd_journal import CsfdJournal
+from .src.csfd_watermarks import CsfdWatermarkStore
+from .src.csfd_parser_pool import CsfdParserPool
+from .src.csfd_crawler import CsfdCrawler, DEFAULT_CRAWL_RULES
+from .src import csfd_frames
+from .src.csfd_frames import UserRatingsFrame
+from .src.csfd_parsers import MovieParser, CreatorParser, UserParser
+from .src.csfd_objects import Creator, User, UserRating, CsfdScraperInvalidField
+
+# NOTE: offline tests against the local stand-in server of bench.py, test.py checks the parsers against csfd.cz
+
+@contextmanager
+def stand_in(render, **urls):
+    """Serves render(path) and points the Globals urls (with {port}) to the server for the duration of the test"""
+    requested = []
+
+    def counted(path: str) -> bytes:
+        requested.append(path)
+        return render(path)
+
+    server = start_stand_in_server(counted)
+    previous = {name: getattr(Globals, name) for name in urls}
+    for name, u in urls.items():
+        setattr(Globals, name, u.format(port=server.server_address[1]))
+    try:
+        yield requested
+    finally:
+        for name, u in previous.items():
+            setattr(Globals, name, u)
+        server.shutdown()
+
+def ratings_history(uid: int, count: int, today: int = 740000) -> list:
+    """(movie id, date ordinal) newest first, three ratings a day"""
+    return [(uid * 10000 + i, today - 1 - i // 3) for i in range(count)]
+
+USER_RATINGS_URL = "http://127.0.0.1:{port}/uzivatel/<uid>/hodnoceni/"
+MOVIES_URL = "http://127.0.0.1:{port}/film/"
+CRAWL_URL = "http://127.0.0.1:{port}/"
+CRAWL_GRAPH = SimpleNamespace(movies=60, creators=30, users=20)
+CRAWL_URLS = {
+    "MOVIES_URL": CRAWL_URL + "film/",
+    "CREATORS_SORT_URL": CRAWL_URL + "tvurce/<cid>?sort=<sort>",
+    "USERS_URL": CRAWL_URL + "uzivatel/",
+}
+CRAWL_FIELDS = {"movie": ["title"], "creator": ["name"], "user": ["name"]}
+
+def stand_in_pages() -> list:
+    """(name, parse) of stand-in pages, the crawl pages only have the fields the crawler reads"""
+    movie = render_stand_in_movie("/film/1", 20_000)
+    crawl_movie, creator, user = [render_stand_in_crawl(path, CRAWL_GRAPH) for path in ["/film/7", "/tvurce/3", "/uzivatel/5"]]
+    return [
+        ("movie", lambda backend: MovieParser().parse_movie(soup(movie, backend), 1)),
+        ("crawl movie", lambda backend: MovieParser().parse_movie(soup(crawl_movie, backend), 7, ["title", "creators", "reviews"])),
+        ("crawl creator", lambda backend: CreatorParser().parse_creator(soup(creator, backend), 3, ["name", "filmography"])),
+        ("crawl user", lambda backend: UserParser().parse_user(soup(user, backend), 5, ["name"])),
+    ]
+
+class ParserBackendsTest(unittest.TestCase):
+    def test_identical_output(self):
+        for name, parse in stand_in_pages():
+            with self.subTest(page=name):
+                bs4, lxml = [str(parse(backend)) for backend in ParserBackends]
+                self.assertEqual(bs4, lxml)
+
+    def test_identical_user_ratings(self):
+        content = render_stand_in_user_ratings("/uzivatel/1/hodnoceni/?page=2", 120, 0)
+        bs4, lxml = [UserParser().parse_user_ratings_ratings(soup(content, backend)) for backend in ParserBackends]
+        self.assertEqual(len(bs4.ratings), RATINGS_PER_PAGE)
+        self.assertEqual(str(bs4), str(lxml))
+
+class LdJsonTest(unittest.TestCase):
+    def test_same_as_from_the_document(self):
+        pages = [
+            (MovieParser(), MovieParser.FIELDS, MovieParser.LD_JSON_FIELDS, render_stand_in_movie("/film/3", 20_000)),
+            (MovieParser(), MovieParser.FIELDS, ["title"], render_stand_in_crawl("/film/7", CRAWL_GRAPH)),
+            (CreatorParser(), CreatorParser.FIELDS, ["name"], render_stand_in_crawl("/tvurce/3", CRAWL_GRAPH)),
+        ]
+        for parser, fields_map, fields, content in pages:
+            for field in fields:
+                parse = getattr(parser, fields_map[field])
+                with self.subTest(field=field):
+                    raw = parse(RawDocument(content))
+                    self.assertEqual([raw, raw], [parse(soup(content, backend)) for backend in ParserBackends])
+        self.assertEqual(MovieParser().parse_movie_year(RawDocument(render_stand_in_movie("/film/3"))), 2003)
+
+class SinglePassTest(unittest.TestCase):
+    def test_identical_to_parse_movie(self):
+        parser = MovieParser()
+        for size in [0, 20_000]:
+            content = render_stand_in_movie("/film/1", size)
+            for backend in ParserBackends:
+                with self.subTest(size=size, backend=backend.value):
+                    self.assertEqual(str(parser.parse_movie_single_pass(soup(content, backend), 1)), str(parser.parse_movie(soup(content, backend), 1)))
+                    fields = ["title", "genres", "creators"]
+                    self.assertEqual(
+                        str(parser.parse_movie_single_pass(soup(content, backend), 1, fields)),
+                        str(parser.parse_movie(soup(content, backend), 1, fields))
+                    )
+
+class ParserPoolTest(unittest.TestCase):
+    def test_identical_to_threads(self):
+        mids = list(range(1, 9))
+        with CsfdParserPool(2) as pool, stand_in(render_stand_in_movie, MOVIES_URL=MOVIES_URL):
+            for fields in [None, ["title", "year"], ["title", "creators"]]:
+                with self.subTest(fields=fields):
+                    expected = [str(x.result) for x in CsfdScraper().movies(mids, fields=fields, workers=4)]
+                    pooled = [x.result for x in CsfdScraper().movies(mids, fields=fields, workers=4, parser_pool=pool)]
+                    self.assertEqual([str(x) for x in pooled], expected)
+                    self.assertEqual([str(pickle.loads(pickle.dumps(x))) for x in pooled], expected)
+
+    def test_creator_and_user(self):
+        creator, user = [render_stand_in_crawl(path, CRAWL_GRAPH) for path in ["/tvurce/3", "/uzivatel/5"]]
+        with CsfdParserPool(2) as pool:
+            self.assertEqual(
+                str(pool.parse("creator", creator, 3, ["name", "filmography"])),
+                str(CreatorParser().parse_creator(soup(creator, ParserBackends.BS4), 3, ["name", "filmography"]))
+            )
+            self.assertEqual(str(pool.parse("user", user, 5, ["name"], ParserBackends.LXML)), str(UserParser().parse_user(soup(user, ParserBackends.LXML), 5, ["name"])))
+
+class FieldsTest(unittest.TestCase):
+    def assert_only_fields(self, full, partial, fields: list, all_fields: list):
+        self.assertEqual(partial.not_requested, [x for x in all_fields if x not in fields])
+        self.assertEqual({x: partial.to_dict()[x] for x in fields}, {x: full.to_dict()[x] for x in fields})
+        self.assertTrue(all(x not in partial.to_dict() for x in partial.not_requested))
+
+    def test_movie_fields(self):
+        with stand_in(render_stand_in_movie, MOVIES_URL=MOVIES_URL):
+            scraper = CsfdScraper()
+            full = scraper.movie(1)
+            # NOTE: the first field set is all from ld+json, the page isn't parsed
+            for fields in [["title", "year"], ["title", "creators", "reviews"]]:
+                with self.subTest(fields=fields):
+                    self.assert_only_fields(full, scraper.movie(1, fields), fields, list(MovieParser.FIELDS))
+            with self.assertRaises(CsfdScraperInvalidField):
+                scraper.movie(1, ["title", "budget"])
+
+    def test_creator_and_user_fields(self):
+        with stand_in(lambda path: render_stand_in_crawl(path, CRAWL_GRAPH), **CRAWL_URLS):
+            scraper = CsfdScraper()
+            creator = scraper.creator(3, fields=["filmography"])
+            self.assert_only_fields(scraper.creator(3, fields=["name", "filmography"]), creator, ["filmography"], list(CreatorParser.FIELDS))
+            self.assertEqual(scraper.user(5, ["name"]).name, "User 5")
+            with self.assertRaises(CsfdScraperInvalidField):
+                scraper.user(5, ["name", "budget"])
+
+class RecordsTest(unittest.TestCase):
+    def test_same_json_as_args_dict(self):
+        args = [rating_args(i) for i in range(100)]
+        # NOTE: a missing field and a key without a field
+        args += [{"id": 1, "name": "Movie 1", "rating": 3}, {**rating_args(2), "note": "extra"}]
+        for x in args:
+            self.assertEqual(str(UserRating(x)), str(DictUserRating(x)))
+            self.assertEqual(UserRating(x).to_dict(), x)
+        self.assertIsNone(UserRating(args[-2]).year)
+        self.assertFalse(hasattr(UserRating(args[0]), "__dict__"))
+
+    def test_pickle_round_trip(self):
+        content = render_stand_in_user_ratings("/uzivatel/1/hodnoceni/?page=1", 120, 0)
+        ratings = UserParser().parse_user_ratings_ratings(soup(content, ParserBackends.LXML)).ratings
+        ratings += [UserRating({**rating_args(2), "note": "extra"})]
+        self.assertEqual([str(pickle.loads(pickle.dumps(x))) for x in ratings], [str(x) for x in ratings])
+
+class UserRatingsPagesTest(unittest.TestCase):
+    # NOTE: less than a page, exactly three pages and a partial last page
+    TOTALS = [20, 150, 1234]
+
+    @staticmethod
+    def serial(scraper: CsfdScraper) -> list:
+        ratings = []
+        page = 1
+        while True:
+            result = scraper.user_ratings(1, page=page)
+            ratings.extend(str(x) for x in result.ratings)
+            if not result.has_next_page:
+                return ratings
+            page += 1
+
+    def test_iter_user_ratings(self):
+        for total in self.TOTALS:
+            with self.subTest(total=total), \
+                    stand_in(lambda path: render_stand_in_user_ratings(path, total, 0), USER_RATINGS_URL=USER_RATINGS_URL):
+                expected = self.serial(CsfdScraper())
+                self.assertEqual(len(expected), total)
+                self.assertEqual([str(x) for x in CsfdScraper().iter_user_ratings(1, prefetch=3)], expected)
+
+                async def prefetched():
+                    async with AsyncCsfdScraper() as scraper:
+                        return [str(x) async for x in scraper.iter_user_ratings(1, prefetch=3)]
+
+                self.assertEqual(asyncio.run(prefetched()), expected)
+
+    def test_fan_out_user_ratings(self):
+        for total in self.TOTALS:
+            with self.subTest(total=total), \
+                    stand_in(lambda path: render_stand_in_user_ratings(path, total, 0), USER_RATINGS_URL=USER_RATINGS_URL) as requested:
+                expected = self.serial(CsfdScraper())
+                requested.clear()
+                result = CsfdScraper().fan_out_user_ratings(1, workers=4)
+                self.assertTrue(result.is_consistent())
+                self.assertEqual(result.pages, len(requested))
+                self.assertEqual([str(x) for x in result.items], expected)
+
+                async def fanned_out():
+                    async with AsyncCsfdScraper() as scraper:
+                        return await scraper.fan_out_user_ratings(1, workers=4)
+
+                result = asyncio.run(fanned_out())
+                self.assertTrue(result.is_consistent())
+                self.assertEqual([str(x) for x in result.items], expected)
+
+class CrawlerTest(unittest.TestCase):
+    def assert_closed(self, received: dict):
+        """Every ID a rule finds in a received record was received too"""
+        for rule in DEFAULT_CRAWL_RULES:
+            for record in received.get(rule.source, {}).values():
+                for xid in rule.extract(record):
+                    self.assertIn(xid, received[rule.target], f"{rule.target} {xid} of {rule.source} {record.id}")
+
+    def test_every_record_once(self):
+        received = {}
+        with stand_in(lambda path: render_stand_in_crawl(path, CRAWL_GRAPH), **CRAWL_URLS) as requested:
+            crawler = CsfdCrawler(CsfdScraper(memory_bounded=True), fields=CRAWL_FIELDS, workers=4).seed("movie", [0])
+
+            def sink(kind: str, record) -> None:
+                self.assertNotIn(record.id, received.setdefault(kind, {}))
+                received[kind][record.id] = record
+
+            stats = crawler.run(sink)
+        self.assertEqual(stats["failed"], {"movie": 0, "creator": 0, "user": 0})
+        self.assertEqual(stats["fetched"], {kind: len(received.get(kind, {})) for kind in stats["fetched"]})
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(len(requested), len(set(requested)))
+        self.assertEqual(len(requested), sum(stats["fetched"].values()))
+        self.assert_closed(received)
+
+    def test_limit_and_continue(self):
+        received = {}
+        with stand_in(lambda path: render_stand_in_crawl(path, CRAWL_GRAPH), **CRAWL_URLS):
+            crawler = CsfdCrawler(CsfdScraper(memory_bounded=True), fields=CRAWL_FIELDS, workers=4).seed("movie", [0])
+            sink = lambda kind, record: received.setdefault(kind, {}).setdefault(record.id, record)
+            self.assertEqual(sum(crawler.run(sink, limit=10)["fetched"].values()), 10)
+            stats = crawler.run(sink)
+        self.assertEqual(stats["fetched"], {kind: len(received.get(kind, {})) for kind in stats["fetched"]})
+        self.assert_closed(received)
+
+class UserRatingsSyncTest(unittest.TestCase):
+    def test_async_sync_longer_than_document_cache(self):
+        # NOTE: 40 pages, more than the 32 entries of the default document cache
+        histories = {1: ratings_history(1, 2000)}
+        with stand_in(lambda path: render_stand_in_ratings_history(path, histories), USER_RATINGS_URL=USER_RATINGS_URL) as requested:
+            async def sync():
+                async with AsyncCsfdScraper() as scraper:
+                    return await asyncio.wait_for(scraper.sync_user_ratings(1), 60)
+
+            delta = asyncio.run(sync())
+        self.assertEqual(delta.pages, 40)
+        self.assertEqual(len(requested), 40)
+        self.assertEqual([x.id for x in delta.ratings], [x[0] for x in histories[1]])
+
+    def test_resync_with_disk_cache(self):
+        histories = {1: ratings_history(1, 120)}
+        with tempfile.TemporaryDirectory() as directory, \
+                stand_in(lambda path: render_stand_in_ratings_history(path, histories), USER_RATINGS_URL=USER_RATINGS_URL):
+            scraper = CsfdScraper(CsfdSession(disk_cache=CsfdDiskCache(os.path.join(directory, "sync.db"))))
+            watermark = scraper.sync_user_ratings(1).watermark
+            histories[1] = [(99999, 740000)] + histories[1]
+            # NOTE: the pages are on disk within their TTL, the sync has to revalidate them anyway
+            delta = scraper.sync_user_ratings(1, watermark)
+
+            async def resync():
+                async with AsyncCsfdScraper(AsyncCsfdSession(disk_cache=CsfdDiskCache(os.path.join(directory, "async.db")))) as scraper:
+                    watermark = (await scraper.sync_user_ratings(1)).watermark
+                    histories[1] = [(99998, 740000)] + histories[1]
+                    return await scraper.sync_user_ratings(1, watermark)
+
+            async_delta = asyncio.run(resync())
+        self.assertEqual([x.id for x in delta.ratings], [99999])
+        self.assertEqual([x.id for x in async_delta.ratings], [99998])
+
+    def test_sync_users_exact_deltas(self):
+        # NOTE: no ratings, exactly one and two pages, and a partial last page
+        counts = {1: 0, 2: 1, 3: 50, 4: 100, 5: 120, 6: 120, 7: 120, 8: 300}
+        histories = {uid: ratings_history(uid, count) for uid, count in counts.items()}
+        with tempfile.TemporaryDirectory() as directory, \
+                stand_in(lambda path: render_stand_in_ratings_history(path, histories), USER_RATINGS_URL=USER_RATINGS_URL) as requested:
+            path = os.path.join(directory, "watermarks.db")
+
+            def sync() -> dict:
+                store = CsfdWatermarkStore(path)
+                try:
+                    deltas = {x.id: x.result for x in CsfdScraper().sync_users_ratings(counts, store, workers=4)}
+                    store.put_many((uid, x.watermark) for uid, x in deltas.items())
+                finally:
+                    store.close()
+                return {uid: [x.id for x in delta.ratings] for uid, delta in deltas.items()}
+
+            self.assertEqual(sync(), {uid: [x[0] for x in history] for uid, history in histories.items()})
+            added = {
+                1: [(1, 740000)],
+                2: [(2, 740000), (3, 740000)],
+                # NOTE: rated on the watermark day (dates have no time), after the ratings already synced
+                5: [(5, 740000 - 1)],
+                8: [(8, 740000)],
+            }
+            for uid, ratings in added.items():
+                histories[uid] = ratings + histories[uid]
+            # NOTE: a removed newest rating, the sync has to stop at the first older rating instead
+            histories[6] = histories[6][1:]
+            requested.clear()
+            self.assertEqual(sync(), {uid: [x[0] for x in added.get(uid, [])] for uid in counts})
+            # NOTE: only users with more than a page of ratings on the watermark day would need a second page
+            self.assertEqual(len(requested), len(counts))
+
+            async def resync() -> dict:
+                store = CsfdWatermarkStore(path)
+                async with AsyncCsfdScraper() as scraper:
+                    deltas = {x.id: [r.id for r in x.result.ratings] async for x in scraper.sync_users_ratings(counts, store, workers=4)}
+                store.close()
+                return deltas
+
+            histories[7] = [(7, 740000)] + histories[7]
+            self.assertEqual(asyncio.run(resync()), {uid: [7] if uid == 7 else [] for uid in counts})
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "store.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def stored_movies(self) -> int:
+        with sqlite3.connect(self.path) as db:
+            return db.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def test_movies_identical_to_the_upserted(self):
+        with stand_in(render_stand_in_movie, MOVIES_URL=MOVIES_URL) as requested:
+            movies = [CsfdScraper().movie(mid) for mid in range(1, 4)]
+            with CsfdStore(self.path) as store:
+                store.put(movies)
+                scraper = CsfdScraper(store=store)
+                self.assertEqual([str(scraper.movie(mid)) for mid in range(1, 4)], [str(x) for x in movies])
+                self.assertEqual(store.stats()["hits"], 3)
+                role, creators = next(iter(movies[0].creators.items()))
+                self.assertEqual(store.get_creator_movies(creators[0]["id"]), [(mid, role) for mid in range(1, 4)])
+        self.assertEqual(len(requested), 3)
+
+    def test_lookups_keep_the_batch(self):
+        with stand_in(render_stand_in_movie, MOVIES_URL=MOVIES_URL) as requested:
+            with CsfdStore(self.path, batch_size=10) as store:
+                scraper = CsfdScraper(store=store)
+                titles = [scraper.movie(mid, ["title"]).title for mid in range(1, 6)]
+                # NOTE: the lookup before every scrape doesn't write the buffered records
+                self.assertEqual(self.stored_movies(), 0)
+                self.assertEqual([scraper.movie(mid, ["title"]).title for mid in range(1, 6)], titles)
+                self.assertEqual(store.stats()["hits"], 5)
+            self.assertEqual(self.stored_movies(), 5)
+        self.assertEqual(len(requested), 5)
+
+    def test_partial_record_is_merged(self):
+        with stand_in(render_stand_in_movie, MOVIES_URL=MOVIES_URL):
+            full = CsfdScraper().movie(1)
+            partial = CsfdScraper().movie(1, ["title"])
+        with CsfdStore(self.path) as store:
+            store.put([full])
+            creators = store.get_movie_creators(1)
+            store.put([partial])
+            self.assertEqual(str(store.get_movie(1)), str(full))
+            self.assertEqual(store.get_movie_creators(1), creators)
+
+    def test_hit_has_only_the_requested_fields(self):
+        with stand_in(render_stand_in_movie, MOVIES_URL=MOVIES_URL):
+            full = CsfdScraper().movie(1)
+            scraped = CsfdScraper().movie(1, ["year", "title"])
+        with CsfdStore(self.path) as store:
+            store.put([full])
+            movie = store.get_movie(1, ["year", "title"])
+            self.assertEqual(movie.to_dict(), scraped.to_dict())
+            self.assertEqual(movie.not_requested, scraped.not_requested)
+            with self.assertRaises(CsfdScraperInvalidField):
+                store.get_movie(1, ["unknown"])
+
+    def test_creator_and_user_round_trip(self):
+        filmography = {"Režie": {"Filmy": {2001: [{"id": 1, "name": "A", "episodes": [{"id": 2, "name": "E", "number": "S01E01"}]}], None: [{"id": 3, "name": "B"}]}}}
+        creator = Creator({"id": 5, "url": "/tvurce/5", **{x: None for x in CreatorParser.FIELDS}, "age": 44, "filmography": filmography})
+        creator.set_not_requested([])
+        user = User({"id": 7, "url": "/uzivatel/7", "name": "User", "points": 3, "is_currently_online": True})
+        user.set_not_requested([x for x in UserParser.FIELDS if x not in ["name", "points", "is_currently_online"]])
+        with CsfdStore(self.path) as store:
+            store.put([creator], sort="BY_NEWEST")
+            store.put([user])
+            self.assertEqual(str(store.get_creator(5, sort="BY_NEWEST")), str(creator))
+            self.assertIsNone(store.get_creator(5, sort="BY_OLDEST"))
+            self.assertEqual(list(store.get_creator(5, sort="BY_NEWEST").filmography["Režie"]["Filmy"]), [2001, None])
+            self.assertIs(store.get_user(7, ["name", "is_currently_online"]).is_currently_online, True)
+            self.assertIsNone(store.get_user(7))
+
+class JournalTest(unittest.TestCase):
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "crawl.journal")
+            with CsfdJournal(path) as journal:
+                for xid in [1, 5, 70000, 200000]:
+                    journal.queue("movie", xid)
+                journal.queue("creator", 3)
+                journal.queue("user", 9)
+                in_flight = [journal.frontier.pop(), journal.frontier.pop()]
+                journal.complete("movie", 1)
+                journal.compact(in_flight[1:])
+                journal.fail("movie", 5)
+            with CsfdJournal(path) as journal:
+                self.assertEqual(journal.stats()["done"], {"movie": 1, "creator": 0, "user": 0})
+                self.assertTrue(journal.is_failed("movie", 5))
+                self.assertEqual(list(journal.frontier), [("movie", 70000), ("movie", 200000), ("creator", 3), ("user", 9)])
+                self.assertFalse(journal.queue("movie", 70000))
+                self.assertTrue(journal.queue("movie", 70001))
+
+    def test_killed_crawl_resumes(self):
+        received = []
+
+        def crawl(path: str, kill_after=None) -> None:
+            def sink(kind: str, record) -> None:
+                # NOTE: killed before the record is handled, so it isn't completed in the journal either
+                if kill_after is not None and len(received) >= kill_after:
+                    raise CrawlKilled()
+                received.append((kind, record.id))
+
+            # NOTE: compacts often, so the resume goes through the snapshot and the journal written after it
+            with CsfdJournal(path, compact_every=20) as journal:
+                crawler = CsfdCrawler(CsfdScraper(memory_bounded=True), fields=CRAWL_FIELDS, workers=4, journal=journal)
+                try:
+                    crawler.seed("movie", [0]).run(sink)
+                except CrawlKilled:
+                    pass
+
+        with tempfile.TemporaryDirectory() as directory, \
+                stand_in(lambda path: render_stand_in_crawl(path, CRAWL_GRAPH), **CRAWL_URLS) as requested:
+            crawl(os.path.join(directory, "crawl.journal"), 30)
+            self.assertTrue(os.path.exists(os.path.join(directory, "crawl.journal.snapshot")))
+            crawl(os.path.join(directory, "crawl.journal"))
+            resumed = list(received)
+            received.clear()
+            crawl(os.path.join(directory, "whole.journal"))
+        self.assertEqual(len(resumed), len(set(resumed)))
+        self.assertEqual(sorted(resumed), sorted(received))
+        # NOTE: at-least-once, only the fetches in flight when killed (at most workers * 2) are repeated
+        refetched = len(requested) - len(received) - len(set(requested))
+        self.assertLessEqual(refetched, 8)
+
+    def test_same_pending_ids_from_the_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "restart.journal")
+            with CsfdJournal(path, compact_every=100_000) as journal:
+                for xid in range(5000):
+                    journal.queue("movie", xid * 7)
+                for xid in range(4000):
+                    journal.complete("movie", xid * 7)
+            with CsfdJournal(path) as journal:
+                replayed = list(journal.frontier)
+                journal.compact()
+            with CsfdJournal(path) as journal:
+                self.assertEqual(list(journal.frontier), replayed)
+        self.assertEqual(replayed, [("movie", xid * 7) for xid in range(4000, 5000)])
+
+    def test_foreign_snapshot_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "crawl.journal")
+            with open(path + ".snapshot", "wb") as f:
+                f.write(zlib.compress(b"not a snapshot"))
+            with self.assertRaises(ValueError):
+                CsfdJournal(path)
+
+class UserRatingsFrameTest(unittest.TestCase):
+    RATINGS = [
+        UserRating({"id": 1, "name": "A", "year": 1999, "rating": 5, "date": "01.02.2003"}),
+        UserRating({"id": 2, "name": "B", "year": None, "rating": 0, "date": "02.02.2003"}),
+        UserRating({"id": 3, "name": "C", "year": 2010, "rating": 3, "date": "03.02.2003"}),
+    ]
+
+    def check_frame(self):
+        frame = UserRatingsFrame.from_ratings(self.RATINGS)
+        self.assertEqual([str(x) for x in frame], [str(x) for x in self.RATINGS])
+        self.assertEqual(frame.to_dict()["year"], [1999, None, 2010])
+        self.assertEqual(len(frame.where(year_to=2005)), 1)
+        self.assertEqual(frame.counts_by_year(), {None: 1, 1999: 1, 2010: 1})
+        self.assertEqual(frame.mean_rating_by_year()[None], 0)
+        self.assertEqual([x.id for x in frame[1:]], [2, 3])
+
+    def test_round_trip(self):
+        self.check_frame()
+
+    def test_round_trip_without_numpy(self):
+        numpy, csfd_frames.numpy = csfd_frames.numpy, None
+        try:
+            self.check_frame()
+        finally:
+            csfd_frames.numpy = numpy
+
+if __name__ == '__main__':
+    unittest.main()